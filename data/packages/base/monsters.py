@@ -6,13 +6,14 @@ if typing.TYPE_CHECKING:
 
 
 class Goblin(actor.NonPlayerCharacter):
+    Stats = attributes.StatTemplate({
+        'str': 8, 'dex': 6, 'con': 8, 'agl': 7, 'int': 5, 'wis': 5,
+        'cha': 3, 'lck': 5
+    })
+
     def __init__(self) -> None:
-        stats = attributes.AttributeList.load({
-            'str': 8, 'dex': 6, 'con': 8, 'agl': 7, 'int': 5, 'wis': 5,
-            'cha': 3, 'lck': 5
-        })
         actor.NonPlayerCharacter.__init__(
-            self, 'mob.goblin', "Goblin", stats=stats
+            self, 'mob.goblin', "Goblin", stats=Goblin.Stats.create()
         )
 
     def get_intro_text(self, game: 'app.Game') -> str:
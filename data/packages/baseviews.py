@@ -1,5 +1,6 @@
 
 from rpg import event
+from rpg.changes import Change
 from rpg.ui import components, options, views, widgets
 import tkinter
 
@@ -177,6 +178,7 @@ class GameViewImpl(views.GameView):
         self.grid_rowconfigure(1, weight=1)
 
         self._fight_options = options.OptionList((options.Option("Run Away", event.FightEndEvent()), 0, 0))
+        game.state.changes.subscribe(Change.Inventory, self._inventory_changed)
 
     def _action_inventory(self):
         if self._inventory:
@@ -184,30 +186,33 @@ class GameViewImpl(views.GameView):
             self.frmInventory.grid_forget()
             self.txtContent.grid(column=1, row=1, sticky='nsew')
         else:
-            self.frmInventory.build(self._game_obj.state.player.inventory)
+            self.frmInventory.build(self._game_obj)
             self.txtContent.grid_forget()
             self.frmInventory.grid(column=1, row=1, sticky='nsew')
         self._inventory = not self._inventory
 
+    def _inventory_changed(self, kind: Change, item_id: 'Optional[str]') -> None:
+        if self._inventory:
+            self.frmInventory.clear()
+            self.frmInventory.build(self._game_obj)
+
     def set_title(self, text: str, update_status_bar: bool=False) -> None:
         """Set the displayed title to the given text.
 
+        The StatusBar updates itself from the state change bus, so update_status_bar is ignored.
+
         :param text: The text to update the title to
-        :param update_status_bar: If the status bar should be updated
+        :param update_status_bar: Ignored
         """
         self._var_title.set(text)
-        if update_status_bar:
-            self._update_status_bar()
 
     def set_text(self, text: str, update_status_bar: bool=True) -> None:
         """Set the text displayed by this GameView.
 
         :param text: The text to display
-        :param update_status_bar: If the StatusBar instance should be updated
+        :param update_status_bar: Ignored; see GameViewImpl.set_title()
         """
         self.txtContent.replace(text)
-        if update_status_bar:
-            self._update_status_bar()
 
     def add_text(self, text: str, update_status_bar: bool=True) -> None:
         self.txtContent.insert(tkinter.END, text)
@@ -216,17 +221,15 @@ class GameViewImpl(views.GameView):
         """Set the options displayed by this GameView.
 
         :param option_list: The options.OptionList instance to set the options to
-        :param update_status_bar: If the StatusBar instance should be updated
+        :param update_status_bar: Ignored; see GameViewImpl.set_title()
         """
         if self.frmOptions_Internal is not None:
             self.frmOptions_Internal.grid_remove()
         self.frmOptions_Internal = option_list.generate(self._game_obj, self.frmOptions)
         self.frmOptions_Internal.grid(sticky="NSEW")
-        if update_status_bar:
-            self._update_status_bar()
 
     def _update_status_bar(self) -> None:
-        """Private function used to update the StatusBar instance."""
+        """Private function used to redraw every widget of the StatusBar instance."""
         self.frmStatus.update_widgets(self._game_obj.state.player, self._game_obj)
 
     def text_area(self) -> tkinter.Text:
@@ -237,7 +240,7 @@ class GameViewImpl(views.GameView):
         return self.txtContent
 
     def start(self):
-        pass
+        self._update_status_bar()
 
     def resume(self):
         self.start()
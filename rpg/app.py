@@ -3,19 +3,21 @@
 
 """
 
+import collections
 import io
 import os
 import os.path
 import random
-from rpg import state, util
+from rpg import profiler, replay, state, tasks, trace, util
 from rpg.io import configuration, log, package
-from rpg.ui import components, views
+from rpg.ui import components, views, watchdog
 import sys
 import tkinter
 
 import typing
 if typing.TYPE_CHECKING:
-    from typing import List, Optional, TypeVar, Union
+    from rpg.event import GameEvent
+    from typing import Deque, List, Optional, Tuple, TypeVar, Union
     NoReturn = TypeVar('NoReturn')
 
 
@@ -39,7 +41,18 @@ class Game(object):
         self.log = log.Log()                  # type: log.Log
         self.stack = views.ViewManager(self)  # type: views.ViewManager
         self.state = state.GameData(self)     # type: state.GameData
+        self.history = state.History(100)     # type: state.History
         self.random = random.Random()
+        self.seed = None                      # type: Optional[int]
+        self.recorder = None  # type: Optional[replay.Recorder]
+        self.tracer = trace.Tracer()          # type: trace.Tracer
+        self.tasks = tasks.TaskRunner(self)   # type: tasks.TaskRunner
+        self.profiler = profiler.Profiler()   # type: profiler.Profiler
+        self.watchdog = None  # type: Optional[watchdog.Watchdog]
+        # The queued events and the options generation each was posted from
+        self._events: 'Deque[Tuple[GameEvent, Optional[int]]]'
+        self._events = collections.deque()
+        self._drain_scheduled = False         # type: bool
         self._config = configuration.Config({
             'log': configuration.Map({
                 'level': configuration.Enum(
@@ -53,6 +66,16 @@ class Game(object):
                 ),
                 'echo': configuration.Boolean(default=True),
                 'append': configuration.Boolean(default=False),
+            }),
+            'replay': configuration.Map({
+                'record': configuration.Boolean(default=False),
+                'file': configuration.String(
+                    default="./replay.dat", allow_empty=False
+                ),
+            }),
+            'watchdog': configuration.Map({
+                'enabled': configuration.Boolean(default=True),
+                'threshold_ms': configuration.Integer(default=50),
             })
         })
 
@@ -76,12 +99,103 @@ class Game(object):
             root.destroy()
             self._return_value = return_value
 
+    def reseed(self, seed: 'Optional[int]' = None) -> int:
+        """Seed the random number generator used by the game.
+
+        If no seed is given a new one is drawn from the system entropy source.
+        The seed is kept in Game.seed so the session can be replayed.
+
+        :param seed: The seed to use, or None to generate a new seed
+        :return: The seed which was used
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self.random.seed(seed)
+        return seed
+
+    def apply_event(self, game_event: 'GameEvent') -> None:
+        """Apply a GameEvent triggered by the player.
+
+        All player input should go through this method rather than calling
+        GameEvent.apply() directly so the event can be recorded. The event is
+        applied in a GameData transaction, so if it fails or raises
+        state.Rollback the state is restored. If the event is a coroutine it
+        is started as a task; see rpg.tasks.
+
+        :param game_event: The GameEvent to apply
+        """
+        profiling = self.profiler.running
+        if profiling:
+            self.profiler.enter()
+        with self.tracer.span("event", type(game_event).__name__):
+            if self.recorder is not None:
+                self.recorder.record(game_event)
+            snapshot = None  # type: Optional[state.Snapshot]
+            if game_event.undoable:
+                snapshot = self.history.push(self.state)
+            try:
+                with self.state.transaction(snapshot):
+                    self.tasks.apply(game_event)
+            except BaseException as e:
+                if snapshot is not None:
+                    self.history.pop()
+                if not isinstance(e, state.Rollback):
+                    raise
+                self.log.debug("Rolled back {}: {}", game_event.action(), e)
+            finally:
+                if profiling:
+                    self.profiler.leave()
+
+    def post_event(self, game_event: 'GameEvent',
+                   generation: 'Optional[int]' = None) -> None:
+        """Queue a GameEvent to be applied on the next tkinter idle cycle.
+
+        Every event posted before the queue is drained is applied in order
+        with display deferred, so the view is redrawn at most once. Without a
+        tkinter root (e.g. a headless game) the event is applied immediately.
+
+        An event posted by an option gives the GameData.options_generation of
+        the options it was shown with. It is dropped if the options changed
+        before it is applied, e.g. when a button is clicked twice before the
+        view is redrawn.
+
+        :param game_event: The GameEvent to queue
+        :param generation: The options generation the event was posted from,
+                           or None if the event does not depend on it
+        """
+        self._events.append((game_event, generation))
+        if self._drain_scheduled:
+            return
+
+        self._drain_scheduled = True
+        if self._root is None:
+            self._drain_events()
+        else:
+            self._root.after_idle(self._drain_events)
+
+    def undo(self, steps: int = 1) -> bool:
+        """Return the game to the state it was in before the last actions.
+
+        :param steps: How many actions to undo
+        :return: If the actions could be undone
+        """
+        snapshot = self.history.pop(steps)
+        if snapshot is None:
+            self.log.warning("Can not undo {} action(s)", steps)
+            return False
+        self.state.restore(snapshot)
+        return True
+
     def build_resources(self) -> int:
         """Merges resources from all selected packages into the
-        self.state.resources Resources collection."""
+        self.state.resources Resources collection, and registers the flags
+        declared by each package."""
         self.log.debug("Building Resources...")
         package_count = 0
         self.state.resources.clear()
+        self.state.flags.clear()
+        self.state.flags.registry.clear()
         for pkg in self._packages:
             if pkg.include:
                 self.log.debug("   merging '{}'...", pkg.name)
@@ -93,6 +207,10 @@ class Game(object):
                         "Errors occurred while merging '{}':\n{}",
                         pkg.name, err
                     )
+                for flag in pkg.flags:
+                    self.state.flags.registry.declare(
+                        "{}.{}".format(pkg.name, flag)
+                    )
                 package_count += 1
         self.log.debug("Built Resources: Included {} packages", package_count)
         return package_count
@@ -126,10 +244,20 @@ class Game(object):
 
         self.log.echo(self._config.log.echo.value)
 
+        if self._config.replay.record.value:
+            self.recorder = replay.Recorder()
+
         # If there were any errors reading the configuration, log them now
         if errstr != "":
             self.log.error("Errors in configuration:\n{}", errstr)
 
+        # The watchdog must be installed before any callbacks are registered
+        if self._config.watchdog.enabled.value:
+            self.watchdog = watchdog.Watchdog(
+                self.log, self._config.watchdog.threshold_ms.value / 1000.0
+            )
+            self.watchdog.install()
+
         # Initialize the root window
         self._root = tkinter.Tk()
         # Set a minimum size
@@ -143,7 +271,7 @@ class Game(object):
 
         # Load data - this just creates the package listing which can be
         # toggled on/off
-        self._load_packages("./data/packages")
+        self.load_packages("./data/packages")
         # TODO: load a package list which saves package name/include so we can
         #       persist package selection
 
@@ -161,8 +289,13 @@ class Game(object):
                 util.format_exception(e)
             )
 
+        self.tasks.close()
+        if self.watchdog is not None:
+            self.log.info("Tkinter callbacks: {}", self.watchdog.report())
+            self.watchdog.uninstall()
         self.stack.finalize()
         self.stack.clear_views()
+        self._save_recording()
         self.log.close()
         return self._return_value
 
@@ -183,7 +316,54 @@ class Game(object):
         self._root = None
         sys.exit(-1)
 
-    def _load_packages(self, root_path: str) -> None:
+    def _drain_events(self) -> None:
+        """Apply every queued GameEvent with display deferred until the queue
+        is empty.
+
+        If an event raises, the events queued after it are dropped, as they
+        were posted for a state the game is no longer in.
+        """
+        try:
+            with self.tracer.span("drain"), self.state.deferred_display():
+                while len(self._events) > 0:
+                    game_event, generation = self._events.popleft()
+                    if (generation is not None
+                            and generation != self.state.options_generation):
+                        self.log.debug(
+                            "Dropped {} from replaced options",
+                            game_event.action()
+                        )
+                        continue
+                    self.apply_event(game_event)
+        except BaseException:
+            if len(self._events) > 0:
+                self.log.warning(
+                    "Dropped {} queued event(s) after an event failed",
+                    len(self._events)
+                )
+                self._events.clear()
+            raise
+        finally:
+            self._drain_scheduled = False
+
+    def _save_recording(self) -> None:
+        """Write the current session recording to the configured file, if
+        recording is enabled.
+        """
+        if self.recorder is None or self.recorder.recording is None:
+            return
+
+        filename = self._config.replay.file.value
+        try:
+            self.recorder.recording.save(filename)
+            self.log.info("Saved session recording to {}", filename)
+        except Exception as e:
+            self.log.error(
+                "Could not save session recording to {}:\n{}",
+                filename, util.format_exception(e)
+            )
+
+    def load_packages(self, root_path: str) -> None:
         """Load all packages located under the root_path given.
 
         :param root_path: The root path from which to load packages
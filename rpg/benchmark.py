@@ -0,0 +1,346 @@
+"""A throughput benchmark for the game engine.
+
+The benchmark applies a script of GameEvents to a headless game as fast as
+possible and measures how many events are applied per second, the latency of
+each event and how much the memory allocated by Python grows while doing so.
+Running the same script before and after a change to the engine gives an
+objective comparison.
+
+A script is either generated by random_script() from the resources which were
+loaded, mixing location changes, option list updates, fights and inventory
+operations, or is the event stream of a Recording made with rpg.replay.
+
+The memory used by the objects the game creates in large numbers, which use
+__slots__, can be compared with the memory the same objects would use with a
+__dict__ by object_memory().
+
+The benchmark can be run from the command line:
+
+    python -m rpg.benchmark --events 10000 --seed 1
+    python -m rpg.benchmark --recording replay.dat --repeat 5
+    python -m rpg.benchmark --objects 100000
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from rpg import event, headless, replay
+from rpg.data import attributes, inventory
+from rpg.data.item import combat
+from rpg.data.resource import ResourceType
+from rpg.ui import options
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.app import Game
+    from rpg.data.resources import Resources
+    from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def random_script(resources: 'Resources', count: int,
+                  seed: int = 0) -> 'List[event.GameEvent]':
+    """Generate a random script using the given resources.
+
+    Roughly half of the events are location changes, the rest are split
+    between option list updates, fights and inventory operations. Every fight
+    which is started is ended by a later event.
+
+    :param resources: The resources to pick locations, items and monsters from
+    :param count: The number of events to generate
+    :param seed: The seed for the random number generator
+    :return: A list of GameEvents
+    """
+    rng = random.Random(seed)
+    locations = sorted(
+        key for _, key, _ in resources.enumerate(ResourceType.Location)
+    )
+    items = sorted(key for _, key, _ in resources.enumerate(ResourceType.Item))
+    monsters = sorted(
+        key for _, key, _ in resources.enumerate(ResourceType.Actor)
+    )
+    if len(locations) == 0:
+        raise ValueError("no locations to generate a script with")
+
+    script = list()  # type: List[event.GameEvent]
+    fighting = False
+    while len(script) < count:
+        roll = rng.random()
+        if fighting:
+            script.append(event.FightEndEvent())
+            fighting = False
+        elif roll < 0.5:
+            script.append(event.LocationEvent(
+                rng.choice(locations), rng.randint(0, 30)
+            ))
+        elif roll < 0.65:
+            script.append(event.UpdateOptionsEvent(options.OptionList(*(
+                (options.Option(key, event.LocationEvent(key)), i, 0)
+                for i, key in enumerate(rng.sample(
+                    locations, min(len(locations), options.OptionList.MaxRows)
+                ))
+            ))))
+        elif roll < 0.75 and len(monsters) > 0:
+            script.append(event.FightStartEvent(rng.choice(monsters)))
+            fighting = True
+        elif len(items) > 0:
+            count_ = rng.randint(1, 5)
+            if rng.random() < 0.4:
+                count_ = -count_
+            script.append(event.InventoryEvent(rng.choice(items), count_))
+    return script
+
+
+class BenchmarkResult(object):
+    """The measurements taken while running a script."""
+
+    def __init__(self, latencies: 'List[float]', elapsed: float,
+                 memory_before: int, memory_after: int,
+                 memory_peak: int) -> None:
+        """Create a new BenchmarkResult.
+
+        :param latencies: The time in seconds taken by each event
+        :param elapsed: The time in seconds taken by the whole script
+        :param memory_before: The bytes allocated before the script was run
+        :param memory_after: The bytes allocated after the script was run
+        :param memory_peak: The most bytes allocated while the script ran
+        """
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.memory_before = memory_before
+        self.memory_after = memory_after
+        self.memory_peak = memory_peak
+
+    @property
+    def event_count(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def events_per_second(self) -> float:
+        if self.elapsed <= 0.0:
+            return float('inf')
+        return self.event_count / self.elapsed
+
+    @property
+    def memory_growth(self) -> int:
+        return self.memory_after - self.memory_before
+
+    def percentile(self, fraction: float) -> float:
+        """Get a percentile of the event latencies.
+
+        :param fraction: The percentile as a fraction, e.g. 0.99
+        :return: The latency in seconds
+        """
+        if len(self.latencies) == 0:
+            return 0.0
+        index = min(
+            len(self.latencies) - 1, int(fraction * len(self.latencies))
+        )
+        return self.latencies[index]
+
+    def report(self) -> str:
+        """Summarize the result.
+
+        :return: The summary as a string
+        """
+        lines = [
+            "{} events in {:.3f} s: {:.0f} events/s".format(
+                self.event_count, self.elapsed, self.events_per_second
+            ),
+            "latency p50 {:.1f} us, p90 {:.1f} us, p99 {:.1f} us, "
+            "max {:.1f} us".format(
+                self.percentile(0.5) * 1e6, self.percentile(0.9) * 1e6,
+                self.percentile(0.99) * 1e6, self.percentile(1.0) * 1e6
+            ),
+        ]
+        if self.memory_peak > 0:
+            lines.append("memory growth {:+.1f} KiB, peak {:.1f} KiB".format(
+                self.memory_growth / 1024.0, self.memory_peak / 1024.0
+            ))
+        return "\n".join(lines)
+
+
+class Benchmark(object):
+    """Runs scripts of GameEvents against headless games."""
+
+    def __init__(self, package_root: str = "./data/packages") -> None:
+        """Create a new Benchmark, loading the packages once.
+
+        :param package_root: The directory to load packages from
+        """
+        self._template = headless.create_game(package_root)
+
+    def resources(self) -> 'Resources':
+        return self._template.state.resources
+
+    def create_game(self, seed: 'Optional[int]' = None) -> 'Game':
+        """Create and start a fresh headless game sharing the resources.
+
+        :param seed: The seed to start the game with
+        :return: The started Game instance
+        """
+        game = headless.create_game(template=self._template)
+        game.state.start(seed)
+        return game
+
+    def run(self, script: 'Sequence[event.GameEvent]', seed: int = 0,
+            memory: bool = True) -> 'BenchmarkResult':
+        """Apply every event of a script to a fresh game.
+
+        Tracking memory with tracemalloc slows down allocation, so the event
+        rate is lower when memory is True.
+
+        :param script: The GameEvents to apply
+        :param seed: The seed to start the game with
+        :param memory: If the growth of allocated memory should be measured
+        :return: The measurements taken
+        """
+        game = self.create_game(seed)
+        latencies = list()  # type: List[float]
+        apply_event = game.apply_event
+        clock = time.perf_counter
+
+        gc.collect()
+        if memory:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0] if memory else 0
+        start = clock()
+        for game_event in script:
+            event_start = clock()
+            apply_event(game_event)
+            latencies.append(clock() - event_start)
+        elapsed = clock() - start
+        after, peak = 0, 0
+        if memory:
+            gc.collect()
+            after, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return BenchmarkResult(latencies, elapsed, before, after, peak)
+
+
+class _Plain(object):
+    """An object holding the same attributes as a slotted object in a
+    __dict__, for comparison.
+    """
+
+    def __init__(self, values: 'Dict[str, Any]') -> None:
+        for name, value in values.items():
+            setattr(self, name, value)
+
+
+def _slot_values(obj: object) -> 'Dict[str, Any]':
+    values = dict()
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            values[name] = getattr(obj, name)
+    return values
+
+
+def _allocated(factory: 'Callable[[], object]', count: int) -> int:
+    """Measure the memory allocated by creating objects.
+
+    :param factory: A function creating one object
+    :param count: How many objects to create
+    :return: The number of bytes allocated, including the list holding them
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return allocated
+
+
+def object_memory(count: int = 100000) -> 'List[Tuple[str, int, int]]':
+    """Measure the memory used by the core objects which use __slots__.
+
+    Each object is compared with an object holding the same attribute values
+    in a __dict__, which is how the classes stored them before.
+
+    :param count: How many objects of each class to create
+    :return: A list of (class name, bytes with __slots__, bytes with a
+             __dict__) for each class
+    """
+    instance = inventory.ItemInstance('misc.ore.coal')
+    game_event = event.OptionListReturnEvent()
+    factories = (
+        ("Attribute", lambda: attributes.Attribute(10)),
+        ("ItemInstance", lambda: inventory.ItemInstance('misc.ore.coal')),
+        ("ItemStack", lambda: inventory.ItemStack(instance, 1)),
+        ("Attack", lambda: combat.Attack("Slash", 5, 80)),
+        ("Option", lambda: options.Option("Wait", game_event)),
+    )  # type: Tuple[Tuple[str, Callable[[], object]], ...]
+    results = list()
+    for name, factory in factories:
+        values = _slot_values(factory())
+        results.append((
+            name, _allocated(factory, count),
+            _allocated(lambda: _Plain(values), count)
+        ))
+    return results
+
+
+def object_memory_report(count: int = 100000) -> str:
+    """Create a table of the memory used by the core objects.
+
+    :param count: How many objects of each class to create
+    :return: The report as a string
+    """
+    lines = ["{:<14} {:>12} {:>12} {:>8}".format(
+        "per {}".format(count), "slots KiB", "dict KiB", "saving"
+    )]
+    for name, slotted, plain in object_memory(count):
+        lines.append("{:<14} {:>12.1f} {:>12.1f} {:>7.0f}%".format(
+            name, slotted / 1024.0, plain / 1024.0,
+            100.0 * (plain - slotted) / max(plain, 1)
+        ))
+    return "\n".join(lines)
+
+
+def main(argv: 'Optional[List[str]]' = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m rpg.benchmark",
+        description="Measure the event throughput of a headless game."
+    )
+    parser.add_argument("--packages", default="./data/packages",
+                        help="the directory to load packages from")
+    parser.add_argument("--events", type=int, default=10000,
+                        help="the length of a random script")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="the seed used to generate and run the script")
+    parser.add_argument("--recording", default=None,
+                        help="run the events of a recording instead")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="how many times to run the script")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="do not measure memory growth")
+    parser.add_argument("--objects", type=int, default=None,
+                        help="measure the memory of this many core objects "
+                             "instead of running a script")
+    args = parser.parse_args(argv)
+
+    if args.objects is not None:
+        print(object_memory_report(args.objects))
+        return 0
+
+    bench = Benchmark(args.packages)
+    if args.recording is not None:
+        recording = replay.Recording.load(args.recording)
+        script = recording.events  # type: Sequence[event.GameEvent]
+        seed = recording.seed
+    else:
+        script = random_script(bench.resources(), args.events, args.seed)
+        seed = args.seed
+
+    for i in range(args.repeat):
+        result = bench.run(script, seed, memory=not args.no_memory)
+        print("Run {}:\n{}".format(i + 1, result.report()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""The state change bus.
+
+GameData publishes a message on its ChangeBus whenever part of the game state
+actually changes, such as a stat of the player or the game time. UI components
+subscribe to the kinds of change they display and only update the widgets
+which are affected, rather than redrawing everything after every action.
+
+Each message is a Change kind and a key naming what changed within that kind:
+
+    Change.Player:    The player was replaced or renamed; the key is None
+    Change.Stat:      A player attribute changed; the key is the attribute key
+                      used by AttributeList.load(), e.g. "str" or "hp"
+    Change.Inventory: The player inventory changed; the key is the resource_id
+                      of the item
+    Change.Location:  The current location changed; the key is the resource_id
+                      of the new location
+    Change.Time:      The game time changed; the key is None
+
+A key of None always means that anything of that kind may have changed.
+
+While the bus is held (see ChangeBus.hold()), messages are collected instead
+of being delivered, and duplicates are merged. GameData holds the bus for the
+same duration as it defers display, so a chain of events which changes a stat
+several times results in one update of the widget displaying it.
+"""
+
+import contextlib
+from enum import IntEnum, unique
+
+import typing
+if typing.TYPE_CHECKING:
+    from typing import Callable, Dict, Iterator, List, Optional, Tuple
+    ChangeCallback = Callable[['Change', Optional[str]], None]
+
+
+@unique
+class Change(IntEnum):
+    """The kinds of change published on a ChangeBus."""
+
+    Player = 0
+    Stat = 1
+    Inventory = 2
+    Location = 3
+    Time = 4
+
+
+class ChangeBus(object):
+    """Delivers state change messages to subscribers."""
+
+    def __init__(self) -> None:
+        self._subscribers: 'Dict[Change, List[ChangeCallback]]'
+        self._subscribers = {kind: list() for kind in Change}
+        self._hold_depth = 0
+        self._pending: 'Dict[Tuple[Change, Optional[str]], None]'
+        self._pending = dict()
+
+    def subscribe(self, kind: 'Change', callback: 'ChangeCallback') -> None:
+        """Call a function whenever a change of the given kind is published.
+
+        :param kind: The kind of change to subscribe to
+        :param callback: A function taking the Change kind and the key
+        """
+        self._subscribers[kind].append(callback)
+
+    def unsubscribe(self, kind: 'Change', callback: 'ChangeCallback') -> None:
+        """Stop calling a function subscribed with ChangeBus.subscribe().
+
+        :param kind: The kind of change the function was subscribed to
+        :param callback: The subscribed function
+        """
+        subscribers = self._subscribers[kind]
+        if callback in subscribers:
+            subscribers.remove(callback)
+
+    def publish(self, kind: 'Change', key: 'Optional[str]' = None) -> None:
+        """Publish a change to every subscriber of its kind.
+
+        :param kind: The kind of change
+        :param key: What changed, or None if anything of the kind may have
+        """
+        if self._hold_depth > 0:
+            if (kind, None) not in self._pending:
+                self._pending[(kind, key)] = None
+            return
+        for callback in tuple(self._subscribers[kind]):
+            callback(kind, key)
+
+    def publish_all(self) -> None:
+        """Publish a change of every kind, used when the whole state has been
+        replaced.
+        """
+        for kind in Change:
+            self.publish(kind, None)
+
+    def discard(self) -> None:
+        """Drop every change collected while the bus is held."""
+        self._pending.clear()
+
+    @contextlib.contextmanager
+    def hold(self) -> 'Iterator[None]':
+        """Context manager which delays delivery of published changes.
+
+        Changes published inside the context are delivered in the order they
+        were first published when the outermost context exits, with duplicate
+        changes delivered once.
+        """
+        self._hold_depth += 1
+        try:
+            yield
+        finally:
+            self._hold_depth -= 1
+            if self._hold_depth == 0:
+                self._flush()
+
+    def _flush(self) -> None:
+        pending = self._pending
+        self._pending = dict()
+        for kind, key in pending.keys():
+            # A later change of the whole kind makes the keyed change redundant
+            if key is not None and (kind, None) in pending:
+                continue
+            for callback in tuple(self._subscribers[kind]):
+                callback(kind, key)
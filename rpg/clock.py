@@ -0,0 +1,259 @@
+"""The game clock and timed event scheduler.
+
+Game time is measured in whole minutes since the start of the game. Packages
+can schedule GameEvents to be applied at an absolute time or after a delay,
+optionally repeating, for things like shops opening, buffs expiring or NPCs
+moving. Scheduled events are kept in a heap, so advancing the clock only
+touches the events which are actually due, at O(log n) each.
+"""
+
+import heapq
+from rpg import changes
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.app import Game
+    from rpg.event import GameEvent
+    from typing import List, Optional, Tuple
+
+MinutesPerHour = 60
+HoursPerDay = 24
+MinutesPerDay = MinutesPerHour * HoursPerDay
+
+
+class ScheduledEvent(object):
+    """A handle to a GameEvent scheduled on a Clock.
+
+    The handle can be used to cancel the event before it is applied.
+    """
+
+    def __init__(self, time: int, game_event: 'GameEvent',
+                 repeat: 'Optional[int]' = None) -> None:
+        """Create a new ScheduledEvent.
+
+        :param time: The game time the event is due at
+        :param game_event: The GameEvent to apply
+        :param repeat: If not None, the event is rescheduled this many minutes
+                       after each time it is applied
+        """
+        self.time = time
+        self.event = game_event
+        self.repeat = repeat
+        self.cancelled = False
+        # If the event is in the heap of a Clock
+        self.queued = False
+
+
+class Clock(object):
+    """Tracks the current game time and the events scheduled in the future."""
+
+    def __init__(self, game: 'Game', time: int = 0) -> None:
+        """Create a new Clock.
+
+        :param game: The Game instance scheduled events are applied to
+        :param time: The initial game time in minutes
+        """
+        self._game = game
+        self._time = time
+        self._heap = list()  # type: List[Tuple[int, int, ScheduledEvent]]
+        self._sequence = 0
+        # The number of events in the heap which are pending and cancelled
+        self._live = 0
+        self._cancelled = 0
+        self._version = 0
+        self._snapshot = None  # type: Optional[Tuple]
+        self._snapshot_version = -1
+
+    def now(self) -> int:
+        """Get the current game time.
+
+        :return: The number of minutes since the start of the game
+        """
+        return self._time
+
+    def day(self) -> int:
+        """Get the current day, starting at day 1.
+
+        :return: The current day
+        """
+        return self._time // MinutesPerDay + 1
+
+    def time_string(self) -> str:
+        """Get the time of day as a HH:MM string.
+
+        :return: The time of day
+        """
+        minutes = self._time % MinutesPerDay
+        return "{:02}:{:02}".format(
+            minutes // MinutesPerHour, minutes % MinutesPerHour
+        )
+
+    def date_string(self) -> str:
+        """Get the current day as a string.
+
+        :return: The current day
+        """
+        return "Day {}".format(self.day())
+
+    def schedule_at(self, time: int, game_event: 'GameEvent',
+                    repeat: 'Optional[int]' = None) -> 'ScheduledEvent':
+        """Schedule a GameEvent to be applied at an absolute game time.
+
+        Events scheduled for a time which has already passed are applied the
+        next time the clock is advanced.
+
+        :param time: The game time to apply the event at
+        :param game_event: The GameEvent to apply
+        :param repeat: If not None, the number of minutes between repeats
+        :return: A handle which can be used to cancel the event
+        """
+        if repeat is not None and repeat <= 0:
+            raise ValueError("repeat interval must be positive")
+        scheduled = ScheduledEvent(time, game_event, repeat)
+        self._push(scheduled)
+        return scheduled
+
+    def schedule_in(self, delay: int, game_event: 'GameEvent',
+                    repeat: 'Optional[int]' = None) -> 'ScheduledEvent':
+        """Schedule a GameEvent to be applied after a delay.
+
+        :param delay: How many minutes from now to apply the event
+        :param game_event: The GameEvent to apply
+        :param repeat: If not None, the number of minutes between repeats
+        :return: A handle which can be used to cancel the event
+        """
+        return self.schedule_at(self._time + delay, game_event, repeat)
+
+    def cancel(self, scheduled: 'ScheduledEvent') -> None:
+        """Cancel a scheduled event.
+
+        The event is left in the heap and skipped when it becomes due, unless
+        cancelled events make up more than half of the heap, in which case
+        they are all removed.
+
+        :param scheduled: The handle returned when the event was scheduled
+        """
+        if scheduled.cancelled:
+            return
+        scheduled.cancelled = True
+        if not scheduled.queued:
+            return
+        self._live -= 1
+        self._cancelled += 1
+        self._version += 1
+        if self._cancelled * 2 > len(self._heap):
+            self._compact()
+
+    def pending(self) -> int:
+        """Get the number of scheduled events which have not been cancelled.
+
+        :return: The number of pending events
+        """
+        return self._live
+
+    def advance(self, minutes: int) -> int:
+        """Move the clock forward, applying every event which becomes due.
+
+        Events are applied in order of their due time, with the clock set to
+        that time while each is applied. Events scheduled at the same time
+        are applied in the order they were scheduled.
+
+        :param minutes: How many minutes to advance the clock by
+        :return: The number of events which were applied
+        """
+        return self.advance_to(self._time + max(0, minutes))
+
+    def advance_to(self, time: int) -> int:
+        """Move the clock forward to an absolute time, applying every event
+        which becomes due.
+
+        :param time: The game time to advance to
+        :return: The number of events which were applied
+        """
+        applied = 0
+        start = self._time
+        heap = self._heap
+        while len(heap) > 0 and heap[0][0] <= time:
+            due, _, scheduled = heapq.heappop(heap)
+            scheduled.queued = False
+            if scheduled.cancelled:
+                self._cancelled -= 1
+                continue
+            self._live -= 1
+            self._time = max(self._time, due)
+            if scheduled.repeat is not None:
+                scheduled.time = due + scheduled.repeat
+                self._push(scheduled)
+            game_event = scheduled.event
+            with self._game.tracer.span("event", type(game_event).__name__):
+                self._game.tasks.apply(game_event)
+            applied += 1
+        if time > self._time:
+            self._time = time
+        if self._time != start:
+            self._version += 1
+            self._game.state.changes.publish(changes.Change.Time)
+        elif applied > 0:
+            self._version += 1
+        return applied
+
+    def clear(self, time: int = 0) -> None:
+        """Remove every scheduled event and reset the time.
+
+        :param time: The game time to reset to
+        """
+        previous = self._time
+        self._time = time
+        for _, _, scheduled in self._heap:
+            scheduled.queued = False
+        self._heap.clear()
+        self._live = 0
+        self._cancelled = 0
+        self._version += 1
+        if time != previous:
+            self._game.state.changes.publish(changes.Change.Time)
+
+    def snapshot(self) -> 'Tuple':
+        """Get an immutable copy of the clock.
+
+        The copy is cached until the clock changes.
+
+        :return: A snapshot which can be given to Clock.restore()
+        """
+        if self._snapshot_version != self._version:
+            self._snapshot = (self._time, tuple(
+                (s.time, s.event, s.repeat)
+                for _, _, s in sorted(self._heap) if not s.cancelled
+            ))
+            self._snapshot_version = self._version
+        return self._snapshot
+
+    def restore(self, snapshot: 'Tuple') -> None:
+        """Set the clock to the state stored in a snapshot.
+
+        Handles to events scheduled before the restore are no longer valid.
+
+        :param snapshot: A snapshot created by Clock.snapshot()
+        """
+        time, scheduled = snapshot
+        self.clear(time)
+        for due, game_event, repeat in scheduled:
+            self._push(ScheduledEvent(due, game_event, repeat))
+        self._snapshot = snapshot
+        self._snapshot_version = self._version
+
+    def _push(self, scheduled: 'ScheduledEvent') -> None:
+        heapq.heappush(self._heap, (scheduled.time, self._sequence, scheduled))
+        scheduled.queued = True
+        self._sequence += 1
+        self._live += 1
+        self._version += 1
+
+    def _compact(self) -> None:
+        """Remove every cancelled event from the heap."""
+        # In place, as advance_to() may be iterating over the heap
+        self._heap[:] = [
+            entry for entry in self._heap if not entry[2].cancelled
+        ]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
@@ -6,6 +6,7 @@ charisma check can be done against the NPC's wisdom), generalizing the
 mechanics for various interactions which may be performed.
 """
 
+import copy
 from abc import abstractmethod
 from rpg.data import attributes, inventory, resource
 
@@ -46,6 +47,22 @@ class Actor(resource.Resource):
             self._name = new_name
         return self._name
 
+    def spawn(self) -> 'Actor':
+        """Create an instance of this actor for a single game.
+
+        Actors are resources, which are shared by every game created from the
+        same template. The instance shares the stats of this actor until they
+        are changed and gets a copy of its inventory, so that fighting it does
+        not change the resource.
+
+        :return: A new instance of this actor
+        """
+        instance = copy.copy(self)
+        instance.stats = self.stats.share()
+        instance.inventory = inventory.Inventory()
+        instance.inventory.restore(self.inventory.snapshot())
+        return instance
+
 
 class Player(Actor):
     """Definition of the Player character.
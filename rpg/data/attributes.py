@@ -1,8 +1,15 @@
 
 import abc
+import array
+import contextlib
+import heapq
+import operator
+from rpg import util
 import typing
 if typing.TYPE_CHECKING:
-    from typing import Dict, Optional, Sequence, Tuple
+    from typing import (
+        Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+    )
 
 AttributeData = typing.Union[
     int,
@@ -10,55 +17,18 @@ AttributeData = typing.Union[
 ]
 
 
-class Attribute(object):
-    """Class which tracks an attribute level and current value.
-
-    Attributes are a primary or secondary statistic about an Actor which
-    characterizes them in some manner. Primary attributes are as follows:
-        Strength:     How strong the Actor is. Used for health, damage and how
-                      much an actor may carry
-        Dexterity:    The Actors fine motor skills. Used for hit-chance
-        Constitution: How hardy the Actor is. Used to calculate stamina and
-                      health
-        Agility:      How quick and nimble the Actor is. Used to determine turn
-                      order, actions per turn, and stamina
-        Intelligence: How smart the Actor is. Used for Spell Damage and mana
-        Wisdom:       How wise the Actor is. Used for mana and Spell Resistance
-        Charisma:     How persuasive the character is. Used for persuade
-                      checks, shop buy and sell prices
-        Luck:         How lucky the Actor is. Small benefits to many parts of
-                      the game
-
-    Secondary attributes are implemented as a sub-class of the Attribute class
-    (Stat), and are as follows:
-        Health:  Hit Points, or how much damage an Actor can take before dieing
-        Stamina: How much exertion the Actor can take before collapsing
-        Mana:    Magical energy, used for casting spells
+class _AttributeBase(object):
+    """The behaviour shared by Attributes and the views of an AttributeList.
 
-    For more on Secondary attributes, see the rpg.attributes.SecondaryAttribute
-    class.
-
-    The default value for the level of Primary Attributes is 10. This
-    represents the average value that a human would have. As such, an Actor
-    with an intelligence of 10 is averagely smart for a human, an actor with an
-    Agility score of 10 is about as quick as the average human, etc.
+    Subclasses store '_level', '_value' and '_listeners' however they like.
     """
 
+    __slots__ = ()
+
     ColorNormal = "black"
     ColorAbove = "green"
     ColorBelow = "red"
 
-    def __init__(self, level: int = 10, value: 'Optional[int]' = None) -> None:
-        """Create a new Attribute instance with the given level and value.
-
-        If the value is not given, it is assumed to be the same as the level.
-
-        :param level: The level of the attribute
-        :param value: The current value of the attribute
-        """
-        self._level = level
-        self._value = value if value is not None else level
-
     @property
     def color(self) -> str:
         """Get the color to display this attribute in.
@@ -135,6 +105,34 @@ class Attribute(object):
     def set_value(self, new_value: int) -> None:
         self._value = new_value
 
+    def add(self, listener: 'AttributeChangeListener') -> None:
+        if self._listeners is None:
+            self._listeners = list()
+        self._listeners.append(listener)
+
+    def notify(self, notify_msg: str) -> None:
+        if self._listeners is None:
+            return
+        for listener in self._listeners:
+            listener.update(self, notify_msg)
+
+    def snapshot(self) -> 'Tuple[int, ...]':
+        """Get the internal state of this Attribute as a tuple.
+
+        :return: A tuple which can be given to Attribute.restore()
+        """
+        return self._level, self._value
+
+    def restore(self, data: 'Tuple[int, ...]') -> None:
+        """Set the internal state of this Attribute from a snapshot.
+
+        Listeners are not notified; the snapshot of every dependant attribute
+        is expected to be restored as well.
+
+        :param data: A tuple created by Attribute.snapshot()
+        """
+        self._level, self._value = data
+
     def __str__(self) -> str:
         """Get the string representation of this Attribute.
 
@@ -153,46 +151,92 @@ class Attribute(object):
         return "Attribute({}, {})".format(self._level, self._value)
 
 
+class Attribute(_AttributeBase):
+    """Class which tracks an attribute level and current value.
+
+    Attributes are a primary or secondary statistic about an Actor which
+    characterizes them in some manner. Primary attributes are as follows:
+        Strength:     How strong the Actor is. Used for health, damage and how
+                      much an actor may carry
+        Dexterity:    The Actors fine motor skills. Used for hit-chance
+        Constitution: How hardy the Actor is. Used to calculate stamina and
+                      health
+        Agility:      How quick and nimble the Actor is. Used to determine turn
+                      order, actions per turn, and stamina
+        Intelligence: How smart the Actor is. Used for Spell Damage and mana
+        Wisdom:       How wise the Actor is. Used for mana and Spell Resistance
+        Charisma:     How persuasive the character is. Used for persuade
+                      checks, shop buy and sell prices
+        Luck:         How lucky the Actor is. Small benefits to many parts of
+                      the game
+
+    Secondary attributes are implemented as a sub-class of the Attribute class
+    (Stat), and are as follows:
+        Health:  Hit Points, or how much damage an Actor can take before dieing
+        Stamina: How much exertion the Actor can take before collapsing
+        Mana:    Magical energy, used for casting spells
+
+    For more on Secondary attributes, see the rpg.attributes.SecondaryAttribute
+    class.
+
+    The default value for the level of Primary Attributes is 10. This
+    represents the average value that a human would have. As such, an Actor
+    with an intelligence of 10 is averagely smart for a human, an actor with an
+    Agility score of 10 is about as quick as the average human, etc.
+    """
+
+    __slots__ = ('_level', '_value', '_listeners')
+
+    def __init__(self, level: int = 10, value: 'Optional[int]' = None) -> None:
+        """Create a new Attribute instance with the given level and value.
+
+        If the value is not given, it is assumed to be the same as the level.
+
+        :param level: The level of the attribute
+        :param value: The current value of the attribute
+        """
+        self._level = level
+        self._value = value if value is not None else level
+        # Created by Attribute.add(), as most attributes are never observed
+        self._listeners = None  # type: Optional[List[AttributeChangeListener]]
+
+    __setstate__ = util.set_slot_state
+
+
 class AttributeChangeListener(abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def update(self, attr: 'Attribute', msg: str) -> None:
         raise NotImplementedError()
 
 
-class PrimaryAttribute(Attribute):
-    def __init__(self, level: int = 10, value: 'Optional[int]' = None) -> None:
-        Attribute.__init__(self, level, value)
-        self._listeners = list()
-
-    def add(self, listener: 'AttributeChangeListener') -> None:
-        self._listeners.append(listener)
-
-    def notify(self, notify_msg: str) -> None:
-        for listener in self._listeners:
-            listener.update(self, notify_msg)
+class _PrimaryAttributeBase(_AttributeBase):
+    __slots__ = ()
 
     def set_level(self, new_value: int) -> None:
-        Attribute.set_level(self, new_value)
+        _AttributeBase.set_level(self, new_value)
         self.notify("level")
 
     def set_value(self, new_value: int) -> None:
-        Attribute.set_value(self, new_value)
+        _AttributeBase.set_value(self, new_value)
         self.notify("value")
 
 
-class SecondaryAttribute(Attribute, AttributeChangeListener):
-    """A Secondary Attribute.
+class PrimaryAttribute(_PrimaryAttributeBase, Attribute):
+    __slots__ = ()
 
-    For a thorough explanation of Attributes and Stats, see
-    rpg.attributes.Attribute.
+    def __init__(self, level: int = 10, value: 'Optional[int]' = None) -> None:
+        Attribute.__init__(self, level, value)
 
-    A Stat is a secondary Attribute. These Attributes tend to be both higher
-    valued than Primary Attributes (by roughly 10x), and change value
-    frequently. The default value of a Stat is thus 100/100
 
-    Stat instances are used to track health, stamina, and mana.
+class _SecondaryAttributeBase(_AttributeBase, AttributeChangeListener):
+    """The behaviour shared by SecondaryAttributes and the secondary views of
+    an AttributeList. Subclasses also store '_effective'.
     """
 
+    __slots__ = ()
+
     ThresholdGood = 1.0
     ThresholdOkay = 0.75
     ThresholdPoor = 0.5
@@ -204,28 +248,6 @@ class SecondaryAttribute(Attribute, AttributeChangeListener):
     ColorPoor = "orange"
     ColorHurt = "red"
 
-    def __init__(
-        self, level: int = 0,
-        value: 'Optional[int]' = None,
-        tracked: 'Optional[Sequence[Tuple[int, PrimaryAttribute]]]' = None
-    ) -> None:
-        """Create a new Stat instance.
-
-        If the value argument is not given or is None, then the value is
-        assumed to be equal to the level.
-
-        :param level: The level of the Stat
-        :param value: The current value of the Stat
-        """
-        Attribute.__init__(self, level, value)
-        self._tracked = tracked
-        self._effective = level
-        for amount, attribute in self._tracked:
-            attribute.add(self)
-            self._effective += attribute.level * amount
-        if value is None:
-            self._value = self._effective
-
     def update(self, attr: 'Attribute', msg: str) -> None:
         """Update callback used to handle changes in a tracked
         attribute.
@@ -241,11 +263,24 @@ class SecondaryAttribute(Attribute, AttributeChangeListener):
             amount * attribute.level for amount, attribute in self._tracked
         )
         difference = new_value - self._effective
+        if difference == 0:
+            return
         self._effective = new_value
         if difference > 0:
             self._value += difference
         elif self._value > self._effective:
             self._value = self._effective
+        self.notify("level")
+
+    def set_value(self, new_value: int) -> None:
+        _AttributeBase.set_value(self, new_value)
+        self.notify("value")
+
+    def snapshot(self) -> 'Tuple[int, ...]':
+        return self._level, self._value, self._effective
+
+    def restore(self, data: 'Tuple[int, ...]') -> None:
+        self._level, self._value, self._effective = data
 
     def string(self, short: bool = False) -> str:
         """Get a string representation of this SecondaryAttribute.
@@ -272,6 +307,7 @@ class SecondaryAttribute(Attribute, AttributeChangeListener):
         self._effective += difference
         if difference > 0 or self._value > self._effective:
             self._value += difference
+        self.notify("level")
 
     @property
     def color(self) -> str:
@@ -282,7 +318,20 @@ class SecondaryAttribute(Attribute, AttributeChangeListener):
         class.
         :return: A tkinter color string
         """
-        ratio = float(self._value) / float(self._level)
+        return SecondaryAttribute.color_of(self._value, self._effective)
+
+    @staticmethod
+    def color_of(value: int, level: int) -> str:
+        """Get the color for a SecondaryAttribute with the given value and
+        effective level.
+
+        :param value: The current value
+        :param level: The effective level
+        :return: A tkinter color string
+        """
+        if level <= 0:
+            return SecondaryAttribute.ColorHurt
+        ratio = float(value) / float(level)
         if ratio > SecondaryAttribute.ThresholdGood:
             return SecondaryAttribute.ColorBuffed
         if ratio > SecondaryAttribute.ThresholdOkay:
@@ -302,53 +351,903 @@ class SecondaryAttribute(Attribute, AttributeChangeListener):
         return "Stat({}, {})".format(self._level, self._value)
 
 
+class SecondaryAttribute(_SecondaryAttributeBase, Attribute):
+    """A Secondary Attribute.
+
+    For a thorough explanation of Attributes and Stats, see
+    rpg.attributes.Attribute.
+
+    A Stat is a secondary Attribute. These Attributes tend to be both higher
+    valued than Primary Attributes (by roughly 10x), and change value
+    frequently. The default value of a Stat is thus 100/100
+
+    Stat instances are used to track health, stamina, and mana.
+    """
+
+    __slots__ = ('_tracked', '_effective')
+
+    def __init__(
+        self, level: int = 0,
+        value: 'Optional[int]' = None,
+        tracked: 'Optional[Sequence[Tuple[int, PrimaryAttribute]]]' = None
+    ) -> None:
+        """Create a new Stat instance.
+
+        If the value argument is not given or is None, then the value is
+        assumed to be equal to the level.
+
+        :param level: The level of the Stat
+        :param value: The current value of the Stat
+        """
+        Attribute.__init__(self, level, value)
+        self._tracked = tracked
+        self._effective = level
+        for amount, attribute in self._tracked:
+            attribute.add(self)
+            self._effective += attribute.level * amount
+        if value is None:
+            self._value = self._effective
+
+
+class Modifier(object):
+    """A temporary change to an Attribute of an AttributeList, such as from a
+    piece of equipment, an effect or a buff.
+
+    The modified level of an attribute is its level plus the amount of every
+    modifier on it (the additive layer), multiplied by the factor of every
+    modifier on it (the multiplicative layer), rounded to the nearest integer.
+
+    Modifiers are immutable so that they can be shared by snapshots.
+    """
+
+    def __init__(self, key: str, amount: int = 0, factor: float = 1.0,
+                 source: 'Any' = None,
+                 expires: 'Optional[int]' = None) -> None:
+        """Create a new Modifier.
+
+        :param key: The key of the attribute to modify, one of
+                    AttributeList.Keys
+        :param amount: The amount to add to the level of the attribute
+        :param factor: The factor to multiply the level of the attribute by
+        :param source: What the modifier comes from, used to remove every
+                       modifier of a source at once; should be picklable
+        :param expires: The game time at which the modifier is removed, or
+                        None if it never expires
+        """
+        if key not in AttributeList.Keys:
+            raise ValueError("unknown attribute key '{}'".format(key))
+        self._key = key
+        self._amount = amount
+        self._factor = factor
+        self._source = source
+        self._expires = expires
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @property
+    def factor(self) -> float:
+        return self._factor
+
+    @property
+    def source(self) -> 'Any':
+        return self._source
+
+    @property
+    def expires(self) -> 'Optional[int]':
+        return self._expires
+
+    def __repr__(self) -> str:
+        return "Modifier({!r}, {}, {}, {!r}, {})".format(
+            self._key, self._amount, self._factor, self._source,
+            self._expires
+        )
+
+
+class _ListPrimaryAttribute(_PrimaryAttributeBase):
+    """A PrimaryAttribute whose level and value are stored in the array of an
+    AttributeList rather than on the instance.
+    """
+
+    __slots__ = ('_owner', '_index', '_listeners')
+
+    def __init__(self, owner: 'AttributeList', index: int) -> None:
+        self._owner = owner
+        self._index = index
+        self._listeners = None  # type: Optional[List[AttributeChangeListener]]
+
+    @property
+    def _level(self) -> int:
+        return self._owner._data[self._index]
+
+    @_level.setter
+    def _level(self, new_value: int) -> None:
+        self._owner._writable()[self._index] = new_value
+
+    @property
+    def _value(self) -> int:
+        return self._owner._data[AttributeList._ValueOffset + self._index]
+
+    @_value.setter
+    def _value(self, new_value: int) -> None:
+        data = self._owner._writable()
+        data[AttributeList._ValueOffset + self._index] = new_value
+
+    def notify(self, notify_msg: str) -> None:
+        self._owner._notify(self._index, notify_msg)
+
+
+class _ListSecondaryAttribute(_SecondaryAttributeBase):
+    """A SecondaryAttribute stored in the array of an AttributeList.
+
+    The effective level is derived by the AttributeList from its weight
+    matrix, so the instance does not track any primary attributes itself.
+    """
+
+    __slots__ = ('_owner', '_index', '_listeners')
+
+    def __init__(self, owner: 'AttributeList', index: int) -> None:
+        self._owner = owner
+        self._index = index
+        self._listeners = None  # type: Optional[List[AttributeChangeListener]]
+
+    @property
+    def _level(self) -> int:
+        return self._owner._data[self._index]
+
+    @_level.setter
+    def _level(self, new_value: int) -> None:
+        self._owner._writable()[self._index] = new_value
+
+    @property
+    def _value(self) -> int:
+        return self._owner._data[AttributeList._ValueOffset + self._index]
+
+    @_value.setter
+    def _value(self, new_value: int) -> None:
+        data = self._owner._writable()
+        data[AttributeList._ValueOffset + self._index] = new_value
+
+    @property
+    def _effective(self) -> int:
+        return self._owner._data[AttributeList._EffectiveOffset + self._index]
+
+    @_effective.setter
+    def _effective(self, new_value: int) -> None:
+        data = self._owner._writable()
+        data[AttributeList._EffectiveOffset + self._index] = new_value
+
+    def update(self, attr: 'Attribute', msg: str) -> None:
+        pass
+
+    def notify(self, notify_msg: str) -> None:
+        self._owner._notify(self._index, notify_msg)
+
+
+def _compile_entry(key: str, data: 'Optional[AttributeData]'
+                   ) -> 'Tuple[Optional[int], Optional[int]]':
+    """Validate the stat block entry of one attribute.
+
+    :param key: The key of the attribute
+    :param data: A level, a (level, value) pair, or None
+    :return: The level and value, either of which may be None
+    """
+    if data is None:
+        return None, None
+    if type(data) is tuple or type(data) is list:
+        if len(data) != 2:
+            raise ValueError(
+                "expected (level, value) for attribute '{}'".format(key)
+            )
+        level, value = data
+    else:
+        level, value = data, None
+    for number in (level, value):
+        if number is not None and type(number) is not int:
+            raise ValueError("invalid data type {} for attribute '{}'".format(
+                type(number), key
+            ))
+    return level, value
+
+
+def _list_attribute(index: int) -> property:
+    def _get(self: 'AttributeList') -> 'Attribute':
+        return self._view(index)
+    return property(_get)
+
+
 class AttributeList(object):
     """A list of Attributes for an Actor.
 
-    This class tracks each Attribute that every Actor needs.
+    This class tracks each Attribute that every Actor needs. Functions added
+    with AttributeList.add_listener() are called with the key of an Attribute
+    (see AttributeList.Keys) whenever that Attribute changes.
+
+    Rather than holding eleven Attribute instances, the levels and values of
+    every attribute are stored in a single typed array. The effective level
+    of each secondary attribute is its own level plus the product of a row of
+    AttributeList.Weights with the primary levels, and all of them are
+    recomputed at once when a primary level changes. The attributes (e.g.
+    AttributeList.strength) are lightweight views of the array, created when
+    first used.
     """
 
+    Keys = (
+        "str", "dex", "agl", "con", "int", "wis", "cha", "lck",
+        "hp", "mp", "st"
+    )
+    PrimaryCount = 8
+
+    # One row per secondary attribute, one column per primary attribute, in
+    # the order of AttributeList.Keys
+    Weights = (
+        (3, 0, 0, 7, 0, 0, 0, 0),  # Health: 3 * str + 7 * con
+        (0, 0, 0, 0, 7, 3, 0, 0),  # Mana: 7 * int + 3 * wis
+        (0, 0, 4, 6, 0, 0, 0, 0),  # Stamina: 4 * agl + 6 * con
+    )
+
+    # The array holds the levels of every attribute, then their values, then
+    # the effective levels of the secondary attributes
+    _ValueOffset = len(Keys)
+    _EffectiveOffset = 2 * len(Keys) - PrimaryCount
+    _PackedLength = 3 * len(Keys) - PrimaryCount
+
+    strength = _list_attribute(0)
+    dexterity = _list_attribute(1)
+    agility = _list_attribute(2)
+    constitution = _list_attribute(3)
+    intelligence = _list_attribute(4)
+    wisdom = _list_attribute(5)
+    charisma = _list_attribute(6)
+    luck = _list_attribute(7)
+    health = _list_attribute(8)
+    mana = _list_attribute(9)
+    stamina = _list_attribute(10)
+
     @staticmethod
     def load(data: 'Dict[str, AttributeData]') -> 'AttributeList':
+        """Create an AttributeList from a stat block.
+
+        The entries of the attributes are removed from the dict; any other
+        entries are left for the caller. To create many lists from the same
+        stat block, compile it once with AttributeList.compile() instead.
+
+        :param data: A dict of attribute key to a level or a (level, value)
+                     pair
+        :return: A new AttributeList
+        """
+        block = {
+            key: data.pop(key) for key in AttributeList.Keys if key in data
+        }
+        return AttributeList.from_packed(AttributeList.compile(block))
+
+    @staticmethod
+    def compile(data: 'Dict[str, AttributeData]') -> 'Tuple[int, ...]':
+        """Validate a stat block and pack it into a tuple.
+
+        Every entry is checked and the secondary attributes are derived once,
+        so an actor type can compile its stat block when its package is
+        loaded, then create each AttributeList from the packed tuple with
+        AttributeList.from_packed(), which does no per-attribute work.
+
+        :param data: A dict of attribute key to a level or a (level, value)
+                     pair
+        :return: The packed attributes
+        """
+        unknown = set(data.keys()).difference(AttributeList.Keys)
+        if len(unknown) > 0:
+            raise ValueError("unknown attribute keys: {}".format(
+                ", ".join(sorted(unknown))
+            ))
+        entries = [
+            _compile_entry(key, data.get(key, None))
+            for key in AttributeList.Keys
+        ]
+
+        # The primary attributes are set before the secondary attributes are
+        # derived from them, then the secondary attributes are set
         al = AttributeList()
-        al.strength.load(data.pop("str", None))
-        al.dexterity.load(data.pop("dex", None))
-        al.agility.load(data.pop("agl", None))
-        al.constitution.load(data.pop("con", None))
-        al.intelligence.load(data.pop("int", None))
-        al.wisdom.load(data.pop("wis", None))
-        al.charisma.load(data.pop("cha", None))
-        al.luck.load(data.pop("lck", None))
-        al.health.load(data.pop("hp", None))
-        al.mana.load(data.pop("mp", None))
-        al.stamina.load(data.pop("st", None))
+        with al.batch_edit():
+            for index in range(AttributeList.PrimaryCount):
+                al._load_entry(index, entries[index])
+        for index in range(AttributeList.PrimaryCount, len(entries)):
+            al._load_entry(index, entries[index])
+        return tuple(al._data)
+
+    @staticmethod
+    def from_packed(packed: 'Sequence[int]') -> 'AttributeList':
+        """Create an AttributeList from attributes packed by
+        AttributeList.compile().
+
+        :param packed: The packed attributes
+        :return: A new AttributeList
+        """
+        if len(packed) != AttributeList._PackedLength:
+            raise ValueError("expected {} packed attributes, got {}".format(
+                AttributeList._PackedLength, len(packed)
+            ))
+        al = AttributeList.__new__(AttributeList)
+        al._init(array.array('i', packed), False)
+        return al
+
+    @staticmethod
+    def from_template(template: 'StatTemplate') -> 'AttributeList':
+        """Create an AttributeList which shares the array of a StatTemplate.
+
+        The array is copied the first time the new list is changed.
+
+        :param template: The StatTemplate to create the list from
+        :return: A new AttributeList equal to the template
+        """
+        al = AttributeList.__new__(AttributeList)
+        al._init(template._data, True)
+        return al
+
+    def share(self) -> 'AttributeList':
+        """Create an AttributeList equal to this one which shares its array.
+
+        Neither list is changed by the other: whichever is changed first
+        copies the array. Modifiers are copied, listeners are not.
+
+        :return: A new AttributeList equal to this one
+        """
+        # Both lists must copy the array before changing it, unless this list
+        # already shares it with a StatTemplate
+        self._shared = True
+        al = AttributeList.__new__(AttributeList)
+        al._init(self._data, True)
+        al._modifiers = {
+            index: list(modifiers)
+            for index, modifiers in self._modifiers.items()
+        }
+        al._expiry = list(self._expiry)
+        al._expiry_sequence = self._expiry_sequence
+        if self._snapshot_version == self._version:
+            al._snapshot = self._snapshot
+            al._snapshot_version = al._version
         return al
 
     def __init__(self) -> None:
-        self.strength = PrimaryAttribute()
-        self.dexterity = PrimaryAttribute()
-        self.agility = PrimaryAttribute()
-        self.constitution = PrimaryAttribute()
-        self.intelligence = PrimaryAttribute()
-        self.wisdom = PrimaryAttribute()
-        self.charisma = PrimaryAttribute()
-        self.luck = PrimaryAttribute()
-
-        self.health = SecondaryAttribute(
-            tracked=(
-                (3, self.strength),
-                (7, self.constitution),
+        count = len(AttributeList.Keys)
+        primaries = [10] * AttributeList.PrimaryCount
+        secondaries = [0] * (count - AttributeList.PrimaryCount)
+        self._init(array.array(
+            'i', primaries + secondaries + primaries + secondaries
+            + secondaries
+        ), False)
+        self._derive()
+
+    def _init(self, data: 'array.array', shared: bool) -> None:
+        self._data = data
+        # If the array belongs to a StatTemplate and must be copied before it
+        # is changed
+        self._shared = shared
+        self._views = None  # type: Optional[List[Optional[Attribute]]]
+        self._listeners = list()  # type: List[Callable[[str], None]]
+        self._batch_depth = 0
+        self._held = None  # type: Optional[Dict[Tuple[int, str], None]]
+        # The modifiers of each attribute index which has any, the modifiers
+        # which expire ordered by time, and the modified levels computed for
+        # each index along with the level they were computed from
+        self._modifiers = dict()  # type: Dict[int, List[Modifier]]
+        self._expiry = list()  # type: List[Tuple[int, int, Modifier]]
+        self._expiry_sequence = 0
+        self._modified = dict()  # type: Dict[int, Tuple[int, int]]
+        # Incremented whenever the array or the modifiers change, so that
+        # AttributeList.snapshot() can return its cached snapshot
+        self._version = 0
+        self._snapshot = None  # type: Optional[Tuple[Tuple[Any, ...], ...]]
+        self._snapshot_version = -1
+
+    def __getstate__(self):
+        # Listeners belong to whoever is observing this list, such as the
+        # GameData, and are not part of its state
+        state = self.__dict__.copy()
+        state['_listeners'] = list()
+        state['_views'] = None
+        state['_shared'] = False
+        state['_batch_depth'] = 0
+        state['_held'] = None
+        state['_modified'] = dict()
+        state['_snapshot'] = None
+        state['_snapshot_version'] = -1
+        return state
+
+    def __setstate__(self, state) -> None:
+        if '_data' not in state:
+            # Lists pickled before the array was introduced hold an Attribute
+            # for each key
+            attributes = (
+                state['strength'], state['dexterity'], state['agility'],
+                state['constitution'], state['intelligence'], state['wisdom'],
+                state['charisma'], state['luck'], state['health'],
+                state['mana'], state['stamina']
             )
-        )
-        self.mana = SecondaryAttribute(
-            tracked=(
-                (3, self.wisdom),
-                (7, self.intelligence),
-            )
-        )
-        self.stamina = SecondaryAttribute(
-            tracked=(
-                (6, self.constitution),
-                (4, self.agility)
+            self.__init__()
+            self.restore(tuple(attr.snapshot() for attr in attributes))
+            return
+        # Fill in any state added since the list was pickled
+        self._init(state['_data'], False)
+        self.__dict__.update(state)
+
+    def add_listener(self, listener: 'Callable[[str], None]') -> None:
+        """Add a function to call whenever an Attribute in this list changes.
+
+        :param listener: A function taking the key of the changed Attribute
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: 'Callable[[str], None]') -> None:
+        """Remove a function added by AttributeList.add_listener().
+
+        :param listener: The function to remove
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @contextlib.contextmanager
+    def batch_edit(self) -> 'Iterator[None]':
+        """Context manager which holds change notifications while several
+        attributes are edited.
+
+        Inside the context the secondary attributes are not derived and no
+        listener is notified. When the outermost context exits, the secondary
+        attributes are derived once and every listener is notified once for
+        each distinct change, secondary attributes first.
+        """
+        if self._batch_depth == 0:
+            self._held = dict()
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._release()
+
+    def attributes(self) -> 'Tuple[Attribute, ...]':
+        """Get every Attribute in this list in a fixed order.
+
+        :return: A tuple of the primary then secondary attributes
+        """
+        return tuple(self._view(i) for i in range(len(AttributeList.Keys)))
+
+    def add_modifier(self, modifier: 'Modifier') -> None:
+        """Add a Modifier to the attribute named by its key.
+
+        :param modifier: The Modifier to add
+        """
+        index = AttributeList.Keys.index(modifier.key)
+        self._modifiers.setdefault(index, list()).append(modifier)
+        if modifier.expires is not None:
+            heapq.heappush(
+                self._expiry,
+                (modifier.expires, self._expiry_sequence, modifier)
             )
+            self._expiry_sequence += 1
+        self._modifier_changed(index)
+
+    def remove_modifier(self, modifier: 'Modifier') -> bool:
+        """Remove a Modifier added by AttributeList.add_modifier().
+
+        A removed Modifier which would expire later is left in the expiry
+        queue and skipped when it becomes due.
+
+        :param modifier: The Modifier to remove
+        :return: True if the Modifier was removed
+        """
+        index = AttributeList.Keys.index(modifier.key)
+        modifiers = self._modifiers.get(index, None)
+        if modifiers is None or modifier not in modifiers:
+            return False
+        modifiers.remove(modifier)
+        if len(modifiers) == 0:
+            del self._modifiers[index]
+        self._modifier_changed(index)
+        return True
+
+    def remove_source(self, source: 'Any') -> int:
+        """Remove every Modifier which came from the given source.
+
+        :param source: The source of the modifiers to remove
+        :return: The number of modifiers which were removed
+        """
+        removed = [
+            modifier for modifiers in self._modifiers.values()
+            for modifier in modifiers if modifier.source == source
+        ]
+        for modifier in removed:
+            self.remove_modifier(modifier)
+        return len(removed)
+
+    def modifiers(self, key: str) -> 'Tuple[Modifier, ...]':
+        """Get the modifiers of an attribute.
+
+        :param key: The key of the attribute
+        :return: The Modifiers in the order they were added
+        """
+        index = AttributeList.Keys.index(key)
+        return tuple(self._modifiers.get(index, ()))
+
+    def modified_level(self, key: str) -> int:
+        """Get the level of an attribute with its modifiers applied.
+
+        The result is cached until the level or the modifiers of the
+        attribute change.
+
+        :param key: The key of the attribute
+        :return: The modified level
+        """
+        index = AttributeList.Keys.index(key)
+        if index < AttributeList.PrimaryCount:
+            level = self._data[index]
+        else:
+            level = self._data[AttributeList._EffectiveOffset + index]
+        cached = self._modified.get(index, None)
+        if cached is not None and cached[0] == level:
+            return cached[1]
+
+        amount = level
+        factor = 1.0
+        for modifier in self._modifiers.get(index, ()):
+            amount += modifier.amount
+            factor *= modifier.factor
+        modified = int(round(amount * factor))
+        self._modified[index] = (level, modified)
+        return modified
+
+    def string(self, key: str, short: bool = False) -> str:
+        """Get a string representation of an attribute with its modifiers
+        applied, in the format of Attribute.string().
+
+        The value of a primary attribute moves with its modified level and is
+        compared to its unmodified level, so that a buff shows as a bonus; the
+        value of a secondary attribute is capped by its modified level.
+
+        :param key: The key of the attribute
+        :param short: If the string should be the short version
+        :return: A string representing the modified attribute
+        """
+        index = AttributeList.Keys.index(key)
+        modified = self.modified_level(key)
+        value = self._data[AttributeList._ValueOffset + index]
+        if index < AttributeList.PrimaryCount:
+            level = self._data[index]
+            value += modified - level
+            if short or value == level:
+                return str(value)
+            return "{} [{:+}]".format(value, value - level)
+
+        value = min(value, modified)
+        if short and value == modified:
+            return str(modified)
+        return "{}/{}".format(value, modified)
+
+    def levels(self) -> 'Tuple[int, ...]':
+        """Get the level of every attribute, in the order of
+        AttributeList.Keys.
+
+        :return: The levels, without the primary attributes added to the
+                 secondary attributes
+        """
+        return tuple(self._data[:len(AttributeList.Keys)])
+
+    def values(self) -> 'Tuple[int, ...]':
+        """Get the value of every attribute, in the order of
+        AttributeList.Keys.
+
+        :return: The values
+        """
+        offset = AttributeList._ValueOffset
+        return tuple(self._data[offset:offset + len(AttributeList.Keys)])
+
+    def effective_levels(self) -> 'Tuple[int, ...]':
+        """Get the effective level of every secondary attribute, in the order
+        of AttributeList.Keys.
+
+        :return: The effective levels
+        """
+        offset = AttributeList._EffectiveOffset + AttributeList.PrimaryCount
+        return tuple(self._data[offset:])
+
+    def stage_level(self, key: str, level: int) -> bool:
+        """Set the level of a primary attribute without deriving the secondary
+        attributes or notifying listeners.
+
+        The value changes by the same amount as the level. Call
+        AttributeList.derive() and AttributeList.notify_level() afterwards.
+
+        :param key: The key of the primary attribute
+        :param level: The new level, which is at least zero
+        :return: If the level changed
+        """
+        index = AttributeList.Keys.index(key)
+        if index >= AttributeList.PrimaryCount:
+            raise ValueError("'{}' is not a primary attribute".format(key))
+        difference = max(level, 0) - self._data[index]
+        if difference == 0:
+            return False
+        data = self._writable()
+        data[index] += difference
+        data[AttributeList._ValueOffset + index] += difference
+        return True
+
+    def derive(self) -> 'List[str]':
+        """Recompute the secondary attributes from the primary levels and
+        notify the listeners of each which changed.
+
+        :return: The keys of the secondary attributes which changed
+        """
+        changed = self._derive()
+        for index in changed:
+            self._notify(index, "level")
+        return [AttributeList.Keys[index] for index in changed]
+
+    def apply_derived(self, key: str, effective: int, value: int) -> None:
+        """Set the effective level and value of a secondary attribute derived
+        elsewhere, such as by a StatBatch, without notifying listeners.
+
+        :param key: The key of the secondary attribute
+        :param effective: The new effective level
+        :param value: The new value
+        """
+        index = AttributeList.Keys.index(key)
+        if index < AttributeList.PrimaryCount:
+            raise ValueError("'{}' is not a secondary attribute".format(key))
+        data = self._writable()
+        data[AttributeList._EffectiveOffset + index] = effective
+        data[AttributeList._ValueOffset + index] = value
+
+    def notify_level(self, key: str) -> None:
+        """Notify the listeners that the level of an attribute changed.
+
+        :param key: The key of the attribute
+        """
+        self._notify(AttributeList.Keys.index(key), "level")
+
+    def next_expiry(self) -> 'Optional[int]':
+        """Get the earliest time at which a Modifier expires.
+
+        :return: The game time, or None if no Modifier expires
+        """
+        return self._expiry[0][0] if len(self._expiry) > 0 else None
+
+    def expire(self, time: int) -> int:
+        """Remove every Modifier which expires at or before the given time.
+
+        Only the modifiers which are due are touched, so this is cheap to call
+        whenever the game time changes.
+
+        :param time: The current game time
+        :return: The number of modifiers which were removed
+        """
+        removed = 0
+        expiry = self._expiry
+        while len(expiry) > 0 and expiry[0][0] <= time:
+            _, _, modifier = heapq.heappop(expiry)
+            if self.remove_modifier(modifier):
+                removed += 1
+        return removed
+
+    def snapshot(self) -> 'Tuple[Tuple[Any, ...], ...]':
+        """Get the state of every Attribute in this list.
+
+        The last element of the snapshot holds every Modifier. The snapshot is
+        cached until the list changes, so snapshots taken while the list is
+        unchanged are the same object.
+
+        :return: A tuple which can be given to AttributeList.restore()
+        """
+        if self._snapshot_version == self._version:
+            return self._snapshot
+        data = self._data
+        values = AttributeList._ValueOffset
+        effective = AttributeList._EffectiveOffset
+        self._snapshot = tuple(
+            (data[i], data[values + i]) if i < AttributeList.PrimaryCount
+            else (data[i], data[values + i], data[effective + i])
+            for i in range(len(AttributeList.Keys))
+        ) + (tuple(
+            modifier for index in sorted(self._modifiers)
+            for modifier in self._modifiers[index]
+        ),)
+        self._snapshot_version = self._version
+        return self._snapshot
+
+    def restore(self, data: 'Tuple[Tuple[Any, ...], ...]') -> None:
+        """Set the state of every Attribute in this list from a snapshot.
+
+        Listeners are notified of every Attribute which changed, including
+        those whose modifiers changed.
+
+        :param data: A tuple created by AttributeList.snapshot()
+        """
+        current = self.snapshot()
+        if data is current:
+            return
+        count = len(AttributeList.Keys)
+        changed = set()
+        offsets = (
+            0, AttributeList._ValueOffset, AttributeList._EffectiveOffset
         )
+        for i, attr_data in enumerate(data[:count]):
+            if current[i] != attr_data:
+                data_ = self._writable()
+                for offset, item in zip(offsets, attr_data):
+                    data_[offset + i] = item
+                changed.add(i)
+
+        modifiers = data[count] if len(data) > count else ()
+        if current[count] != modifiers:
+            changed.update(self._modifiers.keys())
+            self._modifiers = dict()
+            self._expiry = list()
+            self._modified = dict()
+            self._version += 1
+            for modifier in modifiers:
+                index = AttributeList.Keys.index(modifier.key)
+                self._modifiers.setdefault(index, list()).append(modifier)
+                if modifier.expires is not None:
+                    self._expiry.append(
+                        (modifier.expires, self._expiry_sequence, modifier)
+                    )
+                    self._expiry_sequence += 1
+                changed.add(index)
+            heapq.heapify(self._expiry)
+
+        if len(data) > count:
+            self._snapshot = data
+            self._snapshot_version = self._version
+        for index in sorted(changed):
+            self._notify_key(index)
+
+    def _view(self, index: int) -> 'Attribute':
+        if self._views is None:
+            self._views = [None] * len(AttributeList.Keys)
+        view = self._views[index]
+        if view is None:
+            if index < AttributeList.PrimaryCount:
+                view = _ListPrimaryAttribute(self, index)
+            else:
+                view = _ListSecondaryAttribute(self, index)
+            self._views[index] = view
+        return view
+
+    def _load_entry(self, index: int,
+                    entry: 'Tuple[Optional[int], Optional[int]]') -> None:
+        level, value = entry
+        attr = self._view(index)
+        if level is not None:
+            attr.level = level
+        if value is not None:
+            attr.value = value
+
+    def _writable(self) -> 'array.array':
+        """Get the array of this list, copying it first if it is shared with
+        a StatTemplate.
+
+        :return: The array, which may be changed
+        """
+        self._version += 1
+        if self._shared:
+            self._data = array.array('i', self._data)
+            self._shared = False
+        return self._data
+
+    def _derive(self) -> 'List[int]':
+        """Recompute the effective level of every secondary attribute from the
+        primary levels.
+
+        A secondary attribute which gains levels gains the same amount of
+        value, while one which loses levels only has its value capped.
+
+        :return: The indices of the secondary attributes which changed
+        """
+        data = self._data
+        levels = data[:AttributeList.PrimaryCount]
+        changed = list()  # type: List[int]
+        for row, weights in enumerate(AttributeList.Weights):
+            index = AttributeList.PrimaryCount + row
+            effective = data[index] + sum(map(operator.mul, weights, levels))
+            slot = AttributeList._EffectiveOffset + index
+            difference = effective - data[slot]
+            if difference == 0:
+                continue
+            data = self._writable()
+            data[slot] = effective
+            value = AttributeList._ValueOffset + index
+            if difference > 0:
+                data[value] += difference
+            elif data[value] > effective:
+                data[value] = effective
+            changed.append(index)
+        return changed
+
+    def _notify(self, index: int, msg: str) -> None:
+        """Notify the listeners of the Attribute at index, and of this list.
+
+        :param index: The index of the Attribute which changed
+        :param msg: Indicator of what changed
+        """
+        if self._held is not None:
+            self._held[(index, msg)] = None
+            return
+        if self._views is not None and self._views[index] is not None:
+            Attribute.notify(self._views[index], msg)
+        if msg == "level" and index < AttributeList.PrimaryCount:
+            for changed in self._derive():
+                self._notify(changed, "level")
+        self._notify_key(index)
+
+    def _modifier_changed(self, index: int) -> None:
+        self._version += 1
+        self._modified.pop(index, None)
+        if self._held is not None:
+            self._held[(index, "modifier")] = None
+        else:
+            self._notify_key(index)
+
+    def _notify_key(self, index: int) -> None:
+        key = AttributeList.Keys[index]
+        for listener in self._listeners:
+            listener(key)
+
+    def _release(self) -> None:
+        """Derive the secondary attributes and deliver the notifications held
+        by AttributeList.batch_edit().
+        """
+        held = self._held
+        self._held = None
+        notifications = dict()  # type: Dict[Tuple[int, str], None]
+        if any(msg == "level" and index < AttributeList.PrimaryCount
+               for index, msg in held):
+            for changed in self._derive():
+                notifications[(changed, "level")] = None
+        notifications.update(held)
+
+        notified = set()
+        views = self._views
+        for index, msg in notifications:
+            if views is not None and views[index] is not None and \
+                    msg != "modifier":
+                Attribute.notify(views[index], msg)
+            if index not in notified:
+                notified.add(index)
+                self._notify_key(index)
+
+
+class StatTemplate(object):
+    """The attributes shared by every instance of an actor type.
+
+    A StatTemplate loads its attributes once, when the actor type is defined.
+    Every AttributeList created from it with StatTemplate.create() references
+    the array of the template until it is changed, so creating a monster
+    costs little more than the AttributeList object itself. The template is
+    never changed.
+    """
+
+    def __init__(self, data: 'Dict[str, AttributeData]') -> None:
+        """Create a new StatTemplate.
+
+        :param data: The attribute data, in the format of AttributeList.load()
+        """
+        self._data = array.array('i', AttributeList.compile(data))
+
+    def create(self) -> 'AttributeList':
+        """Create a new AttributeList from this template.
+
+        :return: A new AttributeList sharing the array of this template
+        """
+        return AttributeList.from_template(self)
+
+    def snapshot(self) -> 'Tuple[Tuple[Any, ...], ...]':
+        """Get the attributes of this template.
+
+        :return: A tuple in the format of AttributeList.snapshot()
+        """
+        return self.create().snapshot()
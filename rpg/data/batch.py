@@ -0,0 +1,187 @@
+"""Computing the attributes of many actors at once.
+
+Updating the derived attributes of one AttributeList at a time is fine for the
+player, but simulations which tick hundreds of monsters or NPCs spend most of
+their time in the Python overhead of doing so. A StatBatch stacks the arrays
+of many AttributeLists into one matrix and, in a single call, derives the
+health, mana and stamina of every actor, the modifier of each primary
+attribute (its value minus its level) and the display color of each secondary
+attribute. The derived attributes are written back to the AttributeLists,
+whose listeners are notified as usual.
+
+NumPy is used for the computation when it is installed. It is an optional
+dependency; without it the same results are computed in pure Python, one
+AttributeList at a time.
+
+    batch = StatBatch([monster.stats for monster in encounter])
+    batch.compute()
+    for stats, colors in zip(batch.stats, batch.colors):
+        ...
+"""
+
+from rpg.data.attributes import AttributeList, SecondaryAttribute
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import typing
+if typing.TYPE_CHECKING:
+    from typing import List, Optional, Sequence, Tuple
+
+# The colors of a SecondaryAttribute in order of increasing value to level
+# ratio, separated by the thresholds below
+_Colors = (
+    SecondaryAttribute.ColorHurt, SecondaryAttribute.ColorPoor,
+    SecondaryAttribute.ColorOkay, SecondaryAttribute.ColorGood,
+    SecondaryAttribute.ColorBuffed
+)
+_Thresholds = (
+    SecondaryAttribute.ThresholdHurt, SecondaryAttribute.ThresholdPoor,
+    SecondaryAttribute.ThresholdOkay, SecondaryAttribute.ThresholdGood
+)
+
+
+def has_numpy() -> bool:
+    return numpy is not None
+
+
+class StatBatch(object):
+    """Derives the attributes of many AttributeLists at once."""
+
+    def __init__(self, stats: 'Sequence[AttributeList]',
+                 use_numpy: 'Optional[bool]' = None) -> None:
+        """Create a new StatBatch.
+
+        :param stats: The AttributeLists to compute
+        :param use_numpy: If NumPy should be used, or None to use it when it
+                          is installed
+        """
+        if use_numpy is None:
+            use_numpy = has_numpy()
+        elif use_numpy and not has_numpy():
+            raise ImportError("StatBatch requires numpy to be installed")
+        self.stats = list(stats)
+        self.modifiers = list()  # type: List[Tuple[int, ...]]
+        self.colors = list()  # type: List[Tuple[str, ...]]
+        self._use_numpy = use_numpy
+        self._pending = list()  # type: List[Tuple[int, str]]
+
+    def set_levels(self, key: str, levels: 'Sequence[int]') -> None:
+        """Set the level of a primary attribute of every AttributeList.
+
+        Secondary attributes are not derived and listeners are not notified
+        until StatBatch.compute() is called, so many primary attributes can
+        be changed for the cost of a single computation.
+
+        :param key: The key of the primary attribute, e.g. "str"
+        :param levels: The new level for each AttributeList in the batch
+        """
+        index = AttributeList.Keys.index(key)
+        if index >= AttributeList.PrimaryCount:
+            raise ValueError("'{}' is not a primary attribute".format(key))
+        if len(levels) != len(self.stats):
+            raise ValueError("expected {} levels, got {}".format(
+                len(self.stats), len(levels)
+            ))
+        for row, (stats, level) in enumerate(zip(self.stats, levels)):
+            if stats.stage_level(key, level):
+                self._pending.append((row, key))
+
+    def compute(self) -> int:
+        """Derive the secondary attributes of every AttributeList, and the
+        modifiers and colors of the batch.
+
+        After computing, StatBatch.modifiers holds the modifier of each
+        primary attribute and StatBatch.colors holds the color of each
+        secondary attribute, in the order of AttributeList.Keys, for every
+        AttributeList in the batch.
+
+        :return: The number of secondary attributes which changed
+        """
+        if self._use_numpy:
+            changed = self._compute_numpy()
+        else:
+            changed = self._compute_python()
+        pending = self._pending
+        self._pending = list()
+        for row, key in pending:
+            self.stats[row].notify_level(key)
+        return changed
+
+    def _compute_python(self) -> int:
+        primaries = AttributeList.PrimaryCount
+        changed_count = 0
+        self.modifiers = list()
+        self.colors = list()
+        for stats in self.stats:
+            changed_count += len(stats.derive())
+
+            levels = stats.levels()
+            values = stats.values()
+            self.modifiers.append(tuple(
+                values[i] - levels[i] for i in range(primaries)
+            ))
+            self.colors.append(tuple(
+                SecondaryAttribute.color_of(value, effective)
+                for value, effective in zip(
+                    values[primaries:], stats.effective_levels()
+                )
+            ))
+        return changed_count
+
+    def _compute_numpy(self) -> int:
+        primaries = AttributeList.PrimaryCount
+        self.modifiers = list()
+        self.colors = list()
+        if len(self.stats) == 0:
+            return 0
+
+        levels = numpy.array(
+            [stats.levels() for stats in self.stats], dtype=numpy.int64
+        )
+        values = numpy.array(
+            [stats.values() for stats in self.stats], dtype=numpy.int64
+        )
+        old_effective = numpy.array(
+            [stats.effective_levels() for stats in self.stats],
+            dtype=numpy.int64
+        )
+        weights = numpy.array(AttributeList.Weights, dtype=numpy.int64)
+        level = levels[:, primaries:]
+        value = values[:, primaries:]
+
+        new_effective = level + levels[:, :primaries] @ weights.T
+        difference = new_effective - old_effective
+        # A gain of levels is also gained as value, a loss only caps the value
+        new_value = numpy.where(
+            difference > 0, value + difference,
+            numpy.where(
+                difference < 0, numpy.minimum(value, new_effective), value
+            )
+        )
+
+        modifiers = values[:, :primaries] - levels[:, :primaries]
+        ratio = new_value / numpy.maximum(new_effective, 1)
+        buckets = numpy.digitize(ratio, _Thresholds, right=True)
+        buckets[new_effective <= 0] = 0
+        self.modifiers = [tuple(row) for row in modifiers.tolist()]
+        self.colors = [
+            tuple(_Colors[bucket] for bucket in row)
+            for row in buckets.tolist()
+        ]
+
+        # Write back and notify only the attributes which changed
+        changed = numpy.nonzero(difference)
+        new_effective = new_effective.tolist()
+        new_value = new_value.tolist()
+        keys = AttributeList.Keys[primaries:]
+        for row, column in zip(*(axis.tolist() for axis in changed)):
+            self.stats[row].apply_derived(
+                keys[column], new_effective[row][column],
+                new_value[row][column]
+            )
+        for row, column in zip(*(axis.tolist() for axis in changed)):
+            self.stats[row].notify_level(keys[column])
+        return len(changed[0])
@@ -0,0 +1,244 @@
+"""Bit-packed storage for boolean game flags.
+
+Most of the state a package keeps about the world is a boolean: if a location
+has been visited, if an NPC has been talked to, if a quest step is done. Rather
+than storing each of these as a variable, packages declare their flags when
+they are loaded by defining a 'Flags' package variable holding a list of flag
+names. Each flag is given a dense index in a FlagRegistry, and the values of
+all flags are kept in a single FlagSet as one bit each.
+
+Declared flags are named "<package>.<flag>"; a package 'base' declaring
+Flags = ["met_blacksmith"] can test the flag "base.met_blacksmith".
+"""
+
+import typing
+if typing.TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Union
+    FlagKey = Union[str, int]
+
+# A FlagMask is a tuple of (byte index, bits) pairs, used for bulk queries
+FlagMask = typing.Tuple[typing.Tuple[int, int], ...]
+
+
+class FlagRegistry(object):
+    """Assigns a dense index to every declared flag name."""
+
+    def __init__(self) -> None:
+        self._indexes = dict()  # type: Dict[str, int]
+        self._names = list()  # type: List[str]
+        self._frozen = False
+
+    def declare(self, name: str) -> int:
+        """Declare a flag, returning its index.
+
+        Declaring a flag which already exists returns the existing index.
+
+        :param name: The full name of the flag
+        :return: The index of the flag
+        """
+        index = self._indexes.get(name, None)
+        if index is None:
+            if self._frozen:
+                raise ValueError(
+                    "can not declare flag '{}'; the registry is frozen".format(
+                        name
+                    )
+                )
+            index = len(self._names)
+            self._indexes[name] = index
+            self._names.append(name)
+        return index
+
+    def index(self, key: 'FlagKey') -> int:
+        """Get the index of a flag.
+
+        :param key: The name or index of the flag
+        :return: The index of the flag
+        """
+        if type(key) is int:
+            if key < 0 or key >= len(self._names):
+                raise IndexError("flag index {} out of range".format(key))
+            return key
+        return self._indexes[key]
+
+    def names(self) -> 'List[str]':
+        """Get the names of every declared flag, ordered by index.
+
+        :return: A list of flag names
+        """
+        return list(self._names)
+
+    def mask(self, keys: 'Iterable[FlagKey]') -> 'FlagMask':
+        """Compile a group of flags into a mask used for bulk queries.
+
+        Masks should be compiled once and reused; see FlagSet.all() and
+        FlagSet.any().
+
+        :param keys: The names or indexes of the flags
+        :return: A FlagMask for the flags
+        """
+        masks = dict()  # type: Dict[int, int]
+        for key in keys:
+            index = self.index(key)
+            byte = index >> 3
+            masks[byte] = masks.get(byte, 0) | (1 << (index & 7))
+        return tuple(sorted(masks.items()))
+
+    def freeze(self) -> None:
+        """Prevent any more flags from being declared or removed.
+
+        A registry is frozen when it is shared by several games, so that one
+        game can not change the flags of the others.
+        """
+        self._frozen = True
+
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def clear(self) -> None:
+        """Remove every declared flag."""
+        if self._frozen:
+            raise ValueError("can not clear a frozen flag registry")
+        self._indexes.clear()
+        self._names.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._indexes
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class FlagSet(object):
+    """The values of every flag in a FlagRegistry, stored as a bitset."""
+
+    def __init__(self, registry: 'FlagRegistry') -> None:
+        """Create a new FlagSet with every flag cleared.
+
+        :param registry: The FlagRegistry used to look up flag names
+        """
+        self.registry = registry
+        self._bits = bytearray()
+        self._version = 0
+        self._snapshot = b""
+        self._snapshot_version = 0
+
+    def test(self, key: 'FlagKey') -> bool:
+        """Check if a flag is set.
+
+        :param key: The name or index of the flag
+        :return: If the flag is set
+        """
+        index = self.registry.index(key)
+        byte = index >> 3
+        if byte >= len(self._bits):
+            return False
+        return (self._bits[byte] >> (index & 7)) & 1 != 0
+
+    def set(self, key: 'FlagKey', value: bool = True) -> None:
+        """Set or clear a flag.
+
+        :param key: The name or index of the flag
+        :param value: If the flag should be set
+        """
+        index = self.registry.index(key)
+        byte = index >> 3
+        if byte >= len(self._bits):
+            if not value:
+                return
+            self._bits.extend(bytes(byte + 1 - len(self._bits)))
+        old = self._bits[byte]
+        if value:
+            self._bits[byte] = old | (1 << (index & 7))
+        else:
+            self._bits[byte] = old & ~(1 << (index & 7))
+        if self._bits[byte] != old:
+            self._version += 1
+
+    def all(self, mask: 'FlagMask') -> bool:
+        """Check if every flag in a mask is set.
+
+        :param mask: A mask created by FlagRegistry.mask()
+        :return: If every flag in the mask is set
+        """
+        bits = self._bits
+        length = len(bits)
+        for byte, byte_mask in mask:
+            if byte >= length or bits[byte] & byte_mask != byte_mask:
+                return False
+        return True
+
+    def any(self, mask: 'FlagMask') -> bool:
+        """Check if at least one flag in a mask is set.
+
+        :param mask: A mask created by FlagRegistry.mask()
+        :return: If any flag in the mask is set
+        """
+        bits = self._bits
+        length = len(bits)
+        for byte, byte_mask in mask:
+            if byte < length and bits[byte] & byte_mask != 0:
+                return True
+        return False
+
+    def count(self) -> int:
+        """Get the number of flags which are set.
+
+        :return: The number of set flags
+        """
+        return bin(int.from_bytes(self._bits, 'little')).count("1")
+
+    def clear(self) -> None:
+        """Clear every flag."""
+        if len(self._bits) > 0:
+            self._bits = bytearray()
+            self._version += 1
+
+    def to_bytes(self) -> bytes:
+        """Get the raw bits of this FlagSet.
+
+        Bit i of byte n holds the flag with index 8 * n + i. Trailing zero
+        bytes are not included.
+
+        :return: The flag bits as bytes
+        """
+        return bytes(self._bits).rstrip(b"\0")
+
+    def from_bytes(self, data: bytes) -> None:
+        """Set every flag from bytes created by FlagSet.to_bytes().
+
+        :param data: The raw flag bits
+        """
+        self._bits = bytearray(data)
+        self._version += 1
+
+    def snapshot(self) -> bytes:
+        """Get an immutable copy of the flags.
+
+        The copy is cached until a flag changes, so snapshots taken while the
+        flags are unchanged are the same object.
+
+        :return: The flag bits as bytes
+        """
+        if self._snapshot_version != self._version:
+            self._snapshot = self.to_bytes()
+            self._snapshot_version = self._version
+        return self._snapshot
+
+    def restore(self, snapshot: bytes) -> None:
+        """Set every flag from a snapshot created by FlagSet.snapshot().
+
+        :param snapshot: The snapshot to restore
+        """
+        self.from_bytes(snapshot)
+        self._snapshot = snapshot
+        self._snapshot_version = self._version
+
+    def __contains__(self, key: 'FlagKey') -> bool:
+        return self.test(key)
+
+    def __getitem__(self, key: 'FlagKey') -> bool:
+        return self.test(key)
+
+    def __setitem__(self, key: 'FlagKey', value: bool) -> None:
+        self.set(key, value)
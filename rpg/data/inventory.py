@@ -1,16 +1,29 @@
 
+from rpg import changes, util
 from rpg.data import item, resource
 
 import typing
 if typing.TYPE_CHECKING:
     from rpg.app import Game
-    from typing import List, Optional
+    from typing import Dict, List, Optional, Tuple
+    InventorySnapshot = Tuple[Tuple['ItemInstance', int], ...]
 
 
 class ItemInstance(object):
-    def __init__(self, resource_id: str, game: 'Optional[Game]' = None):
+    __slots__ = ('_resource_id', '_item_obj', '_unique')
+
+    def __init__(self, resource_id: str, game: 'Optional[Game]' = None,
+                 unique: bool = False):
+        """Create a new ItemInstance.
+
+        :param resource_id: The resource_id of the item
+        :param game: The Game to bind the instance to, if any
+        :param unique: If the instance is a single unit with state of its
+                       own, which is never grouped with other units
+        """
         self._resource_id = resource_id
         self._item_obj = None
+        self._unique = unique
         if game is not None:
             self.bind(game)
 
@@ -27,23 +40,41 @@ class ItemInstance(object):
     def unbind(self):
         self._item_obj = None
 
+    def __getstate__(self):
+        # Never serialize the bound item; it is looked up again on bind()
+        return getattr(self, '__dict__', None), {
+            '_resource_id': self._resource_id, '_item_obj': None,
+            '_unique': self._unique
+        }
+
+    def __setstate__(self, state):
+        self._unique = False
+        util.set_slot_state(self, state)
+
     def item(self) -> 'Optional[item.Item]':
         return self._item_obj
 
+    def unique(self) -> bool:
+        return self._unique
+
     def resource_id(self) -> str:
         return self._resource_id
 
 
 class ItemStack(object):
+    __slots__ = ('_item', '_count', '_owner')
+
     def __init__(self, item_instance: ItemInstance, count: int):
         self._item = item_instance
         self._count = count
+        # The Inventory holding this stack, which keeps totals of its stacks
+        self._owner = None  # type: Optional[Inventory]
 
     def weight(self) -> float:
         return self._item.item().weight() * self._count
 
     def value(self) -> int:
-        return self._item.item().value() * self._count
+        return self._item.item().value * self._count
 
     def item(self) -> ItemInstance:
         return self._item
@@ -53,53 +84,184 @@ class ItemStack(object):
 
     def inc(self, amount=1) -> int:
         self._count += amount
+        if self._owner is not None:
+            self._owner._count_changed(self, amount)
         return self._count
 
     def dec(self, amount=1) -> int:
         self._count -= amount
+        if self._owner is not None:
+            self._owner._count_changed(self, -amount)
         return self._count
 
+    def __getstate__(self):
+        # The owner is not serialized; the Inventory sets it when unpickled
+        return None, {'_item': self._item, '_count': self._count}
+
+    def __setstate__(self, state):
+        self._owner = None
+        util.set_slot_state(self, state)
+
 
 class Inventory(object):
+    """The items carried by an actor.
+
+    Stacks are kept in a dict keyed by an increasing slot number, which keeps
+    them in the order they were added and removes one without shifting the
+    others. A second dict indexes the stacks by the resource_id of their item,
+    so that adding and removing items does not scan the whole inventory.
+
+    Items which are not stackable are still stored as one stack per item,
+    which counts as one slot per unit and is shown as one row per unit by
+    Inventory.units(). A unit only gets a stack and an ItemInstance of its own
+    when it is given state of its own with Inventory.separate().
+
+    The total weight and value of the carried items, overall and by item type,
+    are updated whenever a stack is added, removed or its count changes, so
+    reading them is free. Items which are not bound do not count towards the
+    totals.
+    """
+
     def __init__(self):
         self._weight = 0.0
-        self.slots = list()  # type: List[ItemStack]
+        self._value = 0
+        self._type_totals: 'Dict[item.ItemType, Tuple[float, int]]'
+        self._type_totals = dict()
+        self._slots = dict()  # type: Dict[int, ItemStack]
+        self._index = dict()  # type: Dict[str, Dict[int, ItemStack]]
+        self._next_slot = 0
+        # The slot of the stack new items are added to, for each resource_id
+        self._groups = dict()  # type: Dict[str, int]
+        # The number of slots used, counting units of unstackable items
+        self._used_slots = 0
         self._equipped: 'List[Optional[ItemStack]]'
         self._equipped = [None for _ in range(item.EquipSlot.COUNT)]
         self._game = None  # type: Optional[Game]
         self._max_slots = 100
+        self._reset_snapshot()
+
+    @property
+    def slots(self) -> 'List[ItemStack]':
+        """The stacks in this inventory, in the order they were added."""
+        return list(self._slots.values())
 
     def bind(self, game: 'Game'):
         if self._game is not None:
             self.unbind()
         self._game = game
-        new_slots = list()  # type: List[ItemStack]
-        for item_stack in self.slots:
+        old_slots = self.slots
+        self._clear()
+        for item_stack in old_slots:
             item_stack.item().bind(game)
             if item_stack.item().item() is not None:
                 if item_stack.item().item().stackable():
-                    new_slots.append(item_stack)
+                    self._append(item_stack)
                 else:
                     count = min(
                         item_stack.count(),
-                        self._max_slots - len(new_slots)
+                        self._max_slots - self._used_slots
                     )
-                    for i in range(count):
-                        new_slots.append(ItemStack(item_stack.item(), 1))
-                    if len(new_slots) >= self._max_slots:
-                        return
+                    if item_stack.item().unique():
+                        if count > 0:
+                            self._append(ItemStack(item_stack.item(), count))
+                    else:
+                        # Inventories from before units were grouped hold a
+                        # stack for every unit, which are merged here
+                        self._add_to_group(item_stack.item(), count)
+                    if self._used_slots >= self._max_slots:
+                        break
             else:
                 game.log.error(
                     "Could not find item with resource_id: {}",
                     item_stack.item().resource_id()
                 )
-        self.slots = new_slots
 
     def unbind(self):
         self._game = None
-        for stack in self.slots:
+        for stack in self._slots.values():
             stack.item().unbind()
 
+    def __getstate__(self):
+        # The Game instance is not part of the inventory state
+        state = self.__dict__.copy()
+        state['_game'] = None
+        del state['_snapshot'], state['_entries']
+        return state
+
+    def __setstate__(self, state):
+        # Inventories pickled before the index was added keep a list
+        slots = state.pop('slots', None)
+        self.__dict__.update(state)
+        self._reset_snapshot()
+        if slots is None:
+            slots = list(self._slots.values())
+        # The pickled totals are not used; the items are unbound now, so they
+        # count for nothing until bind() counts them again
+        self._slots = dict()
+        self._clear()
+        for stack in slots:
+            self._append(stack)
+
+    def stacks(self, item_id: str) -> 'List[ItemStack]':
+        """Get the stacks of an item, in the order they were added.
+
+        :param item_id: The resource_id of the item
+        :return: A list of the stacks, which is empty if none are carried
+        """
+        return list(self._index.get(item_id, {}).values())
+
+    def units(self) -> 'List[Tuple[int, ItemStack, int]]':
+        """Get the rows the contents of this inventory are displayed as.
+
+        Every stack of a stackable item is one row, every unit of an item
+        which is not stackable is a row of its own.
+
+        :return: A list of (slot, stack, count shown) in display order; the
+                 slot can be given to Inventory.remove_slot()
+        """
+        rows = list()  # type: List[Tuple[int, ItemStack, int]]
+        for slot, stack in self._slots.items():
+            item_obj = stack.item().item()
+            if item_obj is None or item_obj.stackable():
+                rows.append((slot, stack, stack.count()))
+            else:
+                rows.extend((slot, stack, 1) for _ in range(stack.count()))
+        return rows
+
+    def separate(self, item_id: str) -> 'Optional[ItemStack]':
+        """Take one unit of an item out of its group, so that it can be given
+        state of its own.
+
+        The unit gets a new, unique ItemInstance and is moved to the end of
+        the inventory. Items added later are never added to its stack.
+
+        :param item_id: The resource_id of the item
+        :return: The stack of the separated unit, or None if no grouped unit
+                 of the item is carried
+        """
+        slot = self._groups.get(item_id, None)
+        if slot is None:
+            return None
+        group = self._slots[slot]
+        unit = ItemStack(ItemInstance(item_id, unique=True), 1)
+        if self._game is not None:
+            unit.item().bind(self._game)
+        group.dec()
+        if group.count() <= 0:
+            self._discard(item_id, slot)
+        self._append(unit)
+        return unit
+
+    def count(self, item_id: str) -> int:
+        """Get how many of an item are carried.
+
+        :param item_id: The resource_id of the item
+        :return: The total count of all stacks of the item
+        """
+        return sum(
+            stack.count() for stack in self._index.get(item_id, {}).values()
+        )
+
     def add(self, item_id, count: int = 1) -> int:
         if count <= 0:
             return 0
@@ -113,71 +275,215 @@ class Inventory(object):
                     item_instance.resource_id()
                 )
                 return 0
-            if item_instance.item().stackable():
-                for carried_item in self.slots:
-                    if carried_item.item().resource_id() == item_id:
-                        carried_item.inc(count)
-                        return count
-                if len(self.slots) < self._max_slots:
-                    self.slots.append(ItemStack(item_instance, count))
-                    return count
-            else:
-                count = min(count, self._max_slots - len(self.slots))
-                for i in range(count):
-                    self.slots.append(ItemStack(item_instance, 1))
-                return count
+            if not item_instance.item().stackable():
+                count = min(count, self._max_slots - self._used_slots)
+            count = self._add_to_group(item_instance, count)
+            if count > 0:
+                self._changed(item_id)
+            return count
         else:
-            for carried_item in self.slots:
-                if carried_item.item().resource_id() == item_id:
-                    carried_item.inc(count)
-                    return count
-            self.slots.append(ItemStack(item_instance, count))
+            # Unbound inventories do not know which items are stackable;
+            # bind() limits the units of items which are not
+            return self._add_to_group(item_instance, count)
+
+    def _add_to_group(self, item_instance: ItemInstance, count: int) -> int:
+        if count <= 0:
+            return 0
+        slot = self._groups.get(item_instance.resource_id(), None)
+        if slot is not None:
+            self._slots[slot].inc(count)
             return count
+        item_obj = item_instance.item()
+        if (self._game is not None and item_obj is not None and
+                item_obj.stackable() and
+                self._used_slots >= self._max_slots):
+            return 0
+        self._append(ItemStack(item_instance, count))
+        return count
+
+    def _append(self, stack: ItemStack) -> None:
+        stack._owner = self
+        if self._per_unit(stack) is False:
+            self._used_slots += 1
+        self._count_changed(stack, stack.count())
+        slot = self._next_slot
+        self._next_slot += 1
+        self._slots[slot] = stack
+        item_id = stack.item().resource_id()
+        stacks = self._index.get(item_id, None)
+        if stacks is None:
+            stacks = self._index[item_id] = dict()
+        stacks[slot] = stack
+        if not stack.item().unique() and item_id not in self._groups:
+            self._groups[item_id] = slot
+
+    def _discard(self, item_id: str, slot: int) -> None:
+        self._version += 1
+        stack = self._slots.pop(slot)
+        stack._owner = None
+        stacks = self._index[item_id]
+        del stacks[slot]
+        if len(stacks) == 0:
+            del self._index[item_id]
+        if self._groups.get(item_id, None) == slot:
+            del self._groups[item_id]
+        if len(self._slots) == 0:
+            # Start again from exact zeros rather than accumulated rounding
+            self._reset_totals()
+        else:
+            if self._per_unit(stack) is False:
+                self._used_slots -= 1
+            self._count_changed(stack, -stack.count())
+
+    @staticmethod
+    def _per_unit(stack: ItemStack) -> 'Optional[bool]':
+        """Check if every unit of a stack uses a slot of its own.
+
+        :param stack: The stack to check
+        :return: If the item of the stack is not stackable, or None if the
+                 stack is not bound
+        """
+        item_obj = stack.item().item()
+        if item_obj is None:
+            return None
+        return not item_obj.stackable()
 
-    def _remove_ids(self, ids: 'List[int]'):
-        prev = len(self.slots) + 1
-        for i in reversed(ids):
-            if i != prev:
-                self.slots.pop(i)
-            prev = i
+    def _reset_snapshot(self) -> None:
+        # Incremented whenever a stack is added, removed or its count changes,
+        # so that Inventory.snapshot() can return its cached snapshot
+        self._version = 0
+        self._snapshot = None  # type: Optional[InventorySnapshot]
+        self._snapshot_version = -1
+        # The entry of the cached snapshot for each slot
+        self._entries = dict()  # type: Dict[int, Tuple[ItemInstance, int]]
+
+    def _clear(self) -> None:
+        self._version += 1
+        for stack in self._slots.values():
+            stack._owner = None
+        self._slots = dict()
+        self._index = dict()
+        self._groups = dict()
+        self._next_slot = 0
+        self._reset_totals()
+
+    def _reset_totals(self) -> None:
+        self._weight = 0.0
+        self._value = 0
+        self._type_totals = dict()
+        self._used_slots = 0
+
+    def _count_changed(self, stack: ItemStack, amount: int) -> None:
+        """Update the totals after the count of a stack changed.
+
+        :param stack: The stack whose count changed
+        :param amount: How many items were added to the stack, or removed if
+                       negative
+        """
+        self._version += 1
+        item_obj = stack.item().item()
+        if item_obj is None:
+            return
+        weight = item_obj.weight() * amount
+        value = item_obj.value * amount
+        self._weight += weight
+        self._value += value
+        if not item_obj.stackable():
+            self._used_slots += amount
+        item_type = item_obj.type
+        type_weight, type_value = self._type_totals.get(item_type, (0.0, 0))
+        self._type_totals[item_type] = (
+            type_weight + weight, type_value + value
+        )
 
     def update(self):
-        _remove = list()
-        for i, stack in enumerate(self.slots):
-            if stack.count() <= 0:
-                _remove.append(i)
-        self._remove_ids(_remove)
+        """Remove the stacks whose count dropped to zero."""
+        empty = [
+            (stack.item().resource_id(), slot)
+            for slot, stack in self._slots.items() if stack.count() <= 0
+        ]
+        for item_id, slot in empty:
+            self._discard(item_id, slot)
 
     def remove(self, item_id: str, count: int = 1) -> int:
         removed = 0
-        left = count
-        if self._game is not None:
-            remove_ids = list()
-            for i in range(len(self.slots)):
-                stack = self.slots[i]
-                if stack.item().resource_id() == item_id:
-                    if stack.count() > left:
-                        stack.dec(left)
-                        self._remove_ids(remove_ids)
-                        removed += left
-                        break
-                    else:
-                        remove_ids.append(i)
-                        left -= stack.count()
-                        removed += stack.count()
-            self._remove_ids(remove_ids)
-            return removed
-        else:
-            for i in range(len(self.slots)):
-                stack = self.slots[i]
-                if stack.item().resource_id() == item_id:
-                    if stack.count() > count:
-                        stack.dec(count)
-                        return count
-                    removed = stack.count()
-                    self.slots.pop(i)
-                    return removed
+        stacks = self._index.get(item_id, None)
+        while stacks and removed < count:
+            slot, stack = next(iter(stacks.items()))
+            left = count - removed
+            if stack.count() > left:
+                stack.dec(left)
+                removed += left
+            else:
+                removed += stack.count()
+                self._discard(item_id, slot)
+        if removed > 0 and self._game is not None:
+            self._changed(item_id)
+        return removed
+
+    def remove_slot(self, slot: int, count: int = 1) -> int:
+        """Remove items from one particular stack, such as the one a row of
+        the inventory UI shows.
+
+        :param slot: The slot of the stack, see Inventory.units()
+        :param count: How many items to remove
+        :return: How many items were removed
+        """
+        stack = self._slots.get(slot, None)
+        if stack is None or count <= 0:
             return 0
+        item_id = stack.item().resource_id()
+        removed = min(count, stack.count())
+        if removed < stack.count():
+            stack.dec(removed)
+        else:
+            self._discard(item_id, slot)
+        if self._game is not None:
+            self._changed(item_id)
+        return removed
+
+    def _changed(self, item_id: str) -> None:
+        """Publish a change of the given item on the bound Game."""
+        self._game.state.changes.publish(changes.Change.Inventory, item_id)
+
+    def snapshot(self) -> 'InventorySnapshot':
+        """Get the contents of this inventory as a tuple.
+
+        The ItemInstance objects are shared with the inventory rather than
+        copied. The snapshot is cached until the inventory changes, and the
+        entry of every stack which did not change since the last snapshot is
+        shared with it.
+
+        :return: A tuple which can be given to Inventory.restore()
+        """
+        if self._snapshot_version == self._version:
+            return self._snapshot
+        entries = dict()  # type: Dict[int, Tuple[ItemInstance, int]]
+        previous = self._entries
+        for slot, stack in self._slots.items():
+            entry = previous.get(slot, None)
+            if (entry is None or entry[0] is not stack.item()
+                    or entry[1] != stack.count()):
+                entry = (stack.item(), stack.count())
+            entries[slot] = entry
+        self._entries = entries
+        self._snapshot = tuple(entries.values())
+        self._snapshot_version = self._version
+        return self._snapshot
+
+    def restore(self, data: 'InventorySnapshot') -> None:
+        """Replace the contents of this inventory with a snapshot.
+
+        :param data: A tuple created by Inventory.snapshot()
+        """
+        if data is self.snapshot():
+            return
+        self._clear()
+        for instance, count in data:
+            self._append(ItemStack(instance, count))
+        self._entries = dict(zip(self._slots, data))
+        self._snapshot = data
+        self._snapshot_version = self._version
 
     def equip(self, slot_id: int, count: int) -> None:
         pass
@@ -185,12 +491,28 @@ class Inventory(object):
     def unequip(self, equip_slot: item.EquipSlot) -> None:
         pass
 
-    def weight(self) -> float:
-        return self._weight
+    def weight(self, item_type: 'Optional[item.ItemType]' = None) -> float:
+        """Get the total weight of the carried items.
+
+        :param item_type: Only count items of this type, or None for all items
+        :return: The total weight
+        """
+        if item_type is None:
+            return self._weight
+        return self._type_totals.get(item_type, (0.0, 0))[0]
+
+    def value(self, item_type: 'Optional[item.ItemType]' = None) -> int:
+        """Get the total value of the carried items.
+
+        :param item_type: Only count items of this type, or None for all items
+        :return: The total value
+        """
+        if item_type is None:
+            return self._value
+        return self._type_totals.get(item_type, (0.0, 0))[1]
 
     def __str__(self) -> str:
         return "\n".join(
-            "{} {}".format(
-                stack.count(), stack.item().resource_id()
-            ) for stack in self.slots
-         )
+            "{} {}".format(count, stack.item().resource_id())
+            for _, stack, count in self.units()
+        )
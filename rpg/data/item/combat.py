@@ -1,5 +1,6 @@
 
 from enum import IntEnum, unique
+from rpg import util
 import rpg.data.item.item as _item
 
 import typing
@@ -54,6 +55,8 @@ class Attack(object):
     may attempt.
     """
 
+    __slots__ = ('_name', '_dmg', '_accuracy')
+
     def __init__(self, name: str, dmg: int, accuracy: int) -> None:
         """Create a new attack instance.
 
@@ -101,6 +104,8 @@ class Attack(object):
             repr(self._name), repr(self._dmg), repr(self._accuracy)
         )
 
+    __setstate__ = util.set_slot_state
+
 
 class ArmorItem(_item.WearableItem):
     def __init__(self, resource_id: str, name: str, value: int, weight: float,
@@ -0,0 +1,464 @@
+"""A typed, namespaced store for game variables.
+
+Game variables are split into namespaces, normally one per package, so that
+packages can not accidentally overwrite each others variables. Each namespace
+stores its values in compact containers by type (integers, booleans, and
+strings), tracks which variables changed since the last save, and notifies
+listeners whenever a value actually changes.
+
+Packages should use the namespace named after themselves, which can be found
+with VariableStore.namespace_for(resource).
+"""
+
+from array import array
+from enum import IntEnum, unique
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.data.resource import Resource
+    from typing import (
+        Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+    )
+    VariableValue = Union[int, bool, str]
+    VariableListener = Callable[[str, str, Optional[VariableValue]], None]
+    NamespaceSnapshot = Tuple[
+        Tuple[Tuple[str, int, int], ...], bytes, bytes, Tuple[str, ...]
+    ]
+    StoreSnapshot = Tuple[Tuple[str, NamespaceSnapshot], ...]
+
+
+@unique
+class VariableType(IntEnum):
+    """The types of values which can be held by a Namespace."""
+
+    Int = 0
+    Bool = 1
+    String = 2
+
+
+class VariableTypeError(TypeError):
+    def __init__(self, name: str, value: 'Any') -> None:
+        TypeError.__init__(
+            self, "can not set variable '{}' to value of type {}".format(
+                name, type(value)
+            )
+        )
+
+
+def variable_type(value: 'Any') -> 'Optional[VariableType]':
+    """Get the VariableType of a value.
+
+    :param value: The value to check
+    :return: The VariableType of the value, or None if it can not be stored
+    """
+    # bool must be checked first; it is a subclass of int
+    if type(value) is bool:
+        return VariableType.Bool
+    if type(value) is int:
+        return VariableType.Int
+    if type(value) is str:
+        return VariableType.String
+    return None
+
+
+class Namespace(object):
+    """A collection of typed variables belonging to a single package.
+
+    Variables are given a type the first time they are set (or when they are
+    declared), and may only be set to values of that type afterwards. Integer
+    values are limited to signed 64 bit integers.
+    """
+
+    def __init__(self, name: str,
+                 store: 'Optional[VariableStore]' = None) -> None:
+        """Create a new, empty Namespace.
+
+        :param name: The name of the namespace
+        :param store: The VariableStore this namespace belongs to
+        """
+        self._name = name
+        self._store = store
+        self._slots = dict()  # type: Dict[str, Tuple[VariableType, int]]
+        self._ints = array('q')
+        self._bools = bytearray()
+        self._strings = list()  # type: List[str]
+        self._dirty = set()  # type: Set[str]
+        # The variables as of the last save, updated from the dirty set so
+        # that packing does not read every variable again
+        self._packed = None  # type: Optional[Dict[str, VariableValue]]
+        self._version = 0
+        self._snapshot = None  # type: Optional[NamespaceSnapshot]
+        self._snapshot_version = -1
+
+    def name(self) -> str:
+        """Get the name of this namespace.
+
+        :return: The name of the namespace
+        """
+        return self._name
+
+    def version(self) -> int:
+        """Get a counter which is incremented each time a value changes.
+
+        :return: The change counter of this namespace
+        """
+        return self._version
+
+    def declare(self, name: str, value: 'VariableValue') -> None:
+        """Declare a variable with an initial value if it does not exist.
+
+        Unlike set(), declaring a variable does not mark it dirty or notify
+        listeners.
+
+        :param name: The name of the variable
+        :param value: The initial value; also determines the type
+        """
+        if name not in self._slots:
+            self._add(name, value)
+            if self._packed is not None:
+                self._packed[name] = value
+
+    def get(self, name: str,
+            default: 'Optional[VariableValue]' = None
+            ) -> 'Optional[VariableValue]':
+        """Get the value of a variable.
+
+        :param name: The name of the variable
+        :param default: The value to return if the variable does not exist
+        :return: The value of the variable, or the default
+        """
+        slot = self._slots.get(name, None)
+        if slot is None:
+            return default
+        return self._read(slot)
+
+    def set(self, name: str, value: 'VariableValue') -> bool:
+        """Set the value of a variable.
+
+        :param name: The name of the variable
+        :param value: The new value of the variable
+        :return: If the value changed
+        """
+        slot = self._slots.get(name, None)
+        if slot is None:
+            self._add(name, value)
+        else:
+            var_type, index = slot
+            if variable_type(value) is not var_type:
+                raise VariableTypeError(name, value)
+            if self._read(slot) == value:
+                return False
+            if var_type is VariableType.Int:
+                self._ints[index] = value
+            elif var_type is VariableType.Bool:
+                self._bools[index] = value
+            else:
+                self._strings[index] = value
+        self._changed(name, value)
+        return True
+
+    def type(self, name: str) -> 'Optional[VariableType]':
+        """Get the type of a variable.
+
+        :param name: The name of the variable
+        :return: The type of the variable, or None if it does not exist
+        """
+        slot = self._slots.get(name, None)
+        return slot[0] if slot is not None else None
+
+    def items(self) -> 'Iterator[Tuple[str, VariableValue]]':
+        """Iterate over every (name, value) pair in this namespace."""
+        for name, slot in self._slots.items():
+            yield name, self._read(slot)
+
+    def dirty(self) -> 'Set[str]':
+        """Get the names of every variable changed since the last save.
+
+        :return: The set of changed variable names
+        """
+        return self._dirty
+
+    def clear_dirty(self) -> None:
+        """Mark every variable in this namespace as saved."""
+        if self._packed is not None:
+            self._pack_dirty(self._packed)
+        self._dirty.clear()
+
+    def clear(self) -> None:
+        """Remove every variable from this namespace."""
+        for name in list(self._slots.keys()):
+            self._changed(name, None)
+        self._slots.clear()
+        self._ints = array('q')
+        self._bools = bytearray()
+        self._strings = list()
+
+    def pack(self) -> 'Dict[str, VariableValue]':
+        """Get the variables of this namespace as a dictionary.
+
+        Only the variables changed since the last save are read again; the
+        rest are copied from the dictionary packed for that save.
+
+        :return: A dictionary of variable names to values
+        """
+        if self._packed is None:
+            self._packed = dict(self.items())
+        else:
+            self._pack_dirty(self._packed)
+        return dict(self._packed)
+
+    def unpack(self, data: 'Dict[str, VariableValue]') -> None:
+        """Set variables from a dictionary created by Namespace.pack().
+
+        :param data: A dictionary of variable names to values
+        """
+        for name, value in data.items():
+            self.set(name, value)
+
+    def snapshot(self) -> 'NamespaceSnapshot':
+        """Get an immutable copy of this namespace.
+
+        The snapshot is cached until the namespace changes, so snapshots taken
+        while the namespace is unchanged are the same object.
+
+        :return: A snapshot which can be given to Namespace.restore()
+        """
+        if self._snapshot_version != self._version:
+            self._snapshot = (
+                tuple(
+                    (name, var_type, index)
+                    for name, (var_type, index) in self._slots.items()
+                ),
+                self._ints.tobytes(), bytes(self._bools), tuple(self._strings)
+            )
+            self._snapshot_version = self._version
+        return self._snapshot
+
+    def restore(self, snapshot: 'NamespaceSnapshot') -> None:
+        """Set this namespace to the state stored in a snapshot.
+
+        Every variable which differs from the snapshot is marked dirty and
+        listeners are notified of it.
+
+        :param snapshot: A snapshot created by Namespace.snapshot()
+        """
+        if snapshot is self._snapshot and \
+                self._snapshot_version == self._version:
+            return
+
+        old_values = dict(self.items())
+        slots, ints, bools, strings = snapshot
+        self._slots = {
+            name: (VariableType(var_type), index)
+            for name, var_type, index in slots
+        }
+        self._ints = array('q')
+        self._ints.frombytes(ints)
+        self._bools = bytearray(bools)
+        self._strings = list(strings)
+
+        for name, slot in self._slots.items():
+            value = self._read(slot)
+            if old_values.pop(name, None) != value:
+                self._changed(name, value)
+        for name in old_values.keys():
+            self._changed(name, None)
+
+        self._snapshot = snapshot
+        self._snapshot_version = self._version
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._slots
+
+    def __getitem__(self, name: str) -> 'VariableValue':
+        slot = self._slots.get(name, None)
+        if slot is None:
+            raise KeyError(name)
+        return self._read(slot)
+
+    def __setitem__(self, name: str, value: 'VariableValue') -> None:
+        self.set(name, value)
+
+    def __iter__(self) -> 'Iterator[str]':
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _read(self, slot: 'Tuple[VariableType, int]') -> 'VariableValue':
+        var_type, index = slot
+        if var_type is VariableType.Int:
+            return self._ints[index]
+        if var_type is VariableType.Bool:
+            return self._bools[index] != 0
+        return self._strings[index]
+
+    def _add(self, name: str, value: 'VariableValue') -> None:
+        var_type = variable_type(value)
+        if var_type is None:
+            raise VariableTypeError(name, value)
+        if var_type is VariableType.Int:
+            self._slots[name] = (var_type, len(self._ints))
+            self._ints.append(value)
+        elif var_type is VariableType.Bool:
+            self._slots[name] = (var_type, len(self._bools))
+            self._bools.append(value)
+        else:
+            self._slots[name] = (var_type, len(self._strings))
+            self._strings.append(value)
+        self._version += 1
+
+    def _pack_dirty(self, packed: 'Dict[str, VariableValue]') -> None:
+        """Update a dictionary created by Namespace.pack() with the variables
+        changed since the last save, removing those which no longer exist.
+
+        :param packed: The dictionary to update
+        """
+        for name in self._dirty:
+            slot = self._slots.get(name, None)
+            if slot is None:
+                packed.pop(name, None)
+            else:
+                packed[name] = self._read(slot)
+
+    def _changed(self, name: str, value: 'Optional[VariableValue]') -> None:
+        self._version += 1
+        self._dirty.add(name)
+        if self._store is not None:
+            self._store.notify(self._name, name, value)
+
+
+class VariableStore(object):
+    """A collection of Namespaces holding the variables of a game."""
+
+    def __init__(self) -> None:
+        self._namespaces = dict()  # type: Dict[str, Namespace]
+        self._listeners = list()  # type: List[VariableListener]
+        self._snapshot = ()  # type: StoreSnapshot
+
+    def namespace(self, name: str) -> 'Namespace':
+        """Get a namespace by name, creating it if it does not exist.
+
+        :param name: The name of the namespace
+        :return: The Namespace instance
+        """
+        namespace = self._namespaces.get(name, None)
+        if namespace is None:
+            namespace = Namespace(name, self)
+            self._namespaces[name] = namespace
+        return namespace
+
+    def namespace_for(self, owner: 'Resource') -> 'Namespace':
+        """Get the namespace of the package which defined a resource.
+
+        :param owner: A resource defined by the package
+        :return: The Namespace of the package
+        """
+        return self.namespace(owner.package() or "")
+
+    def namespaces(self) -> 'Iterator[Namespace]':
+        """Iterate over every namespace in this store."""
+        return iter(self._namespaces.values())
+
+    def add_listener(self, listener: 'VariableListener') -> None:
+        """Add a function called with (namespace, name, value) each time a
+        variable changes.
+
+        The value is None when a variable is removed.
+
+        :param listener: The function to call
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: 'VariableListener') -> None:
+        """Remove a listener previously added with add_listener().
+
+        :param listener: The function to remove
+        """
+        self._listeners.remove(listener)
+
+    def notify(self, namespace: str, name: str,
+               value: 'Optional[VariableValue]') -> None:
+        """Notify every listener that a variable changed.
+
+        :param namespace: The name of the namespace holding the variable
+        :param name: The name of the variable which changed
+        :param value: The new value of the variable
+        """
+        for listener in self._listeners:
+            listener(namespace, name, value)
+
+    def dirty(self) -> 'Dict[str, Set[str]]':
+        """Get the names of every variable changed since the last save.
+
+        :return: A dictionary of namespace names to sets of variable names
+        """
+        return {
+            name: namespace.dirty()
+            for name, namespace in self._namespaces.items()
+            if len(namespace.dirty()) > 0
+        }
+
+    def clear_dirty(self) -> None:
+        """Mark every variable as saved."""
+        for namespace in self._namespaces.values():
+            namespace.clear_dirty()
+
+    def clear(self) -> None:
+        """Remove every variable from every namespace."""
+        for namespace in self._namespaces.values():
+            namespace.clear()
+
+    def pack(self) -> 'Dict[str, Dict[str, VariableValue]]':
+        """Get the variables of every namespace as nested dictionaries.
+
+        :return: A dictionary of namespace names to packed namespaces
+        """
+        data = dict()
+        for name, namespace in self._namespaces.items():
+            packed = namespace.pack()
+            if len(packed) > 0:
+                data[name] = packed
+        return data
+
+    def unpack(self, data: 'Dict[str, Dict[str, VariableValue]]') -> None:
+        """Set variables from a dictionary created by VariableStore.pack().
+
+        :param data: A dictionary of namespace names to packed namespaces
+        """
+        for name, values in data.items():
+            self.namespace(name).unpack(values)
+
+    def snapshot(self) -> 'StoreSnapshot':
+        """Get an immutable copy of every namespace.
+
+        Unchanged namespaces share their snapshot with the previous snapshot,
+        and the previous snapshot is returned if no namespace changed.
+
+        :return: A snapshot which can be given to VariableStore.restore()
+        """
+        previous = self._snapshot
+        if len(previous) == len(self._namespaces) and all(
+                entry[1] is namespace.snapshot()
+                for entry, namespace in zip(
+                    previous, self._namespaces.values()
+                )):
+            return previous
+        self._snapshot = tuple(
+            (name, namespace.snapshot())
+            for name, namespace in self._namespaces.items()
+        )
+        return self._snapshot
+
+    def restore(self, snapshot: 'StoreSnapshot') -> None:
+        """Set every namespace to the state stored in a snapshot.
+
+        :param snapshot: A snapshot created by VariableStore.snapshot()
+        """
+        names = set()
+        for name, namespace_snapshot in snapshot:
+            self.namespace(name).restore(namespace_snapshot)
+            names.add(name)
+        for name, namespace in self._namespaces.items():
+            if name not in names:
+                namespace.clear()
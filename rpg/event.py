@@ -8,24 +8,43 @@ GameEvent.apply() method.
 """
 
 from abc import ABCMeta, abstractmethod
-import inspect
 
 import typing
 if typing.TYPE_CHECKING:
     from rpg.app import Game
-    from rpg.ui import options, views
-    from typing import Callable, List
+    from rpg.ui import options
+    from typing import Callable, List, Optional, Tuple
 
 
 class GameEvent(object, metaclass=ABCMeta):
+    # If a snapshot of the game state should be taken before this event is
+    # applied, allowing it to be undone
+    undoable = True
+    # If this event only redisplays the current displayable; consecutive
+    # redisplays in a CompoundEvent are merged
+    redisplay = False
+
     @abstractmethod
     def apply(self, game: 'Game') -> None:
         """Apply the GameEvent to the Game instance.
 
+        This may be defined with 'async def' for long running events, in which
+        case it is run as a task; see rpg.tasks.
+
         :param game: The Game instance to apply this GameEvent to
         """
         raise NotImplementedError()
 
+    def steps(self) -> 'Tuple[GameEvent, ...]':
+        """Get the events which applying this GameEvent is equivalent to.
+
+        This is used by CompoundEvent to flatten event chains. An event which
+        returns an empty tuple does nothing and is removed from the chain.
+
+        :return: A tuple of GameEvents which are applied in order
+        """
+        return self,
+
     def action(self) -> str:
         """Get a string which represents this GameEvent.
 
@@ -83,24 +102,45 @@ class CompoundEvent(GameEvent):
     def __init__(self, *events: 'GameEvent') -> None:
         """Initialize the CompoundEvent with the given list of events
 
+        The events are compiled into a flat list of steps: nested
+        CompoundEvents are flattened, events which do nothing are removed and
+        consecutive redisplay events are merged into one.
+
         :param events: The events to apply
         """
         GameEvent.__init__(self)
-        self._events = list()  # type: List[GameEvent]
+        steps = list()  # type: List[GameEvent]
         for item in events:
-            if inspect.isclass(item):
+            if not isinstance(item, GameEvent):
                 raise Exception(
-                    "Class instance '{}' passed to CompoundEvent".format(item)
+                    "Non-GameEvent '{}' passed to CompoundEvent".format(item)
                 )
-            self._events.append(item)
+            for step in item.steps():
+                if step.redisplay and len(steps) > 0 and steps[-1].redisplay:
+                    continue
+                steps.append(step)
+        self._steps = tuple(steps)  # type: Tuple[GameEvent, ...]
+
+    def steps(self) -> 'Tuple[GameEvent, ...]':
+        return self._steps
 
     def apply(self, game: 'Game') -> None:
         """Apply the events in the order that they were given.
 
+        Events which are coroutines are started as tasks, and the events after
+        them are applied without waiting for the tasks to finish.
+
         :param game: The Game instance to apply each event to
         """
-        for item in self._events:
-            item.apply(game)
+        tasks = game.tasks
+        if game.tracer.enabled:
+            tracer = game.tracer
+            for step in self._steps:
+                with tracer.span("event", type(step).__name__):
+                    tasks.apply(step)
+        else:
+            for step in self._steps:
+                tasks.apply(step)
 
 
 class OptionListReturnEvent(GameEvent):
@@ -112,6 +152,8 @@ class OptionListReturnEvent(GameEvent):
     changed nor has the game state been updated.
     """
 
+    redisplay = True
+
     def apply(self, game: 'Game') -> None:
         """Resume the current displayable.
 
@@ -141,12 +183,7 @@ class UpdateOptionsEvent(GameEvent):
 
         :param game: The Game instance to apply this event to
         """
-        view = game.stack.current()
-        if view is None or not view.is_game_view():
-            return
-
-        # Coerce the type to make mypy/PyCharm happy
-        typing.cast('views.GameView', view).set_options(self._option_list)
+        game.state.set_options(self._option_list)
 
 
 class LocationEvent(GameEvent):
@@ -164,10 +201,13 @@ class LocationEvent(GameEvent):
         self._time_delta = time_delta
 
     def apply(self, game: 'Game') -> None:
-        """Change the current location of the game.
+        """Advance the game clock by the travel time, then change the
+        current location of the game.
 
         :param game: The Game instance to apply to
         """
+        if self._time_delta > 0:
+            game.state.time.advance(self._time_delta)
         game.state.set_location(self._location_id)
 
 
@@ -183,3 +223,55 @@ class FightStartEvent(GameEvent):
 
     def apply(self, game: 'Game') -> None:
         game.state.set_fight(self._monster)
+
+
+class InventoryEvent(GameEvent):
+    """GameEvent which adds items to or removes items from the player."""
+
+    def __init__(self, item_id: str, count: int,
+                 slot: 'Optional[int]' = None) -> None:
+        """Initialize the InventoryEvent.
+
+        :param item_id: The resource_id of the item
+        :param count: How many items to add, or to remove if negative
+        :param slot: The slot of the stack to remove the items from, or None
+                     to remove them from any stack of the item
+        """
+        GameEvent.__init__(self)
+        self._item_id = item_id
+        self._count = count
+        self._slot = slot
+
+    def apply(self, game: 'Game') -> None:
+        inventory = game.state.player.inventory
+        if self._count > 0:
+            inventory.add(self._item_id, self._count)
+        elif self._slot is not None:
+            inventory.remove_slot(self._slot, -self._count)
+        else:
+            inventory.remove(self._item_id, -self._count)
+
+
+class UndoEvent(GameEvent):
+    """GameEvent which returns the game to the state before the last action.
+
+    Undoing is itself an event so that it is recorded along with every other
+    action the player takes.
+    """
+
+    undoable = False
+
+    def __init__(self, steps: int = 1) -> None:
+        """Initialize the UndoEvent.
+
+        :param steps: How many actions to undo
+        """
+        GameEvent.__init__(self)
+        self._steps = steps
+
+    def apply(self, game: 'Game') -> None:
+        """Undo the last actions taken.
+
+        :param game: The Game instance to apply to
+        """
+        game.undo(self._steps)
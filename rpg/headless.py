@@ -0,0 +1,139 @@
+"""Support for running the game without a tkinter window.
+
+Headless games are used for replaying recorded sessions, benchmarks and
+hosting sessions on a server. Rather than a tkinter based GameView, a headless
+game uses the HeadlessView defined here, which implements the GameView API by
+simply keeping track of what would have been displayed.
+"""
+
+from rpg import app, trace
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.data import actor, resource
+    from rpg.ui import options as _options
+    from typing import Optional
+
+
+class HeadlessView(object):
+    """A GameView replacement which does not create any tkinter widgets.
+
+    The HeadlessView implements the same API as rpg.ui.views.GameView, but
+    instead of updating widgets it only remembers the last title, text and
+    OptionList it was given. This lets content logic run as fast as possible
+    while still being inspectable.
+    """
+
+    def __init__(self, game: 'app.Game', name: str = "GameView") -> None:
+        """Initialize the HeadlessView.
+
+        :param game: The app.Game instance
+        :param name: The name of this view, used for push and swap
+        """
+        self._game_obj = game
+        self._name = name
+        self.title = ""
+        self.text = ""
+        self.options = None  # type: Optional[_options.OptionList]
+        self.monster = None  # type: Optional[actor.Actor]
+        self.display_count = 0
+
+    def name(self) -> str:
+        return self._name
+
+    def is_initial_view(self) -> bool:
+        return False
+
+    def is_game_view(self) -> bool:
+        return True
+
+    def pack(self, **kwargs) -> None:
+        pass
+
+    def pack_forget(self) -> None:
+        pass
+
+    def start(self) -> None:
+        pass
+
+    def resume(self) -> None:
+        pass
+
+    def pause(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def text_area(self) -> None:
+        return None
+
+    def display(self, displayable: 'resource.Displayable',
+                update_status_bar: bool = True) -> None:
+        """Display the given displayable resource.
+
+        :param displayable: The displayable resource to display
+        :param update_status_bar: Ignored; there is no status bar
+        """
+        self.display_count += 1
+        game = self._game_obj
+        with game.tracer.span("display", displayable.resource_id()):
+            self.title, self.text, self.options = trace.render(
+                game, displayable
+            )
+
+    def set_title(self, text: str, update_status_bar: bool = False) -> None:
+        self.title = text
+
+    def set_text(self, text: str, update_status_bar: bool = True) -> None:
+        self.text = text
+
+    def set_options(self, options: '_options.OptionList',
+                    update_status_bar: bool = True) -> None:
+        self.options = options
+
+    def add_text(self, text: str, update_status_bar: bool = True) -> None:
+        self.text += text
+
+    def fight_start(self, actor_: 'actor.Actor') -> None:
+        self.monster = actor_
+        self.text = actor_.get_intro_text(self._game_obj)
+
+    def fight_update(self, actor_: 'actor.Actor') -> None:
+        self.monster = actor_
+
+    def fight_end(self) -> None:
+        self.monster = None
+        self._game_obj.state.resume_display()
+
+
+def create_game(package_root: str = "./data/packages",
+                template: 'Optional[app.Game]' = None) -> 'app.Game':
+    """Create a Game instance which runs without a tkinter window.
+
+    All packages under package_root are loaded and merged, and a HeadlessView
+    is pushed as the current view. The game is not started; call
+    game.state.start() to do so.
+
+    If a template game is given, the packages are not loaded again; instead
+    the new game shares the resources and flag registry of the template. This
+    is much cheaper when many games are hosted at once. The flag registry of
+    the template is frozen, and monsters are spawned as a new instance for
+    every fight (see Actor.spawn()), so games do not change each other.
+
+    :param package_root: The directory to load packages from
+    :param template: A headless game to share resources with
+    :return: A new Game instance ready to be started
+    """
+    game = app.Game()
+    if template is None:
+        game.load_packages(package_root)
+        game.build_resources()
+    else:
+        registry = template.state.flags.registry
+        registry.freeze()
+        game.state.resources = template.state.resources
+        game.state.flags.registry = registry
+    game.stack.add_view(HeadlessView(game))
+    game.stack.push("GameView")
+    return game
@@ -74,6 +74,7 @@ class Package(object):
         self._author = None          # type: Optional[str]
         self._version = None         # type: Optional[str]
         self._dependencies = list()  # type: List[str]
+        self._flags = list()         # type: List[str]
         self._init = list()          # type: List[Optional[PackageCallback]]
         self._finalize = list()      # type: List[Optional[PackageCallback]]
 
@@ -196,6 +197,18 @@ class Package(object):
         """
         return self._dependencies
 
+    @property
+    def flags(self) -> 'List[str]':
+        """Get a list of the flag names declared by this package.
+
+        The value returned by this is defined by a package variable 'Flags'
+        which must be a list of strings. Flags are registered under the name
+        "<package>.<flag>" when resources are built.
+
+        :return: A list of flag names declared by this package
+        """
+        return self._flags
+
     def initialize(self, game: 'app.Game') -> None:
         """Call initialization callbacks defined in this package.
 
@@ -308,6 +321,20 @@ class Package(object):
                 except Exception as e:
                     ctx.error("Could not add dependencies from module: {}", e)
 
+            # Attempt to get the flags package variable; like dependencies,
+            # the flags are appended to the list of flags of this package
+            _flags: 'List[str]'
+            _flags = getattr(_module, "Flags", None)
+            if _flags is not None:
+                try:
+                    for flag in _flags:
+                        if type(flag) is not str:
+                            ctx.error("Flag name {} is not a string", flag)
+                        elif flag not in self._flags:
+                            self._flags.append(flag)
+                except Exception as e:
+                    ctx.error("Could not add flags from module: {}", e)
+
             # Get all Resource classes and objects defined by the module
             for _item_name in dir(_module):
                 # Skip item names which start with an underscore
@@ -0,0 +1,74 @@
+"""Reading and writing save games.
+
+A save game is the dictionary created by GameData.pack() along with a version
+number. Resources are stored by their resource_id and looked up again when the
+save is loaded, so a save can only be loaded with the packages which created
+it.
+
+Save files are written with pickle. Only load save files from trusted
+sources.
+"""
+
+import pickle
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.state import GameData
+    from typing import Any
+
+SaveVersion = 1
+
+
+class SaveVersionError(ValueError):
+    def __init__(self, version: 'Any') -> None:
+        ValueError.__init__(
+            self, "unsupported save version {}".format(version)
+        )
+
+
+def dumps(data: 'GameData') -> bytes:
+    """Convert the state of a GameData instance into a save game.
+
+    :param data: The GameData instance to save
+    :return: The save game as bytes
+    """
+    return pickle.dumps(
+        (SaveVersion, data.pack()), pickle.HIGHEST_PROTOCOL
+    )
+
+
+def loads(data: 'GameData', save_data: bytes) -> None:
+    """Set the state of a GameData instance from a save game.
+
+    :param data: The GameData instance to load into
+    :param save_data: The save game created by save.dumps()
+    """
+    version, body = pickle.loads(save_data)
+    if version != SaveVersion:
+        raise SaveVersionError(version)
+    data.unpack(body)
+
+
+def save(data: 'GameData', filename: str) -> None:
+    """Write the state of a GameData instance to a file.
+
+    Every variable is marked as saved afterwards, so the next save only
+    reads the variables which changed in between.
+
+    :param data: The GameData instance to save
+    :param filename: The path of the file to write
+    """
+    with open(filename, "wb") as fp:
+        fp.write(dumps(data))
+    data.variables.clear_dirty()
+    data.temp.clear_dirty()
+
+
+def load(data: 'GameData', filename: str) -> None:
+    """Read the state of a GameData instance from a file.
+
+    :param data: The GameData instance to load into
+    :param filename: The path of the file to read
+    """
+    with open(filename, "rb") as fp:
+        loads(data, fp.read())
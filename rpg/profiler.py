@@ -0,0 +1,218 @@
+"""A sampling profiler for finding slow package content.
+
+The Profiler runs a background thread which periodically records the call
+stack of the thread the game runs on. Unlike cProfile, this does not slow down
+every function call, so the game can be played normally while profiling. It
+can be limited to the next N events applied through Game.apply_event or to a
+number of seconds. By default only time spent applying events is sampled, so
+the idle tkinter main loop does not drown out the content being profiled.
+
+The samples can be summarized as the hottest functions or exported as
+collapsed stacks (for flamegraph.pl and similar tools) or as a speedscope
+file (https://www.speedscope.app). The debug console exposes the profiler:
+
+    >>> profile(events=10)
+    ... play the game ...
+    >>> hot()
+    >>> profiler.write_speedscope("profile.json")
+"""
+
+import collections
+import json
+import os.path
+import sys
+import threading
+import time
+
+import typing
+if typing.TYPE_CHECKING:
+    from typing import Counter, Dict, List, Optional, Tuple
+    Frame = Tuple[str, int, str]
+    Stack = Tuple[Frame, ...]
+
+
+def _frame_name(frame: 'Frame') -> str:
+    filename, line, name = frame
+    return "{} ({}:{})".format(name, os.path.basename(filename), line)
+
+
+class Profiler(object):
+    """Samples the call stack of a single thread."""
+
+    def __init__(self, thread_id: 'Optional[int]' = None) -> None:
+        """Create a new Profiler.
+
+        :param thread_id: The id of the thread to sample, or None for the
+                          thread which created the Profiler
+        """
+        if thread_id is None:
+            thread_id = threading.get_ident()
+        self._thread_id = thread_id
+        self._samples = collections.Counter()  # type: Counter[Stack]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+        self._events_left = None  # type: Optional[int]
+        self._busy = 0
+        self._busy_only = True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, events: 'Optional[int]' = None,
+              seconds: 'Optional[float]' = None,
+              interval: float = 0.001, busy_only: bool = True) -> None:
+        """Discard any previous samples and start sampling.
+
+        :param events: If given, stop after this many events are applied
+        :param seconds: If given, stop after this many seconds
+        :param interval: The time in seconds between samples
+        :param busy_only: If only time spent applying events is sampled
+        """
+        self.stop()
+        with self._lock:
+            self._samples.clear()
+        self._events_left = events
+        self._busy_only = busy_only
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval, seconds),
+            name="Profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling. The samples taken are kept."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def enter(self) -> None:
+        """Called by the Game before an event is applied."""
+        self._busy += 1
+
+    def leave(self) -> None:
+        """Called by the Game after an event is applied."""
+        self._busy = max(0, self._busy - 1)
+        if self._busy == 0 and self._events_left is not None:
+            self._events_left -= 1
+            if self._events_left <= 0:
+                self._events_left = None
+                self.stop()
+
+    def sample_count(self) -> int:
+        with self._lock:
+            return sum(self._samples.values())
+
+    def hottest(self, limit: int = 20) -> 'List[Tuple[str, int, int]]':
+        """Get the functions which appear in the most samples.
+
+        :param limit: The maximum number of functions to return
+        :return: A list of (function, self samples, total samples) sorted by
+                 self samples, then total samples
+        """
+        own = collections.Counter()  # type: Counter[Frame]
+        total = collections.Counter()  # type: Counter[Frame]
+        with self._lock:
+            samples = list(self._samples.items())
+        for stack, count in samples:
+            own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+        ordered = sorted(
+            total.keys(), key=lambda f: (own[f], total[f]), reverse=True
+        )
+        return [
+            (_frame_name(frame), own[frame], total[frame])
+            for frame in ordered[:limit]
+        ]
+
+    def report(self, limit: int = 20) -> str:
+        """Create a table of the hottest functions.
+
+        :param limit: The maximum number of functions to include
+        :return: The report as a string
+        """
+        count = max(1, self.sample_count())
+        lines = ["{:>7} {:>7}  {}".format("self %", "total %", "function")]
+        for name, own, total in self.hottest(limit):
+            lines.append("{:>7.1f} {:>7.1f}  {}".format(
+                100.0 * own / count, 100.0 * total / count, name
+            ))
+        return "\n".join(lines)
+
+    def write_collapsed(self, filename: str) -> None:
+        """Write the samples as collapsed stacks, one stack per line.
+
+        :param filename: The path of the file to write
+        """
+        with self._lock:
+            samples = list(self._samples.items())
+        with open(filename, "w") as fp:
+            for stack, count in samples:
+                fp.write("{} {}\n".format(
+                    ";".join(_frame_name(frame) for frame in stack), count
+                ))
+
+    def write_speedscope(self, filename: str, name: str = "rpg") -> None:
+        """Write the samples as a speedscope sampled profile.
+
+        :param filename: The path of the file to write
+        :param name: The name of the profile
+        """
+        with self._lock:
+            samples = list(self._samples.items())
+        indices = dict()  # type: Dict[Frame, int]
+        frames = list()
+        stacks = list()
+        weights = list()
+        for stack, count in samples:
+            stack_indices = list()
+            for frame in stack:
+                index = indices.get(frame, None)
+                if index is None:
+                    index = len(frames)
+                    indices[frame] = index
+                    frames.append({
+                        'name': frame[2], 'file': frame[0], 'line': frame[1]
+                    })
+                stack_indices.append(index)
+            stacks.append(stack_indices)
+            weights.append(count)
+        with open(filename, "w") as fp:
+            json.dump({
+                '$schema': "https://www.speedscope.app/file-format-schema.json",
+                'shared': {'frames': frames},
+                'profiles': [{
+                    'type': "sampled", 'name': name, 'unit': "none",
+                    'startValue': 0, 'endValue': sum(weights),
+                    'samples': stacks, 'weights': weights,
+                }],
+            }, fp)
+
+    def _run(self, interval: float, seconds: 'Optional[float]') -> None:
+        deadline = None
+        if seconds is not None:
+            deadline = time.perf_counter() + seconds
+        while not self._stop.wait(interval):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if self._busy_only and self._busy == 0:
+                continue
+            frame = sys._current_frames().get(self._thread_id, None)
+            if frame is None:
+                break
+            stack = list()  # type: List[Frame]
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    (code.co_filename, code.co_firstlineno, code.co_name)
+                )
+                frame = frame.f_back
+            stack.reverse()
+            with self._lock:
+                self._samples[tuple(stack)] += 1
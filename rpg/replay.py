@@ -0,0 +1,159 @@
+"""Deterministic recording and replaying of game sessions.
+
+A session is fully determined by the seed of the games random number
+generator, the player as it was when the game was started, and the ordered
+stream of GameEvents applied by the player. The Recorder captures these as a
+Recording, which can be saved to a file and later run back by a Replayer
+against a headless game as fast as possible.
+
+Recordings are written with pickle, so every recorded GameEvent must be
+picklable; a CallbackEvent holding a lambda can not be saved.
+"""
+
+import pickle
+import time
+from rpg import headless
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.app import Game
+    from rpg.data.actor import Player
+    from rpg.event import GameEvent
+    from typing import List, Optional
+
+_RecordingVersion = 1
+
+
+class Recording(object):
+    """The data needed to reproduce a single game session."""
+
+    def __init__(self, seed: int, player: 'Optional[bytes]' = None) -> None:
+        """Create a new, empty Recording.
+
+        :param seed: The seed the session was started with
+        :param player: The pickled Player the session was started with
+        """
+        self.seed = seed
+        self.player = player
+        self.events = list()  # type: List[GameEvent]
+
+    def restore_player(self) -> 'Optional[Player]':
+        """Create a copy of the Player the session was started with.
+
+        :return: A new Player instance, or None if no player was recorded
+        """
+        if self.player is None:
+            return None
+        return pickle.loads(self.player)
+
+    def save(self, filename: str) -> None:
+        """Write this Recording to the given file.
+
+        :param filename: The path of the file to write
+        """
+        with open(filename, "wb") as fp:
+            pickle.dump({
+                'version': _RecordingVersion,
+                'seed': self.seed,
+                'player': self.player,
+                'events': self.events,
+            }, fp)
+
+    @staticmethod
+    def load(filename: str) -> 'Recording':
+        """Read a Recording from the given file.
+
+        :param filename: The path of the file to read
+        :return: The Recording stored in the file
+        """
+        with open(filename, "rb") as fp:
+            data = pickle.load(fp)
+        if data.get('version', None) != _RecordingVersion:
+            raise ValueError(
+                "unsupported recording version {}".format(data.get('version'))
+            )
+        recording = Recording(data['seed'], data['player'])
+        recording.events = data['events']
+        return recording
+
+
+class Recorder(object):
+    """Captures the seed and the events applied during a game session.
+
+    A Recorder is attached to a Game by assigning it to Game.recorder. Each
+    time the game is started a new Recording is begun, and every event passed
+    to Game.apply_event() is appended to it.
+    """
+
+    def __init__(self) -> None:
+        self.recording = None  # type: Optional[Recording]
+
+    def begin(self, seed: int, player: 'Player') -> None:
+        """Start a new Recording.
+
+        :param seed: The seed the session is being started with
+        :param player: The Player the session is being started with
+        """
+        self.recording = Recording(seed, pickle.dumps(player))
+
+    def record(self, game_event: 'GameEvent') -> None:
+        """Append an applied event to the current Recording.
+
+        :param game_event: The GameEvent being applied
+        """
+        if self.recording is not None:
+            self.recording.events.append(game_event)
+
+
+class ReplayResult(object):
+    """Summary of a replayed Recording."""
+
+    def __init__(self, game: 'Game', event_count: int,
+                 elapsed: float) -> None:
+        """Create a new ReplayResult.
+
+        :param game: The headless Game the recording was replayed in
+        :param event_count: The number of events which were applied
+        :param elapsed: How long the replay took in seconds
+        """
+        self.game = game
+        self.event_count = event_count
+        self.elapsed = elapsed
+
+    @property
+    def events_per_second(self) -> float:
+        if self.elapsed <= 0.0:
+            return float('inf')
+        return self.event_count / self.elapsed
+
+
+class Replayer(object):
+    """Runs a Recording against a headless game."""
+
+    def __init__(self, recording: 'Recording',
+                 package_root: str = "./data/packages") -> None:
+        """Create a new Replayer.
+
+        :param recording: The Recording to replay
+        :param package_root: The directory to load packages from
+        """
+        self._recording = recording
+        self._package_root = package_root
+
+    def run(self) -> 'ReplayResult':
+        """Replay the recording from the start of the session.
+
+        :return: A ReplayResult describing the replay
+        """
+        game = headless.create_game(self._package_root)
+        player = self._recording.restore_player()
+        if player is not None:
+            game.state.player = player
+
+        start = time.perf_counter()
+        game.state.start(self._recording.seed)
+        for game_event in self._recording.events:
+            game.apply_event(game_event)
+        elapsed = time.perf_counter() - start
+
+        return ReplayResult(game, len(self._recording.events), elapsed)
@@ -0,0 +1,182 @@
+"""Hosting many headless game sessions at once.
+
+The SessionManager keeps a bounded number of sessions resident in memory.
+When the limit is reached, the least recently used session is hibernated: its
+state is written to disk using the save game format (see rpg.io.save) and its
+Game instance is dropped. A hibernated session is restored transparently the
+next time it is used, for example when an event is applied to it.
+
+All sessions share the resources of a single template game, so the packages
+are only loaded once. The undo history and recorder of a session are not
+preserved across hibernation.
+"""
+
+import collections
+import os
+import os.path
+import time
+from rpg import headless
+from rpg.io import save
+from rpg.state import GameState
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.app import Game
+    from rpg.data.actor import Player
+    from rpg.event import GameEvent
+    from typing import Dict, List, Optional, OrderedDict, Set
+
+
+class SessionNotFoundError(KeyError):
+    def __init__(self, session_id: str) -> None:
+        KeyError.__init__(self, "no session with id '{}'".format(session_id))
+
+
+class SessionManager(object):
+    """Manages headless game sessions with least recently used eviction."""
+
+    def __init__(self, directory: str,
+                 package_root: str = "./data/packages",
+                 max_resident: int = 100) -> None:
+        """Create a new SessionManager.
+
+        :param directory: The directory hibernated sessions are written to
+        :param package_root: The directory to load packages from
+        :param max_resident: The memory budget, as the maximum number of
+                             sessions kept in memory at once
+        """
+        self._directory = directory
+        self._max_resident = max(1, max_resident)
+        self._template = headless.create_game(package_root)
+        self._resident: 'OrderedDict[str, Game]'
+        self._resident = collections.OrderedDict()
+        self._last_used = dict()  # type: Dict[str, float]
+        self._hibernated = set()  # type: Set[str]
+        os.makedirs(directory, exist_ok=True)
+
+    def create(self, session_id: str, player: 'Optional[Player]' = None,
+               seed: 'Optional[int]' = None) -> 'Game':
+        """Create and start a new session.
+
+        :param session_id: A unique id for the session; it is used as the file
+                           name of the hibernated session
+        :param player: The player of the session, or None for a new player
+        :param seed: The seed to start the session with, or None
+        :return: The Game instance of the new session
+        """
+        if self.exists(session_id):
+            raise KeyError("session '{}' already exists".format(session_id))
+        game = headless.create_game(template=self._template)
+        if player is not None:
+            game.state.player = player
+        game.state.start(seed)
+        self._make_resident(session_id, game)
+        return game
+
+    def exists(self, session_id: str) -> bool:
+        """Check if a session exists, resident or hibernated.
+
+        :param session_id: The id of the session
+        :return: If the session exists
+        """
+        return session_id in self._resident or session_id in self._hibernated
+
+    def is_resident(self, session_id: str) -> bool:
+        """Check if a session is currently held in memory.
+
+        :param session_id: The id of the session
+        :return: If the session is resident
+        """
+        return session_id in self._resident
+
+    def get(self, session_id: str) -> 'Game':
+        """Get the Game instance of a session, restoring it if hibernated.
+
+        :param session_id: The id of the session
+        :return: The Game instance of the session
+        """
+        game = self._resident.get(session_id, None)
+        if game is not None:
+            self._resident.move_to_end(session_id)
+            self._last_used[session_id] = time.monotonic()
+            return game
+        if session_id not in self._hibernated:
+            raise SessionNotFoundError(session_id)
+        return self._restore(session_id)
+
+    def apply_event(self, session_id: str, game_event: 'GameEvent') -> None:
+        """Apply an event to a session, restoring it if hibernated.
+
+        :param session_id: The id of the session
+        :param game_event: The GameEvent to apply
+        """
+        self.get(session_id).apply_event(game_event)
+
+    def hibernate(self, session_id: str) -> None:
+        """Write a resident session to disk and drop it from memory.
+
+        :param session_id: The id of the session
+        """
+        game = self._resident.pop(session_id, None)
+        if game is None:
+            return
+        self._last_used.pop(session_id, None)
+        save.save(game.state, self._path(session_id))
+        self._hibernated.add(session_id)
+
+    def hibernate_idle(self, max_idle: float) -> 'List[str]':
+        """Hibernate every session which has not been used recently.
+
+        :param max_idle: How long in seconds a session may be unused
+        :return: The ids of the sessions which were hibernated
+        """
+        cutoff = time.monotonic() - max_idle
+        idle = [
+            session_id for session_id in self._resident.keys()
+            if self._last_used[session_id] < cutoff
+        ]
+        for session_id in idle:
+            self.hibernate(session_id)
+        return idle
+
+    def close(self, session_id: str) -> None:
+        """Remove a session completely, deleting any hibernated state.
+
+        :param session_id: The id of the session
+        """
+        self._resident.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        if session_id in self._hibernated:
+            self._hibernated.remove(session_id)
+            os.remove(self._path(session_id))
+
+    def resident_count(self) -> int:
+        return len(self._resident)
+
+    def hibernated_count(self) -> int:
+        return len(self._hibernated)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self._directory, "{}.sav".format(session_id))
+
+    def _restore(self, session_id: str) -> 'Game':
+        game = headless.create_game(template=self._template)
+        path = self._path(session_id)
+        save.load(game.state, path)
+        os.remove(path)
+        self._hibernated.remove(session_id)
+        self._make_resident(session_id, game)
+
+        view = game.state.game_view()
+        if game.state.state() == GameState.Fight:
+            view.fight_update(game.state.monster)
+        elif game.state.state() != GameState.Stopped:
+            game.state.resume_display()
+        return game
+
+    def _make_resident(self, session_id: str, game: 'Game') -> None:
+        self._resident[session_id] = game
+        self._last_used[session_id] = time.monotonic()
+        while len(self._resident) > self._max_resident:
+            oldest = next(iter(self._resident))
+            self.hibernate(oldest)
@@ -5,8 +5,11 @@ itself. This excludes things like the package listing, the logging class, and
 various other bits defined in the rpg.app.Game class.
 """
 
+import collections
+import contextlib
 from enum import IntEnum, unique
-from rpg.data import actor, resource, resources
+from rpg import changes, clock
+from rpg.data import actor, flags, inventory, resource, resources, variables
 
 import typing
 if typing.TYPE_CHECKING:
@@ -14,8 +17,11 @@ if typing.TYPE_CHECKING:
     from rpg.data.actor import NonPlayerCharacter
     from rpg.data.resource import Dialog
     from rpg.data.location import Location
-    from rpg.ui import views
-    from typing import Any, Dict, Optional
+    from rpg.ui import options, views
+    from typing import (
+        Any, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+    )
+    T = TypeVar('T')
 
 
 @unique
@@ -28,6 +34,134 @@ class GameState(IntEnum):
     Fight = 3
 
 
+def _resource_id(obj: 'Optional[resource.Resource]') -> 'Optional[str]':
+    return obj.resource_id() if obj is not None else None
+
+
+def _share(value: 'T', previous: 'Optional[T]') -> 'T':
+    """Return the previous value if it is equal to the new value.
+
+    This is used so that consecutive snapshots reference the same object for
+    every part of the state which did not change.
+    """
+    if previous is not None and previous == value:
+        return previous
+    return value
+
+
+class Snapshot(object):
+    """An immutable copy of the GameData state at some point in time.
+
+    Snapshots are created by GameData.snapshot() and store each part of the
+    state as an immutable value. Each part caches its snapshot until it
+    changes, and the inventory and variable snapshots also share their
+    unchanged stacks and namespaces, so taking a snapshot only builds the
+    parts that changed since the last one. A long run of snapshots costs little
+    more than the parts that actually changed.
+    """
+
+    __slots__ = (
+        'state', 'location', 'dialog', 'monster', 'monster_stats', 'name',
+        'attribute_points', 'stats', 'inventory', 'variables', 'temp',
+        'flags', 'time', 'random'
+    )
+
+    def __init__(self, data: 'GameData',
+                 previous: 'Optional[Snapshot]' = None) -> None:
+        """Create a snapshot of the given GameData.
+
+        :param data: The GameData instance to take a snapshot of
+        :param previous: The previous snapshot to share unchanged parts with
+        """
+        self.state = data.state()
+        self.location = data.location
+        self.dialog = data.dialog
+        self.monster = data.monster
+        self.monster_stats = None
+        if data.monster is not None:
+            self.monster_stats = data.monster.stats.snapshot()
+        self.name = data.player.name()
+        self.attribute_points = data.player.attribute_points
+        self.stats = data.player.stats.snapshot()
+        self.inventory = data.player.inventory.snapshot()
+        self.variables = data.variables.snapshot()
+        self.temp = data.temp.snapshot()
+        self.flags = data.flags.snapshot()
+        self.time = data.time.snapshot()
+        # Using the random number generator can not be tracked, so its state
+        # is compared with the previous snapshot instead
+        self.random = _share(
+            data.random_state(),
+            previous.random if previous is not None else None
+        )
+
+
+class Rollback(Exception):
+    """Raised to reject the action being applied in a GameData transaction.
+
+    The state is restored to how it was before the action, and
+    Game.apply_event does not propagate the exception.
+    """
+
+
+class History(object):
+    """A bounded ring buffer of GameData snapshots.
+
+    The History is used to step back through the most recent states of the
+    game, both from the debug console and to implement undo. Once the buffer
+    is full the oldest snapshot is discarded for each new one.
+    """
+
+    def __init__(self, max_length: int = 100) -> None:
+        """Create a new History.
+
+        :param max_length: The maximum number of snapshots to keep
+        """
+        self._snapshots: 'Deque[Snapshot]'
+        self._snapshots = collections.deque(maxlen=max_length)
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def clear(self) -> None:
+        """Remove all snapshots from the History."""
+        self._snapshots.clear()
+
+    def push(self, data: 'GameData') -> 'Snapshot':
+        """Take a snapshot of the given GameData and add it to the History.
+
+        :param data: The GameData to take a snapshot of
+        :return: The new snapshot
+        """
+        previous = self._snapshots[-1] if len(self._snapshots) > 0 else None
+        snapshot = Snapshot(data, previous)
+        self._snapshots.append(snapshot)
+        return snapshot
+
+    def peek(self, steps: int = 1) -> 'Optional[Snapshot]':
+        """Get a snapshot without removing it from the History.
+
+        :param steps: How many steps back to look; 1 is the latest snapshot
+        :return: The snapshot, or None if the History is not that long
+        """
+        if steps <= 0 or steps > len(self._snapshots):
+            return None
+        return self._snapshots[-steps]
+
+    def pop(self, steps: int = 1) -> 'Optional[Snapshot]':
+        """Remove snapshots from the History, returning the oldest removed.
+
+        :param steps: How many snapshots to remove
+        :return: The snapshot taken steps actions ago, or None if the History
+                 is not that long
+        """
+        snapshot = self.peek(steps)
+        if snapshot is not None:
+            for _ in range(steps):
+                self._snapshots.pop()
+        return snapshot
+
+
 class GameData(object):
     """Collection of data which can be thought of as the games state.
 
@@ -44,28 +178,56 @@ class GameData(object):
         self._game_object = game_object  # type: Game
         self._state = GameState.Stopped  # type: GameState
         self._add_loc_text = False  # type: bool
+        self._defer_depth = 0  # type: int
+        self._pending_display = None  # type: Optional[resource.Displayable]
+        self._pending_options = None  # type: Optional[options.OptionList]
+        # Counts the requests to change the options shown, so that a click on
+        # an option frame which was already replaced can be ignored
+        self.options_generation = 0  # type: int
+        # The monster whose fight is shown by the view, if any
+        self._fight_shown = None  # type: Optional[NonPlayerCharacter]
 
         self.player = actor.Player()
         self.monster = None  # type: Optional[NonPlayerCharacter]
         self.location = None  # type: Optional[Location]
         self.fight = None  # type: None
         self.dialog = None  # type: Optional[Dialog]
-        self.time = None  # type: None
+        self.changes = changes.ChangeBus()
+        self.time = clock.Clock(game_object)
         self.resources = resources.Resources()
-        self.variables = dict()  # type: Dict[str, Any]
-        self.temp = dict()  # type: Dict[str, Any]
+        self.variables = variables.VariableStore()
+        self.temp = variables.VariableStore()
+        self.flags = flags.FlagSet(flags.FlagRegistry())
+        self.changes.subscribe(changes.Change.Time, self._time_changed)
 
-    def start(self) -> None:
+    def start(self, seed: 'Optional[int]' = None) -> None:
         """Set the current location, fight, and dialog to None and then apply
         all callbacks.
+
+        The random number generator of the Game is re-seeded before anything
+        else happens so that the session can be recorded and replayed.
+
+        :param seed: The seed to start the game with, or None for a new seed
         """
         self.location = None
         self.fight = None
         self.dialog = None
+        self.time.clear()
+
+        self._game_object.history.clear()
+        seed = self._game_object.reseed(seed)
+        recorder = self._game_object.recorder
+        if recorder is not None:
+            recorder.begin(seed, self.player)
+
+        self.player.stats.remove_listener(self._stat_changed)
+        self.player.stats.add_listener(self._stat_changed)
 
         r_type = resource.ResourceType.Callback
-        for _, _, callback in self.resources.enumerate(r_type):
-            callback.apply(self._game_object)
+        with self.deferred_display():
+            for _, _, callback in self.resources.enumerate(r_type):
+                callback.apply(self._game_object)
+            self.changes.publish_all()
 
         if self.location is None:
             self._game_object.log.error(
@@ -88,15 +250,17 @@ class GameData(object):
                 "Could not find location {}", location_id
             )
             return
-        self._state = GameState.Location
-        self.location = typing.cast('Location', instance)
-        self._add_loc_text = True
-        self.location.start(self._game_object)
-        # Only display if the current state is GameState.Location and our
-        # instance is the correct instance
-        if self._state == GameState.Location and instance is self.location:
-            if self.location is not None:
-                self._display(self.location)
+        with self._game_object.tracer.span("location", location_id):
+            self._state = GameState.Location
+            self.location = typing.cast('Location', instance)
+            self._add_loc_text = True
+            self.location.start(self._game_object)
+            # Only display if the current state is GameState.Location and our
+            # instance is the correct instance
+            if self._state == GameState.Location and instance is self.location:
+                if self.location is not None:
+                    self._display(self.location)
+        self.changes.publish(changes.Change.Location, location_id)
 
     def set_dialog(self, dialog_id: str) -> None:
         """Attempt to set the current dialog to the one denoted by the given
@@ -115,18 +279,18 @@ class GameData(object):
 
     def set_fight(self, monster_id: str) -> None:
         self._state = GameState.Fight
-        self.monster = self.resources.get(
-            resource.ResourceType.Actor, monster_id
-        )
-        view = self._game_object.stack.current()
-        if view.is_game_view():
-            view.fight_start(self.monster)
+        self.monster = self._spawn(monster_id)
+        self.options_generation += 1
+        # The fight replaces whatever was waiting to be displayed
+        self._pending_display = None
+        self._pending_options = None
+        if self._defer_depth == 0:
+            self._sync_fight()
 
     def stop_fight(self) -> None:
         self._state = GameState.Location
-        view = self._game_object.stack.current()
-        if view.is_game_view():
-            view.fight_end()
+        if self._defer_depth == 0:
+            self._sync_fight()
 
         self.resume_display()
 
@@ -137,7 +301,7 @@ class GameData(object):
                  GameView interface
         """
         view = self._game_object.stack.current()
-        return view if view.is_game_view() else None
+        return view if view is not None and view.is_game_view() else None
 
     def state(self) -> GameState:
         """Get the GameState value representing the current state of the game.
@@ -146,6 +310,159 @@ class GameData(object):
         """
         return self._state
 
+    def random_state(self) -> 'Any':
+        """Get the state of the random number generator of the Game.
+
+        :return: The state of the Game.random object
+        """
+        return self._game_object.random.getstate()
+
+    def pack(self) -> 'Dict[str, Any]':
+        """Convert this GameData into a dictionary of plain values.
+
+        Resources are stored by resource_id; the only objects stored are the
+        GameEvents scheduled on the clock. This is the body of a save game;
+        see rpg.io.save.
+
+        :return: A dictionary describing the state of the game
+        """
+        player = self.player
+        monster = self.monster
+        return {
+            'state': int(self._state),
+            'location': _resource_id(self.location),
+            'dialog': _resource_id(self.dialog),
+            'monster': _resource_id(monster),
+            'monster_stats': (
+                monster.stats.snapshot() if monster is not None else None
+            ),
+            'player': {
+                'name': player.name(),
+                'attribute_points': player.attribute_points,
+                'stats': player.stats.snapshot(),
+                # Each stack is packed, so that units of unstackable items
+                # which were separated stay apart from their group
+                'inventory': [
+                    (
+                        stack.item().resource_id(), stack.count(),
+                        stack.item().unique()
+                    ) for stack in player.inventory.slots
+                ],
+            },
+            'variables': self.variables.pack(),
+            'temp': self.temp.pack(),
+            'flag_names': self.flags.registry.names(),
+            'flags': self.flags.to_bytes(),
+            'time': self.time.snapshot(),
+            'random': self.random_state(),
+        }
+
+    def unpack(self, data: 'Dict[str, Any]') -> None:
+        """Set the state of this GameData from a dictionary created by
+        GameData.pack().
+
+        The resources must already be built. The current displayable is not
+        redisplayed.
+
+        :param data: The dictionary to load the state from
+        """
+        r_type = resource.ResourceType
+        self._state = GameState(data['state'])
+        self.location = self._get(r_type.Location, data['location'])
+        self.dialog = self._get(r_type.Dialog, data['dialog'])
+        self.monster = self._spawn(data['monster'])
+        if self.monster is not None and data['monster_stats'] is not None:
+            self.monster.stats.restore(data['monster_stats'])
+
+        player = data['player']
+        self.player.name(player['name'])
+        self.player.attribute_points = player['attribute_points']
+        self.player.stats.restore(player['stats'])
+        stacks = list()  # type: List[Tuple[inventory.ItemInstance, int]]
+        for entry in player['inventory']:
+            # Games saved before stacks were packed with their grouping hold
+            # (item_id, count) pairs
+            unique = len(entry) > 2 and entry[2]
+            stacks.append(
+                (inventory.ItemInstance(entry[0], unique=unique), entry[1])
+            )
+        self.player.inventory.restore(tuple(stacks))
+        self.player.inventory.bind(self._game_object)
+
+        self.variables.clear()
+        self.variables.unpack(data['variables'])
+        self.variables.clear_dirty()
+        self.temp.clear()
+        self.temp.unpack(data['temp'])
+        self.temp.clear_dirty()
+
+        # Flags are stored as raw bits, which are only valid if the same flags
+        # were declared in the same order; otherwise remap them by name
+        registry = self.flags.registry
+        if data['flag_names'] == registry.names():
+            self.flags.from_bytes(data['flags'])
+        else:
+            saved = flags.FlagRegistry()
+            saved_flags = flags.FlagSet(saved)
+            for name in data['flag_names']:
+                saved.declare(name)
+            saved_flags.from_bytes(data['flags'])
+            self.flags.clear()
+            for name in data['flag_names']:
+                if name in registry and saved_flags.test(name):
+                    self.flags.set(name)
+
+        self.time.restore(data['time'])
+        self._game_object.random.setstate(data['random'])
+        self.changes.publish_all()
+
+    def snapshot(self, previous: 'Optional[Snapshot]' = None) -> 'Snapshot':
+        """Take an immutable snapshot of the current state.
+
+        :param previous: A previous snapshot to share unchanged parts with
+        :return: A Snapshot of this GameData
+        """
+        return Snapshot(self, previous)
+
+    def restore(self, snapshot: 'Snapshot') -> None:
+        """Return the game to the state stored in a Snapshot.
+
+        The current displayable is redisplayed afterwards.
+
+        :param snapshot: The Snapshot to restore
+        """
+        change = changes.Change
+        if snapshot.location is not self.location:
+            self.changes.publish(
+                change.Location, _resource_id(snapshot.location)
+            )
+        if snapshot.name != self.player.name():
+            self.changes.publish(change.Player)
+        if snapshot.inventory is not self.player.inventory.snapshot():
+            self.changes.publish(change.Inventory)
+
+        self._state = snapshot.state
+        self.location = snapshot.location
+        self.dialog = snapshot.dialog
+        self.monster = snapshot.monster
+        if self.monster is not None and snapshot.monster_stats is not None:
+            self.monster.stats.restore(snapshot.monster_stats)
+        self.player.name(snapshot.name)
+        self.player.attribute_points = snapshot.attribute_points
+        self.player.stats.restore(snapshot.stats)
+        self.player.inventory.restore(snapshot.inventory)
+        self.variables.restore(snapshot.variables)
+        self.temp.restore(snapshot.temp)
+        self.flags.restore(snapshot.flags)
+        self.time.restore(snapshot.time)
+        self._game_object.random.setstate(snapshot.random)
+
+        # Starting or ending the fight on the view happens as the display is
+        # flushed
+        with self.deferred_display():
+            if self._state in (GameState.Location, GameState.Dialog):
+                self.resume_display()
+
     def resume_display(self) -> None:
         """Force the current displayable to be redisplayed.
 
@@ -162,12 +479,158 @@ class GameData(object):
                 self._state.name
             )
 
+    def _stat_changed(self, key: str) -> None:
+        self.changes.publish(changes.Change.Stat, key)
+
+    def _time_changed(self, kind: 'changes.Change',
+                      key: 'Optional[str]') -> None:
+        """Remove the attribute modifiers which expired."""
+        now = self.time.now()
+        self.player.stats.expire(now)
+        if self.monster is not None:
+            self.monster.stats.expire(now)
+
+    def _spawn(self, monster_id: 'Optional[str]'
+               ) -> 'Optional[NonPlayerCharacter]':
+        """Create the instance of a monster fought in this game.
+
+        :param monster_id: The resource_id of the monster, or None
+        :return: A new instance of the monster, or None
+        """
+        monster = self._get(resource.ResourceType.Actor, monster_id)
+        if monster is None:
+            return None
+        return monster.spawn()
+
+    def _get(self, type_id: 'resource.ResourceType',
+             resource_id: 'Optional[str]') -> 'Any':
+        """Look up a resource which may be None.
+
+        :param type_id: The type of the resource
+        :param resource_id: The resource_id to look up, or None
+        :return: The resource, or None
+        """
+        if resource_id is None:
+            return None
+        return self.resources.get(type_id, resource_id)
+
+    def set_options(self, option_list: 'options.OptionList') -> None:
+        """Change the OptionList displayed without changing the displayable.
+
+        :param option_list: The OptionList to display
+        """
+        self.options_generation += 1
+        if self._defer_depth > 0:
+            self._pending_options = option_list
+            return
+
+        view = self.game_view()
+        if view is not None:
+            view.set_options(option_list)
+
+    @contextlib.contextmanager
+    def deferred_display(self) -> 'Iterator[None]':
+        """Context manager which coalesces display requests.
+
+        While inside the context, requests to display a Displayable or to
+        change the options are recorded instead of being sent to the view.
+        When the outermost context exits only the last requested state is
+        displayed, so a chain of events causes at most one redraw. Published
+        state changes are held for the same duration.
+        """
+        self._defer_depth += 1
+        try:
+            with self.changes.hold():
+                yield
+        finally:
+            self._defer_depth -= 1
+            if self._defer_depth == 0:
+                self._flush_display()
+
+    @contextlib.contextmanager
+    def transaction(self, snapshot: 'Optional[Snapshot]' = None
+                    ) -> 'Iterator[None]':
+        """Context manager which applies changes to the state atomically.
+
+        Display and published state changes are deferred until the outermost
+        transaction (or deferred_display() context) exits, so only the final
+        state is rendered. If an exception leaves the context, everything
+        waiting to be displayed is discarded and the state is restored to how
+        it was when the transaction began before the exception is re-raised.
+        Content can raise Rollback to reject an action.
+
+        :param snapshot: A snapshot of the current state, if one was already
+                         taken, to restore on failure
+        """
+        if snapshot is None:
+            snapshot = Snapshot(self, self._game_object.history.peek())
+        generation = self.options_generation
+        with self.deferred_display():
+            try:
+                yield
+            except BaseException:
+                self._pending_display = None
+                self._pending_options = None
+                self.options_generation = generation
+                self.changes.discard()
+                self.restore(snapshot)
+                raise
+
+    def _sync_fight(self) -> None:
+        """Start or end the fight on the view to match the current state."""
+        view = self.game_view()
+        if view is None:
+            return
+        if self._state == GameState.Fight:
+            if self._fight_shown is not self.monster:
+                self._fight_shown = self.monster
+                view.fight_start(self.monster)
+            else:
+                view.fight_update(self.monster)
+        elif self._fight_shown is not None:
+            self._fight_shown = None
+            view.fight_end()
+
+    def _flush_display(self) -> None:
+        """Send any display requests recorded by deferred_display() to the
+        view.
+        """
+        # Ending a fight redisplays the current displayable, which should be
+        # coalesced with the pending display
+        self._defer_depth += 1
+        try:
+            self._sync_fight()
+        finally:
+            self._defer_depth -= 1
+
+        displayable = self._pending_display
+        option_list = self._pending_options
+        self._pending_display = None
+        self._pending_options = None
+
+        view = self.game_view()
+        if view is None:
+            return
+        if displayable is not None:
+            view.display(displayable)
+        if option_list is not None:
+            view.set_options(option_list)
+
     def _display(self, displayable: 'resource.Displayable'):
         """Display the given Displayable resource if the current View is the
         GameView.
 
+        If display is currently deferred, the request replaces any earlier
+        pending request instead.
+
         :param displayable: The displayable to display
         """
+        self.options_generation += 1
+        if self._defer_depth > 0:
+            self._pending_display = displayable
+            self._pending_options = None
+            return
+
         view = self.game_view()
         if view is not None:
             view.display(displayable)
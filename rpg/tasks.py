@@ -0,0 +1,316 @@
+"""Running GameEvents which are coroutines.
+
+GameEvent.apply() may be defined with 'async def'. Rather than blocking the
+tkinter thread until a long action (such as batch crafting or travel) is
+complete, the coroutine is run as a task on an asyncio event loop which is
+pumped from the tkinter main loop with after(). Each time the coroutine awaits
+something, input is processed and the window is redrawn.
+
+    class CraftEvent(GameEvent):
+        async def apply(self, game):
+            for i in range(self.count):
+                game.state.player.inventory.add(self.item_id)
+                tasks.report_progress((i + 1) / self.count, "Crafting")
+                await tasks.checkpoint()
+
+A running task can be cancelled with TaskHandle.cancel(); asyncio raises
+CancelledError inside the coroutine at its next await. Without a tkinter root
+(e.g. in a headless game) the task is run to completion immediately, so
+replays and benchmarks stay deterministic.
+
+The part of a task between two awaits runs in a GameData transaction, like a
+synchronous GameEvent does: if it raises, including raising state.Rollback,
+the changes it made are rolled back and the task ends. Undoing the GameEvent
+restores the state from before it was applied, which reverts everything its
+task did, but does not stop a task which is still running.
+
+The asyncio loop is pumped soon (after PumpInterval) while a task is ready to
+continue, and only every IdleInterval while every task waits for a future,
+such as a timer or a future completed by another thread.
+"""
+
+import asyncio
+import contextvars
+from enum import IntEnum, unique
+import inspect
+from rpg import state, util
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.app import Game
+    from rpg.event import GameEvent
+    from typing import Any, Awaitable, Callable, Generator, List, Optional
+
+# The delay in ms before pumping the asyncio loop when a task is ready
+PumpInterval = 10
+# The delay in ms between pumps while every task waits without a timer
+IdleInterval = 100
+
+_current: 'contextvars.ContextVar[Optional[TaskHandle]]'
+_current = contextvars.ContextVar('current_task', default=None)
+
+
+@unique
+class TaskState(IntEnum):
+    Running = 0
+    Done = 1
+    Cancelled = 2
+    Failed = 3
+
+
+class TaskHandle(object):
+    """A handle to a GameEvent coroutine running on a TaskRunner."""
+
+    def __init__(self, runner: 'TaskRunner',
+                 game_event: 'GameEvent') -> None:
+        self.event = game_event
+        self.progress = 0.0
+        self.message = ""
+        self.state = TaskState.Running
+        self._runner = runner
+        self._task = None  # type: Optional[asyncio.Task]
+        # The future the task is waiting for, or None if it can continue
+        self._waiting = None  # type: Optional[asyncio.Future]
+
+    def done(self) -> bool:
+        return self.state != TaskState.Running
+
+    def ready(self) -> bool:
+        """Check if the task can continue the next time the loop is pumped.
+
+        :return: False if the task is waiting for a future which is not done
+        """
+        return self._waiting is None or self._waiting.done()
+
+    def report(self, progress: float, message: 'Optional[str]' = None) -> None:
+        """Report how far the task has progressed.
+
+        :param progress: The fraction of the task which is complete
+        :param message: A description of what the task is doing, or None to
+                        keep the last description
+        """
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        self._runner.notify(self)
+
+    def cancel(self) -> None:
+        """Cancel the task at its next await."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
+def current() -> 'Optional[TaskHandle]':
+    """Get the handle of the task which is currently running.
+
+    :return: The TaskHandle, or None if not called from a task
+    """
+    return _current.get()
+
+
+def report_progress(progress: float, message: 'Optional[str]' = None) -> None:
+    """Report the progress of the task which is currently running.
+
+    Does nothing if not called from a task.
+
+    :param progress: The fraction of the task which is complete
+    :param message: A description of what the task is doing
+    """
+    handle = _current.get()
+    if handle is not None:
+        handle.report(progress, message)
+
+
+async def checkpoint() -> None:
+    """Yield to the tkinter main loop so input can be processed."""
+    await asyncio.sleep(0)
+
+
+class _Transactional(object):
+    """An awaitable which runs every step of another awaitable, up to its
+    next await, in a transaction of the GameData, and records on the handle
+    of the task what each step waits for.
+    """
+
+    def __init__(self, data: 'state.GameData', handle: 'TaskHandle',
+                 awaitable: 'Awaitable[Any]') -> None:
+        self._data = data
+        self._handle = handle
+        self._awaitable = awaitable
+
+    def __await__(self) -> 'Generator[Any, Any, Any]':
+        steps = self._awaitable.__await__()
+        value = None  # type: Any
+        error = None  # type: Optional[BaseException]
+        while True:
+            with self._data.transaction():
+                try:
+                    if error is None:
+                        yielded = steps.send(value)
+                    else:
+                        yielded = steps.throw(error)
+                except StopIteration as e:
+                    return e.value
+            # A bare yield, as used by asyncio.sleep(0), continues right away
+            self._handle._waiting = (
+                yielded if asyncio.isfuture(yielded) else None
+            )
+            try:
+                value = yield yielded
+                error = None
+            except BaseException as e:
+                value = None
+                error = e
+
+
+class TaskRunner(object):
+    """Runs GameEvent coroutines on an asyncio loop pumped by tkinter."""
+
+    def __init__(self, game: 'Game') -> None:
+        """Create a new TaskRunner.
+
+        :param game: The Game instance tasks are run for
+        """
+        self._game = game
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._handles = list()  # type: List[TaskHandle]
+        self._listeners = list()  # type: List[Callable[[TaskHandle], None]]
+        self._pump_scheduled = False
+
+    def apply(self, game_event: 'GameEvent') -> 'Optional[TaskHandle]':
+        """Apply a GameEvent, starting a task if it is a coroutine.
+
+        :param game_event: The GameEvent to apply
+        :return: The handle of the started task, or None if the event was
+                 applied immediately
+        """
+        result = game_event.apply(self._game)
+        if inspect.isawaitable(result):
+            return self.start(game_event, result)
+        return None
+
+    def start(self, game_event: 'GameEvent',
+              awaitable: 'Awaitable[Any]') -> 'TaskHandle':
+        """Run an awaitable created by a GameEvent as a task.
+
+        :param game_event: The GameEvent the awaitable belongs to
+        :param awaitable: The awaitable to run
+        :return: A handle to the task
+        """
+        loop = self._get_loop()
+        handle = TaskHandle(self, game_event)
+        self._handles.append(handle)
+        handle._task = loop.create_task(self._run(handle, awaitable))
+        handle._task.add_done_callback(lambda _: self._finished(handle))
+
+        # If started from another task the running loop picks the task up
+        if not loop.is_running():
+            if self._game.root() is None:
+                # Also finish any tasks started by this one
+                while len(self._handles) > 0:
+                    loop.run_until_complete(asyncio.wait(
+                        [h._task for h in self._handles]
+                    ))
+            else:
+                self._schedule_pump()
+        return handle
+
+    def running(self) -> 'List[TaskHandle]':
+        """Get the handles of every task which has not finished.
+
+        :return: A list of TaskHandles
+        """
+        return list(self._handles)
+
+    def cancel_all(self) -> None:
+        """Cancel every running task."""
+        for handle in self._handles:
+            handle.cancel()
+
+    def add_listener(self, listener: 'Callable[[TaskHandle], None]') -> None:
+        """Add a function called when a task reports progress or finishes.
+
+        :param listener: A function taking the TaskHandle
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self,
+                        listener: 'Callable[[TaskHandle], None]') -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def notify(self, handle: 'TaskHandle') -> None:
+        for listener in self._listeners:
+            listener(handle)
+
+    def close(self) -> None:
+        """Cancel every task and close the asyncio loop."""
+        if self._loop is None:
+            return
+        self.cancel_all()
+        while len(self._handles) > 0 and not self._loop.is_running():
+            self._step()
+        self._loop.close()
+        self._loop = None
+
+    def _get_loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    async def _run(self, handle: 'TaskHandle',
+                   awaitable: 'Awaitable[Any]') -> None:
+        _current.set(handle)
+        try:
+            await _Transactional(self._game.state, handle, awaitable)
+        except asyncio.CancelledError:
+            raise
+        except state.Rollback as e:
+            handle.state = TaskState.Failed
+            self._game.log.debug(
+                "Rolled back task {}: {}", handle.event.action(), e
+            )
+        except Exception as e:
+            handle.state = TaskState.Failed
+            self._game.log.error(
+                "Task {} failed:\n{}", handle.event.action(),
+                util.format_exception(e)
+            )
+
+    def _finished(self, handle: 'TaskHandle') -> None:
+        if handle._task.cancelled():
+            handle.state = TaskState.Cancelled
+        elif handle.state == TaskState.Running:
+            handle.state = TaskState.Done
+            handle.progress = 1.0
+        self._handles.remove(handle)
+        self.notify(handle)
+
+    def _step(self) -> None:
+        """Run a single iteration of the asyncio loop."""
+        self._loop.call_soon(self._loop.stop)
+        self._loop.run_forever()
+
+    def _schedule_pump(self, delay: int = PumpInterval) -> None:
+        if not self._pump_scheduled:
+            self._pump_scheduled = True
+            self._game.root().after(delay, self._pump)
+
+    def _next_pump(self) -> int:
+        """Get how long the asyncio loop can be left alone.
+
+        :return: The delay in ms before the loop should be pumped again
+        """
+        if any(handle.ready() for handle in self._handles):
+            return PumpInterval
+        return IdleInterval
+
+    def _pump(self) -> None:
+        self._pump_scheduled = False
+        if self._loop is None:
+            return
+        with self._game.tracer.span("tasks"):
+            with self._game.state.deferred_display():
+                self._step()
+        if len(self._handles) > 0 and self._game.root() is not None:
+            self._schedule_pump(self._next_pump())
@@ -0,0 +1,245 @@
+"""Optional timing instrumentation for the game.
+
+The Tracer records how long various parts of the game take: applying
+GameEvents, displaying Displayables (including their title, text and options
+calls) and changing locations. Timings are kept per key in a histogram, and
+recent timings are kept as trees of nested spans so it is possible to see
+which part of an action was slow.
+
+The tracer is disabled by default. While disabled, Tracer.span() returns a
+shared no-op context manager, so instrumented code pays for little more than a
+method call. It is available from the debug console as 'trace':
+
+    >>> trace.enable()
+    ... play the game ...
+    >>> print(trace.report())
+    >>> trace.dump("trace.json")
+"""
+
+import collections
+import json
+import time
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.app import Game
+    from rpg.data.resource import Displayable
+    from rpg.ui.options import OptionList
+    from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+def render(game: 'Game', displayable: 'Displayable'
+           ) -> 'Tuple[str, str, OptionList]':
+    """Get what a GameView displays for a Displayable, timing the title,
+    text and options calls on the tracer of the game.
+
+    :param game: The Game instance
+    :param displayable: The Displayable to render
+    :return: The title, text and options of the displayable
+    """
+    tracer = game.tracer
+    resource_id = displayable.resource_id()
+    with tracer.span("title", resource_id):
+        title = displayable.title(game)
+    with tracer.span("text", resource_id):
+        text = displayable.text(game)
+    with tracer.span("options", resource_id):
+        option_list = displayable.options(game)
+    return title, text, option_list
+
+
+class Histogram(object):
+    """A latency histogram with power of two buckets of microseconds."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = list()  # type: List[int]
+
+    def add(self, seconds: float) -> None:
+        """Add a single timing to the histogram.
+
+        :param seconds: The timing to add, in seconds
+        """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = int(seconds * 1000000).bit_length()
+        missing = bucket + 1 - len(self.buckets)
+        if missing > 0:
+            self.buckets.extend(0 for _ in range(missing))
+        self.buckets[bucket] += 1
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a percentile of the timings.
+
+        The estimate is the upper bound of the bucket holding the percentile,
+        so it may be up to twice the real value.
+
+        :param fraction: The percentile as a fraction, e.g. 0.99
+        :return: The estimated timing in seconds
+        """
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min((1 << bucket) / 1000000.0, self.max)
+        return self.max
+
+    def pack(self) -> 'Dict[str, Any]':
+        return {
+            'count': self.count, 'total': self.total, 'max': self.max,
+            'mean': self.mean(), 'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99), 'buckets_us_log2': self.buckets,
+        }
+
+
+class Span(object):
+    """A single timed section of code, possibly containing nested spans."""
+
+    def __init__(self, tracer: 'Tracer', key: str) -> None:
+        self.key = key
+        self.start = 0.0
+        self.duration = 0.0
+        self.children = list()  # type: List[Span]
+        self._tracer = tracer
+
+    def __enter__(self) -> 'Span':
+        self._tracer._push(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.duration = time.perf_counter() - self.start
+        self._tracer._pop(self)
+
+    def pack(self) -> 'Dict[str, Any]':
+        return {
+            'key': self.key, 'duration': self.duration,
+            'children': [child.pack() for child in self.children],
+        }
+
+
+class _NullSpan(object):
+    """The context manager returned by a disabled Tracer."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class Tracer(object):
+    """Collects timings of instrumented sections of the game."""
+
+    def __init__(self, max_traces: int = 100) -> None:
+        """Create a new, disabled Tracer.
+
+        :param max_traces: How many of the most recent top-level spans to keep
+        """
+        self.enabled = False
+        self.histograms = dict()  # type: Dict[str, Histogram]
+        self.traces: 'Deque[Span]' = collections.deque(maxlen=max_traces)
+        self._stack = list()  # type: List[Span]
+
+    def enable(self) -> None:
+        """Start collecting timings."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop collecting timings. Collected timings are kept."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Remove every collected timing."""
+        self.histograms.clear()
+        self.traces.clear()
+        self._stack.clear()
+
+    def span(self, category: str, name: 'Optional[str]' = None) -> 'Any':
+        """Create a context manager which times the code inside it.
+
+        Timings are recorded under the key "category:name", or just the
+        category if no name is given.
+
+        :param category: The kind of section being timed, e.g. "event"
+        :param name: What is being timed, e.g. the type of an event
+        :return: A context manager
+        """
+        if not self.enabled:
+            return _null_span
+        key = category if name is None else "{}:{}".format(category, name)
+        return Span(self, key)
+
+    def report(self, limit: int = 20) -> str:
+        """Create a table of the slowest keys by total time.
+
+        :param limit: The maximum number of keys to include
+        :return: The report as a string
+        """
+        lines = ["{:<40} {:>7} {:>10} {:>10} {:>10} {:>10}".format(
+            "key", "count", "total ms", "mean ms", "p99 ms", "max ms"
+        )]
+        ordered = sorted(
+            self.histograms.items(), key=lambda kv: kv[1].total, reverse=True
+        )
+        for key, histogram in ordered[:limit]:
+            lines.append(
+                "{:<40} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+                    key[:40], histogram.count, histogram.total * 1000,
+                    histogram.mean() * 1000,
+                    histogram.percentile(0.99) * 1000, histogram.max * 1000
+                )
+            )
+        return "\n".join(lines)
+
+    def pack(self) -> 'Dict[str, Any]':
+        """Get every collected timing as plain values.
+
+        :return: A dictionary which can be written as JSON
+        """
+        return {
+            'histograms': {
+                key: histogram.pack()
+                for key, histogram in self.histograms.items()
+            },
+            'traces': [span.pack() for span in self.traces],
+        }
+
+    def dump(self, filename: str) -> None:
+        """Write every collected timing to a JSON file.
+
+        :param filename: The path of the file to write
+        """
+        with open(filename, "w") as fp:
+            json.dump(self.pack(), fp, indent=2)
+
+    def _push(self, span: 'Span') -> None:
+        if len(self._stack) > 0:
+            self._stack[-1].children.append(span)
+        self._stack.append(span)
+
+    def _pop(self, span: 'Span') -> None:
+        # Spans always close in order; anything above this span was left open
+        # by an exception and is discarded
+        while len(self._stack) > 0 and self._stack.pop() is not span:
+            pass
+        histogram = self.histograms.get(span.key, None)
+        if histogram is None:
+            histogram = Histogram()
+            self.histograms[span.key] = histogram
+        histogram.add(span.duration)
+        if len(self._stack) == 0:
+            self.traces.append(span)
@@ -8,14 +8,17 @@ status bar).
 """
 
 import tkinter as tk
+from rpg import event
+from rpg.changes import Change
 from rpg.ui import console, widgets
 
 import typing
 if typing.TYPE_CHECKING:
     from rpg.app import Game
-    from rpg.data.inventory import Inventory, ItemStack
+    from rpg.data.inventory import ItemStack
     from rpg.data.actor import Actor, Player, NonPlayerCharacter
-    from typing import Callable, Dict, List, Optional
+    from typing import Callable, Dict, List, Optional, Sequence, Tuple
+    Watch = Tuple[Change, Optional[str]]
 
 StatusBarSectionItem = typing.Tuple[
     str, tk.Widget, typing.Optional[typing.Callable]
@@ -54,6 +57,9 @@ class RootMenuBar(tk.Menu):
         self.debug_menu.add_command(
             label="Open Console", command=self._action_console
         )
+        self.debug_menu.add_command(
+            label="Undo Last Action", command=self._action_undo
+        )
         self.add_cascade(label="Debug", menu=self.debug_menu)
 
     def _action_save(self) -> None:
@@ -72,6 +78,9 @@ class RootMenuBar(tk.Menu):
         root = self._game_obj.root()
         self._console = console.ConsoleWindow(root, self._console_state)
 
+    def _action_undo(self) -> None:
+        self._game_obj.apply_event(event.UndoEvent())
+
 
 class StatusBarSection(tk.Frame):
     def __init__(self, root: tk.Frame, name: 'Optional[str]',
@@ -82,6 +91,9 @@ class StatusBarSection(tk.Frame):
         self._items = list()    # type: List[StatusBarSectionItem]
         self._removed = list()  # type: List[int]
         self._added = list()    # type: List[StatusBarSectionItemAddition]
+        self._watches = dict()  # type: Dict[str, Sequence[Watch]]
+        self._watched: 'Dict[Watch, List[StatusBarSectionItem]]'
+        self._watched = dict()
 
         self._title = None
         if name is not None and name != "":
@@ -101,7 +113,19 @@ class StatusBarSection(tk.Frame):
             self._add_all()
 
     def add_item(self, key: str, widget: tk.Widget,
-                 update_fn: 'Optional[Callable]' = None, **kwargs) -> None:
+                 update_fn: 'Optional[Callable]' = None,
+                 watch: 'Sequence[Watch]' = (), **kwargs) -> None:
+        """Add a widget to this section.
+
+        :param key: The key used to look up or remove the widget
+        :param widget: The widget to add
+        :param update_fn: A function called with the widget, the player and
+                          the Game to update the widget
+        :param watch: The (Change, key) pairs which the widget displays; the
+                      widget is only updated when one of them is published
+        :param kwargs: Keyword arguments used to pack the widget
+        """
+        self._watches[key] = watch
         self._added.append(((key, widget, update_fn), kwargs))
         if not self._lock:
             self._add_all()
@@ -130,14 +154,44 @@ class StatusBarSection(tk.Frame):
             if callable(update_fn):
                 update_fn(widget, player, game)
 
+    def update_changed(self, kind: 'Change', key: 'Optional[str]',
+                       player: 'Actor', game: 'Game') -> None:
+        """Update only the widgets which watch the given change.
+
+        :param kind: The kind of change published
+        :param key: What changed, or None if anything of the kind may have
+        :param player: The player to get values from
+        :param game: The Game instance
+        """
+        if key is None:
+            items = [
+                item for watch, items in self._watched.items()
+                if watch[0] == kind for item in items
+            ]
+        else:
+            items = self._watched.get((kind, key), list())
+            items = items + self._watched.get((kind, None), list())
+        for _, widget, update_fn in items:
+            if callable(update_fn):
+                update_fn(widget, player, game)
+
     def _remove_all(self) -> None:
         self._removed.sort()
         # Guaranteed to be invalid - used to skip duplicate removals
         last = len(self._items) + 1
-        for idx in self._removed:
+        for idx in reversed(self._removed):
             if idx != last:
+                self._watches.pop(self._items[idx][0], None)
                 self._items.pop(idx)
             last = idx
+        self._removed.clear()
+        self._index()
+
+    def _index(self) -> None:
+        self._watched.clear()
+        for item in self._items:
+            for watch in self._watches.get(item[0], ()):
+                self._watched.setdefault(watch, list()).append(item)
 
     def _add_all(self) -> None:
         for item, kwargs in self._added:
@@ -150,6 +204,7 @@ class StatusBarSection(tk.Frame):
                 kwargs['anchor'] = 'w'
             item[1].pack(**kwargs)
         self._added.clear()
+        self._index()
 
 
 class StatusBar(tk.Frame):
@@ -170,16 +225,20 @@ class StatusBar(tk.Frame):
             "name", widgets.LabeledVariable(
                 header, "Name:", font=status_bar._font_name
             ),
-            lambda w, p, g: w.get_variable().set(p.name())
+            lambda w, p, g: w.get_variable().set(p.name()),
+            watch=((Change.Player, None),)
         )
 
         def _stat_up(key: str, short: bool = True):
             def _update_stat(w, p, _):
                 # TODO: Set the color of the variable label instance
-                w.get_variable().set(getattr(p.stats, key).string(short))
+                w.get_variable().set(p.stats.string(key, short))
 
             return _update_stat
 
+        def _stat_watch(key: str):
+            return (Change.Player, None), (Change.Stat, key)
+
         def create_stat(parent, label):
             return widgets.LabeledVariable(
                 parent, label, font=status_bar._font_item, expand=True
@@ -187,50 +246,50 @@ class StatusBar(tk.Frame):
 
         core = status_bar.add_section("core", "Core Stats")
         core.add_item(
-            "str", create_stat(core, "Strength"), _stat_up("strength"),
-            expand=True
+            "str", create_stat(core, "Strength"), _stat_up("str"),
+            watch=_stat_watch("str"), expand=True
         )
         core.add_item(
-            "dex", create_stat(core, "Dexterity"), _stat_up("dexterity"),
-            expand=True
+            "dex", create_stat(core, "Dexterity"), _stat_up("dex"),
+            watch=_stat_watch("dex"), expand=True
         )
         core.add_item(
-            "con", create_stat(core, "Constitution"), _stat_up("constitution"),
-            expand=True
+            "con", create_stat(core, "Constitution"), _stat_up("con"),
+            watch=_stat_watch("con"), expand=True
         )
         core.add_item(
-            "agl", create_stat(core, "Agility"), _stat_up("agility"),
-            expand=True
+            "agl", create_stat(core, "Agility"), _stat_up("agl"),
+            watch=_stat_watch("agl"), expand=True
         )
         core.add_item(
-            "int", create_stat(core, "Intelligence"), _stat_up("intelligence"),
-            expand=True
+            "int", create_stat(core, "Intelligence"), _stat_up("int"),
+            watch=_stat_watch("int"), expand=True
         )
         core.add_item(
-            "wis", create_stat(core, "Wisdom"), _stat_up("wisdom"),
-            expand=True
+            "wis", create_stat(core, "Wisdom"), _stat_up("wis"),
+            watch=_stat_watch("wis"), expand=True
         )
         core.add_item(
-            "cha", create_stat(core, "Charisma"), _stat_up("charisma"),
-            expand=True
+            "cha", create_stat(core, "Charisma"), _stat_up("cha"),
+            watch=_stat_watch("cha"), expand=True
         )
         core.add_item(
-            "lck", create_stat(core, "Luck"), _stat_up("luck"),
-            expand=True
+            "lck", create_stat(core, "Luck"), _stat_up("lck"),
+            watch=_stat_watch("lck"), expand=True
         )
 
         combat = status_bar.add_section("combat", "Combat Stats")
         combat.add_item(
-            "hp", create_stat(combat, "Health"), _stat_up("health", False),
-            expand=True
+            "hp", create_stat(combat, "Health"), _stat_up("hp", False),
+            watch=_stat_watch("hp"), expand=True
         )
         combat.add_item(
-            "mp", create_stat(combat, "Mana"), _stat_up("mana", False),
-            expand=True
+            "mp", create_stat(combat, "Mana"), _stat_up("mp", False),
+            watch=_stat_watch("mp"), expand=True
         )
         combat.add_item(
-            "st", create_stat(combat, "Stamina"), _stat_up("stamina", False),
-            expand=True
+            "st", create_stat(combat, "Stamina"), _stat_up("st", False),
+            watch=_stat_watch("st"), expand=True
         )
 
         adv = status_bar.add_section("advancement", "Advancement")
@@ -254,12 +313,16 @@ class StatusBar(tk.Frame):
         world.add_item(
             "time", widgets.LabeledVariable(
                 world, "Time", font=status_bar._font_item
-            )
+            ),
+            lambda w, p, g: w.get_variable().set(g.state.time.time_string()),
+            watch=((Change.Time, None),)
         )
         world.add_item(
             "date", widgets.LabeledVariable(
                 world, "Date", font=status_bar._font_item
-            )
+            ),
+            lambda w, p, g: w.get_variable().set(g.state.time.date_string()),
+            watch=((Change.Time, None),)
         )
 
         return status_bar
@@ -279,6 +342,8 @@ class StatusBar(tk.Frame):
         self._font_item = ('Arial', 7)
 
         self._sections = dict()  # type: Dict[str, StatusBarSection]
+        for kind in Change:
+            game.state.changes.subscribe(kind, self._on_change)
 
     def add_section(self, key: str, header: 'Optional[str]',
                     side: str = 'top') -> StatusBarSection:
@@ -305,6 +370,11 @@ class StatusBar(tk.Frame):
         for section in self._sections.values():
             section.update_widgets(_actor, _game)
 
+    def _on_change(self, kind: 'Change', key: 'Optional[str]') -> None:
+        player = self._game.state.player
+        for section in self._sections.values():
+            section.update_changed(kind, key, player, self._game)
+
 
 class AttributeWidget(tk.Frame):
     """Widget for editing an attribute of an actor.
@@ -443,14 +513,14 @@ class AttributeEditorFrame(tk.Frame):
         :param _actor: The Player instance to use for values
         """
         self._points.set(_actor.attribute_points)
-        self._frmStr.value.set(_actor.stats.strength.value())
-        self._frmDex.value.set(_actor.stats.dexterity.value())
-        self._frmCon.value.set(_actor.stats.constitution.value())
-        self._frmAgl.value.set(_actor.stats.agility.value())
-        self._frmInt.value.set(_actor.stats.intelligence.value())
-        self._frmWis.value.set(_actor.stats.wisdom.value())
-        self._frmCha.value.set(_actor.stats.charisma.value())
-        self._frmLck.value.set(_actor.stats.luck.value())
+        self._frmStr.value.set(_actor.stats.strength.level)
+        self._frmDex.value.set(_actor.stats.dexterity.level)
+        self._frmCon.value.set(_actor.stats.constitution.level)
+        self._frmAgl.value.set(_actor.stats.agility.level)
+        self._frmInt.value.set(_actor.stats.intelligence.level)
+        self._frmWis.value.set(_actor.stats.wisdom.level)
+        self._frmCha.value.set(_actor.stats.charisma.level)
+        self._frmLck.value.set(_actor.stats.luck.level)
 
     def write(self, actor: 'Player') -> None:
         """Set the Attribute levels of the given player to the values in the
@@ -459,14 +529,15 @@ class AttributeEditorFrame(tk.Frame):
         :param actor: The Player instance to set values on
         """
         actor.attribute_points = self._points.get()
-        actor.stats.strength.level = self._frmStr.value.get()
-        actor.stats.dexterity.level = self._frmDex.value.get()
-        actor.stats.constitution.level = self._frmCon.value.get()
-        actor.stats.agility.level = self._frmAgl.value.get()
-        actor.stats.intelligence.level = self._frmInt.value.get()
-        actor.stats.wisdom.level = self._frmWis.value.get()
-        actor.stats.charisma.level = self._frmCha.value.get()
-        actor.stats.luck.level = self._frmLck.value.get()
+        with actor.stats.batch_edit():
+            actor.stats.strength.level = self._frmStr.value.get()
+            actor.stats.dexterity.level = self._frmDex.value.get()
+            actor.stats.constitution.level = self._frmCon.value.get()
+            actor.stats.agility.level = self._frmAgl.value.get()
+            actor.stats.intelligence.level = self._frmInt.value.get()
+            actor.stats.wisdom.level = self._frmWis.value.get()
+            actor.stats.charisma.level = self._frmCha.value.get()
+            actor.stats.luck.level = self._frmLck.value.get()
 
 
 class StatCanvas(tk.Canvas):
@@ -534,18 +605,21 @@ class CombatStatusBar(tk.Frame):
         self._var_name.set(actor.name())
         self._var_level.set("(lvl. 1)")
         self._var_status.set("")
-        self._lbl_health.get_variable().set(actor.stats.health.string(False))
-        self._lbl_stamina.get_variable().set(actor.stats.stamina.string(False))
-        self._lbl_mana.get_variable().set(actor.stats.mana.string(False))
+        self._lbl_health.get_variable().set(actor.stats.string("hp"))
+        self._lbl_stamina.get_variable().set(actor.stats.string("st"))
+        self._lbl_mana.get_variable().set(actor.stats.string("mp"))
 
 
 class InventoryRow(object):
-    def __init__(self, parent: 'tk.Frame', inv: 'Inventory',
-                 item_stack: 'ItemStack') -> None:
-        self._inventory = inv
+    def __init__(self, parent: 'tk.Frame', game: 'Game', slot: int,
+                 item_stack: 'ItemStack', count: int) -> None:
+        self._game_obj = game
+        self._slot = slot
         self._item_stack = item_stack
         self._item = item_stack.item().item()
-        self.lbl_count = tk.Label(parent, text=str(item_stack.count()))
+        # Each unit of an unstackable item is shown as a row of its own
+        self._unit = not self._item.stackable()
+        self.lbl_count = tk.Label(parent, text=str(count))
         self.lbl_name = tk.Label(parent, text=self._item.name)
         self.entry_count = widgets.NumericEntry(
             parent, width=3, validatecommand=self._validate
@@ -591,12 +665,11 @@ class InventoryRow(object):
         except ValueError:
             value = 1
         if value > 0:
-            self._item_stack.dec(value)
-            if self._item_stack.count() <= 0:
-                self.grid_forget()
-                self._inventory.update()
-            else:
-                self.lbl_count.configure(text=str(self._item_stack.count()))
+            # The inventory publishes the change, which rebuilds the rows
+            self._game_obj.apply_event(event.InventoryEvent(
+                self._item_stack.item().resource_id(),
+                -1 if self._unit else -value, self._slot
+            ))
 
 
 class InventoryFrame(tk.Frame):
@@ -621,11 +694,14 @@ class InventoryFrame(tk.Frame):
             side='bottom', anchor='nw', fill='both', expand=True
         )
 
-    def build(self, inv: 'Inventory'):
-        for row, item_stack in enumerate(inv.slots, 1):
+    def build(self, game: 'Game'):
+        inv = game.state.player.inventory
+        for row, (slot, item_stack, count) in enumerate(inv.units(), 1):
             item = item_stack.item().item()
             if item is not None:
-                irow = InventoryRow(self._interior, inv, item_stack)
+                irow = InventoryRow(
+                    self._interior, game, slot, item_stack, count
+                )
                 self._widgets.append(irow)
                 irow.grid(row, padx=self._padx, pady=self._pady)
 
@@ -1,6 +1,7 @@
 
+import timeit
 import tkinter as tk
-from rpg import util
+from rpg import event, util
 from rpg.ui import widgets
 
 import typing
@@ -20,7 +21,10 @@ class ConsoleState(object):
         self.history = list()
         self.environ = {
             'game': game, 'console': self, 'print': self.print,
-            'close': self.close, 'reset': self.reset, 'clear': self.clear
+            'close': self.close, 'reset': self.reset, 'clear': self.clear,
+            'undo': self.undo, 'trace': game.tracer, 'tasks': game.tasks,
+            'profiler': game.profiler, 'profile': self.profile,
+            'hot': self.hot, 'timeit': self.timeit, 'watchdog': game.watchdog
         }
         self._saved_state = dict(self.environ)
         self._game = game
@@ -53,6 +57,54 @@ class ConsoleState(object):
         self.history.clear()
         self.clear()
 
+    def undo(self, steps: int = 1) -> None:
+        """Step the game back by the given number of actions.
+
+        :param steps: How many actions to undo
+        """
+        self._game.apply_event(event.UndoEvent(steps))
+
+    def profile(self, events: 'Optional[int]' = None,
+                seconds: 'Optional[float]' = None) -> None:
+        """Start the sampling profiler.
+
+        Without any arguments the profiler runs until profiler.stop() is
+        called. Use hot() to see the results.
+
+        :param events: If given, profile the next this many events
+        :param seconds: If given, profile for this many seconds
+        """
+        self._game.profiler.start(events, seconds)
+
+    def hot(self, limit: int = 20) -> None:
+        """Print the hottest functions found by the sampling profiler.
+
+        :param limit: The maximum number of functions to print
+        """
+        profiler = self._game.profiler
+        self.print("{} samples{}".format(
+            profiler.sample_count(), " (running)" if profiler.running else ""
+        ))
+        self.print(profiler.report(limit))
+
+    def timeit(self, statement: str, number: int = 1000) -> float:
+        """Time a statement against the live game.
+
+        The statement is run with the console environment, so it may use
+        'game' and any names defined in the console. Note that it may change
+        the state of the game.
+
+        :param statement: The statement to time
+        :param number: How many times to run the statement
+        :return: The mean time per run in seconds
+        """
+        total = timeit.timeit(statement, number=number, globals=self.environ)
+        mean = total / number
+        self.print("{} loops, {:.3f} usec per loop".format(
+            number, mean * 1000000
+        ))
+        return mean
+
     def print(self, *objects, sep='', end='\n', file=None) -> None:
         """Print replacement which writes to a bound ConsoleWindow.
 
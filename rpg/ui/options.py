@@ -9,7 +9,7 @@ and can create a new tkinter.Frame with the appropriate buttons when needed.
 
 import inspect
 import tkinter
-from rpg import event
+from rpg import event, util
 from rpg.ui import widgets
 
 import typing
@@ -27,6 +27,8 @@ class Option(object):
     An option encodes a name, an event, and if it is enabled.
     """
 
+    __slots__ = ('name', 'event', 'visible')
+
     def __init__(self, name, event_instance: 'event.GameEvent',
                  visible: bool = True) -> None:
         """Initialize the option.
@@ -54,13 +56,17 @@ class Option(object):
         :param root: The tkinter.Frame to place this tkinter widget into
         :return: A tkinter.Button or tkinter.Label for this option.
         """
+        generation = game.state.options_generation
+
         def _do_apply():
-            self.event.apply(game)
+            game.post_event(self.event, generation)
 
         if self.visible:
             return widgets.Button(root, self.name, _do_apply)
         return tkinter.Label(root)
 
+    __setstate__ = util.set_slot_state
+
 
 class OptionFrame(tkinter.Frame):
     """A tkinter.Frame which implements a custom layout for options.
@@ -17,6 +17,7 @@ operations on a ViewManager instance.
 
 from abc import ABCMeta, abstractmethod
 import tkinter
+from rpg import trace
 
 import typing
 if typing.TYPE_CHECKING:
@@ -173,12 +174,12 @@ class GameView(View):
         :param displayable: The displayable resource to display
         :param update_status_bar: If the status bar should be updated.
         """
-        self.set_title(displayable.title(self._game_obj), False)
-        self.set_text(displayable.text(self._game_obj), False)
-        self.set_options(
-            displayable.options(self._game_obj),
-            update_status_bar
-        )
+        game = self._game_obj
+        with game.tracer.span("display", displayable.resource_id()):
+            title, text, option_list = trace.render(game, displayable)
+            self.set_title(title, False)
+            self.set_text(text, False)
+            self.set_options(option_list, update_status_bar)
 
     @abstractmethod
     def set_title(self, text: str, update_status_bar: bool = False) -> None:
@@ -269,22 +270,32 @@ class ViewManager(object):
             raise Exception(_g_NoRoot)
 
         for cls_view in ViewManager.AllViews:
-            view_obj = cls_view(self._game_obj)  # type: View
-            view_name = view_obj.name()          # type: str
-            if view_name in self._views:
+            self.add_view(cls_view(self._game_obj))
+
+    def add_view(self, view_obj: 'View') -> None:
+        """Add a single view instance to this ViewManager.
+
+        This is used by load_views() for every registered View class, and may
+        be used directly to add views which are not tkinter widgets (such as
+        the views used by headless games).
+
+        :param view_obj: The view instance to add
+        """
+        view_name = view_obj.name()  # type: str
+        if view_name in self._views:
+            self._game_obj.log.warning(
+                "Duplicate name for view '{}': overwriting {} with {}",
+                view_name, repr(self._views[view_name]), repr(view_obj)
+            )
+        self._views[view_name] = view_obj
+
+        if view_obj.is_initial_view():
+            if self._initial_view is not None:
                 self._game_obj.log.warning(
-                    "Duplicate name for view '{}': overwriting {} with {}",
-                    view_name, repr(self._views[view_name]), repr(view_obj)
+                    "Overwriting initial view: {} -> {}",
+                    self._initial_view, view_name
                 )
-            self._views[view_name] = view_obj
-
-            if view_obj.is_initial_view():
-                if self._initial_view is not None:
-                    self._game_obj.log.warning(
-                        "Overwriting initial view: {} -> {}",
-                        self._initial_view, view_name
-                    )
-                self._initial_view = view_name
+            self._initial_view = view_name
 
     def clear_views(self) -> None:
         """Remove all views instances from this ViewManager."""
@@ -0,0 +1,186 @@
+"""A watchdog for slow tkinter callbacks.
+
+While a Python callback (a button command, a menu action, an event binding or
+an after() callback) runs, the window can not respond to input. The Watchdog
+times every callback tkinter makes into Python and logs a warning naming the
+callback whenever one takes longer than a threshold. A background thread
+records the stack of the main thread while the slow callback is still
+running, so the warning shows where the time was spent rather than only which
+callback was slow.
+
+The latencies of the most recent callbacks are kept so that the rolling p50
+and p99 can be shown in the debug console as 'watchdog'.
+
+The Watchdog works by replacing tkinter.CallWrapper, which tkinter uses to
+wrap every Python callback it registers, so it must be installed before the
+widgets are created.
+"""
+
+import collections
+import sys
+import threading
+import time
+import tkinter
+import traceback
+
+import typing
+if typing.TYPE_CHECKING:
+    from rpg.io.log import Log
+    from typing import Any, Callable, Deque, Optional
+
+
+def describe(func: 'Callable') -> str:
+    """Get a readable name for a callback.
+
+    Callbacks registered with after() are wrapped in a closure by tkinter; the
+    name of the wrapped function is used instead.
+
+    :param func: The callback
+    :return: The module and qualified name of the callback
+    """
+    name = getattr(func, '__qualname__', None)
+    if name is not None and name.endswith("after.<locals>.callit"):
+        for cell in func.__closure__ or ():
+            try:
+                contents = cell.cell_contents
+            except ValueError:
+                continue
+            if callable(contents):
+                return describe(contents)
+    if name is None:
+        return repr(func)
+    return "{}.{}".format(getattr(func, '__module__', "?"), name)
+
+
+class _TimedCallWrapper(tkinter.CallWrapper):
+    """The CallWrapper used by tkinter while a Watchdog is installed."""
+
+    watchdog = None  # type: Optional[Watchdog]
+    original = tkinter.CallWrapper
+
+    def __call__(self, *args) -> 'Any':
+        watchdog = _TimedCallWrapper.watchdog
+        if watchdog is None:
+            return _TimedCallWrapper.original.__call__(self, *args)
+        return watchdog.call(self, args)
+
+
+class Watchdog(object):
+    """Times tkinter callbacks and reports the slow ones."""
+
+    def __init__(self, log: 'Log', threshold: float = 0.05,
+                 window: int = 1000) -> None:
+        """Create a new Watchdog.
+
+        :param log: The log to write warnings to
+        :param threshold: The time in seconds above which a callback is slow
+        :param window: How many of the most recent latencies to keep
+        """
+        self.threshold = threshold
+        self.slow_count = 0
+        self._log = log
+        self._latencies: 'Deque[float]'
+        self._latencies = collections.deque(maxlen=window)
+        self._main_id = threading.get_ident()
+        self._depth = 0
+        self._token = 0
+        self._started = None  # type: Optional[float]
+        self._stack = None  # type: Optional[str]
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def install(self) -> None:
+        """Start timing tkinter callbacks registered from now on."""
+        _TimedCallWrapper.watchdog = self
+        tkinter.CallWrapper = _TimedCallWrapper
+        self._main_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._monitor, name="Watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def uninstall(self) -> None:
+        """Stop timing tkinter callbacks."""
+        if _TimedCallWrapper.watchdog is self:
+            _TimedCallWrapper.watchdog = None
+            tkinter.CallWrapper = _TimedCallWrapper.original
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def call(self, wrapper: 'tkinter.CallWrapper', args: 'Any') -> 'Any':
+        """Run a tkinter callback, timing it.
+
+        Callbacks run from inside another callback (e.g. by update()) are
+        counted as part of the outer callback.
+
+        :param wrapper: The CallWrapper of the callback
+        :param args: The arguments given by tkinter
+        :return: The result of the callback
+        """
+        if self._depth > 0:
+            return _TimedCallWrapper.original.__call__(wrapper, *args)
+
+        self._depth += 1
+        self._token += 1
+        self._stack = None
+        start = time.perf_counter()
+        self._started = start
+        try:
+            return _TimedCallWrapper.original.__call__(wrapper, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._started = None
+            self._depth -= 1
+            self._latencies.append(elapsed)
+            if elapsed > self.threshold:
+                self._report(wrapper.func, elapsed)
+
+    def percentile(self, fraction: float) -> float:
+        """Get a percentile of the recent callback latencies.
+
+        :param fraction: The percentile as a fraction, e.g. 0.99
+        :return: The latency in seconds
+        """
+        if len(self._latencies) == 0:
+            return 0.0
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+    def report(self) -> str:
+        """Summarize the recent callback latencies.
+
+        :return: The summary as a string
+        """
+        return "{} callbacks: p50 {:.1f} ms, p99 {:.1f} ms, {} slow".format(
+            len(self._latencies), self.percentile(0.5) * 1000,
+            self.percentile(0.99) * 1000, self.slow_count
+        )
+
+    def _report(self, func: 'Callable', elapsed: float) -> None:
+        self.slow_count += 1
+        stack = self._stack
+        self._log.warning(
+            "Slow tkinter callback {} took {:.1f} ms{}", describe(func),
+            elapsed * 1000,
+            "" if stack is None else "; stack while running:\n" + stack
+        )
+
+    def _monitor(self) -> None:
+        """Record the stack of a callback which runs past the threshold."""
+        while not self._stop.wait(self.threshold / 2):
+            token = self._token
+            started = self._started
+            if started is None or self._stack is not None:
+                continue
+            if time.perf_counter() - started <= self.threshold:
+                continue
+            frame = sys._current_frames().get(self._main_id, None)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            if token == self._token and self._started is not None:
+                self._stack = stack
@@ -1,8 +1,31 @@
 
 import traceback
 
+import typing
+if typing.TYPE_CHECKING:
+    from typing import Any
+
 
 def format_exception(e: Exception, with_stacktrace: bool = True) -> str:
     if with_stacktrace:
         return ''.join(traceback.format_exception(type(e), e, e.__traceback__))
     return "{}: {}".format(type(e).__name__, e)
+
+
+def set_slot_state(obj: object, state: 'Any') -> None:
+    """Restore the pickled state of an object whose class uses __slots__.
+
+    Used as __setstate__ by classes which were given __slots__ after objects
+    of them were pickled. Both the (dict, slots) state pickled for slotted
+    objects and the plain dict pickled before are accepted; every item is
+    assigned with setattr, so it lands in a slot or in the __dict__ of a
+    subclass as appropriate.
+
+    :param obj: The object being unpickled
+    :param state: The pickled state
+    """
+    parts = state if isinstance(state, tuple) else (state,)
+    for part in parts:
+        if part:
+            for key, value in part.items():
+                setattr(obj, key, value)
@@ -1,4 +1,4 @@
-
+import pytest
 from unittest.mock import MagicMock, create_autospec
 from rpg.data.attributes import *
 
@@ -127,3 +127,205 @@ def test_secondary_attribute_tracked_change():
     attr.level -= 1
     assert attr.level == 107
     assert attr.value == 107
+
+
+def test_attribute_list_derives_secondaries_from_weights():
+    al = AttributeList()
+    assert al.snapshot()[8:11] == ((0, 100, 100),) * 3
+
+    al.strength.level = 12
+    al.intelligence.level = 11
+    assert al.health.level == 3 * 12 + 7 * 10
+    assert al.mana.level == 7 * 11 + 3 * 10
+    assert al.stamina.level == 100
+
+    al.health.value -= 50
+    al.constitution.level = 5
+    assert al.health.string() == "56/71"
+    assert al.stamina.string() == "70/70"
+
+
+def test_attribute_list_notifies_keys():
+    al = AttributeList()
+    keys = list()
+    al.add_listener(keys.append)
+    al.wisdom.level += 1
+    assert keys == ["mp", "wis"]
+
+    attr_listener = MagicMock()
+    al.mana.add(attr_listener)
+    al.mana.value -= 1
+    attr_listener.update.assert_called_once_with(al.mana, 'value')
+
+
+def test_attribute_list_pickle_and_restore():
+    import pickle
+    al = AttributeList()
+    al.agility.level = 14
+    snapshot = al.snapshot()
+    copy = pickle.loads(pickle.dumps(al))
+    assert copy.snapshot() == snapshot
+
+    al.agility.level = 8
+    al.restore(snapshot)
+    assert al.stamina.level == 4 * 14 + 6 * 10
+    assert al.snapshot() == snapshot
+
+
+def test_attribute_list_batch_edit_holds_notifications():
+    al = AttributeList()
+    keys = list()
+    al.add_listener(keys.append)
+    attr_listener = MagicMock()
+    al.health.add(attr_listener)
+
+    with al.batch_edit():
+        al.strength.level = 12
+        al.constitution.level = 12
+        al.strength.level = 14
+        assert keys == []
+        assert al.health.level == 100
+
+    assert al.health.level == 3 * 14 + 7 * 12
+    assert al.stamina.level == 4 * 10 + 6 * 12
+    assert keys == ["hp", "st", "str", "con"]
+    attr_listener.update.assert_called_once_with(al.health, 'level')
+
+
+def test_attribute_list_modifiers():
+    al = AttributeList()
+    keys = list()
+    al.add_listener(keys.append)
+    ring = Modifier("str", amount=2, source="ring")
+    potion = Modifier("str", factor=1.5, source="potion", expires=30)
+    al.add_modifier(ring)
+    al.add_modifier(potion)
+    al.add_modifier(Modifier("hp", amount=-10, source="potion", expires=10))
+    assert keys == ["str", "str", "hp"]
+    assert al.modified_level("str") == 18
+    assert al.modified_level("hp") == 90
+    assert al.strength.level == 10
+
+    al.strength.level = 12
+    assert al.modified_level("str") == 21
+
+    snapshot = al.snapshot()
+    assert al.next_expiry() == 10
+    assert al.expire(20) == 1
+    assert al.modifiers("hp") == ()
+    assert al.remove_source("ring") == 1
+    assert al.modified_level("str") == 18
+    assert al.expire(30) == 1
+    assert al.next_expiry() is None
+    assert al.modified_level("str") == 12
+
+    al.restore(snapshot)
+    assert al.modifiers("str") == (ring, potion)
+    assert al.modified_level("hp") == 96
+    assert al.next_expiry() == 10
+
+
+def test_attribute_list_string_applies_modifiers():
+    al = AttributeList()
+    al.strength.level = 10
+    al.health.level = 100
+    al.health.value = 80
+    assert al.string("str") == al.strength.string()
+    assert al.string("hp") == al.health.string()
+
+    al.add_modifier(Modifier("str", amount=3))
+    al.add_modifier(Modifier("hp", amount=-40))
+    assert al.string("str") == "13 [+3]"
+    assert al.string("str", short=True) == "13"
+    assert al.string("hp") == "{}/{}".format(
+        al.modified_level("hp"), al.modified_level("hp")
+    )
+    assert al.strength.string() == "10"
+
+
+def test_attribute_list_staged_levels():
+    al = AttributeList()
+    keys = list()
+    al.add_listener(keys.append)
+    assert al.stage_level("con", 12)
+    assert not al.stage_level("con", 12)
+    assert keys == [] and al.health.level == 100
+    assert al.derive() == ["hp", "st"]
+    al.notify_level("con")
+    assert keys == ["hp", "st", "con"]
+    assert al.levels()[3] == al.values()[3] == 12
+    assert al.effective_levels() == (114, 100, 112)
+
+    al.apply_derived("mp", 50, 40)
+    assert al.mana.string() == "40/50"
+    with pytest.raises(ValueError):
+        al.stage_level("hp", 1)
+    with pytest.raises(ValueError):
+        al.apply_derived("str", 1, 1)
+
+def test_stat_template_copy_on_write():
+    template = StatTemplate({'str': 8, 'con': 6})
+    first = template.create()
+    second = template.create()
+    assert first.snapshot() == template.snapshot()
+    assert first.health.level == 3 * 8 + 7 * 6
+    assert first._data is second._data
+
+    first.health.value -= 5
+    assert first._data is not second._data
+    assert second.health.value == 66
+    assert template.create().health.value == 66
+
+    second.strength.level = 10
+    assert second.health.level == 72
+    assert template.snapshot()[0] == (8, 8)
+
+
+def test_attribute_list_compile_and_from_packed():
+    packed = AttributeList.compile({'str': 8, 'con': (6, 4), 'hp': (70, 50)})
+    assert packed == tuple(AttributeList.compile(
+        {'str': 8, 'con': [6, 4], 'hp': (70, 50)}
+    ))
+    al = AttributeList.from_packed(packed)
+    assert al.constitution.string() == "4 [-2]"
+    assert (al.health.level, al.health.value) == (70, 50)
+
+    data = {'str': 8, 'con': (6, 4), 'hp': (70, 50), 'name': "Goblin"}
+    assert AttributeList.load(data).snapshot() == al.snapshot()
+    assert data == {'name': "Goblin"}
+
+    for block in ({'strength': 8}, {'str': "8"}, {'str': (8,)},
+                  {'str': True}, {'str': (8, 2.5)}):
+        with pytest.raises(ValueError):
+            AttributeList.compile(block)
+    with pytest.raises(ValueError):
+        AttributeList.from_packed(packed[:-1])
+
+
+class PackageAttribute(PrimaryAttribute):
+    pass
+
+
+def test_attribute_slots_and_legacy_pickles():
+    import pickle
+    attr = PackageAttribute(12)
+    attr.note = "from a package"
+    copy = pickle.loads(pickle.dumps(attr))
+    assert (copy.level, copy.note) == (12, "from a package")
+    assert not hasattr(Attribute(), '__dict__')
+
+    legacy = Attribute.__new__(Attribute)
+    legacy.__setstate__({'_level': 7, '_value': 9, '_listeners': []})
+    assert legacy.string() == "9 [+2]"
+
+
+def test_attribute_list_views_only_store_their_position():
+    import sys
+    stats = AttributeList()
+    assert not hasattr(stats.strength, '__dict__')
+    assert sys.getsizeof(stats.strength) == sys.getsizeof(Attribute())
+    assert sys.getsizeof(stats.health) < sys.getsizeof(
+        SecondaryAttribute(0, tracked=[])
+    )
+    stats.strength.level = 12
+    assert stats.health.level == 3 * 12 + 7 * 10
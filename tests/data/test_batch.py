@@ -0,0 +1,52 @@
+import pytest
+from rpg.data.attributes import AttributeList, SecondaryAttribute
+from rpg.data.batch import StatBatch
+
+
+def _make_lists(count):
+    lists = [AttributeList() for _ in range(count)]
+    for i, al in enumerate(lists):
+        al.health.value -= 10 * i
+    return lists
+
+
+def _tick(use_numpy):
+    lists = _make_lists(8)
+    keys = list()
+    lists[0].add_listener(keys.append)
+    batch = StatBatch(lists, use_numpy=use_numpy)
+    batch.set_levels("con", [5 + i for i in range(8)])
+    changed = batch.compute()
+    return lists, batch, changed, keys
+
+
+def test_batch_derives_and_notifies():
+    lists, batch, changed, keys = _tick(False)
+    # Constitution 10 is unchanged for the sixth list
+    assert changed == 2 * 7
+    assert lists[0].health.string() == "65/65"
+    assert lists[0].stamina.string() == "70/70"
+    assert lists[7].health.string() == "44/114"
+    assert keys == ["hp", "st", "con"]
+    assert batch.modifiers[0] == (0,) * 8
+    assert batch.colors[0][0] == SecondaryAttribute.ColorGood
+    assert batch.colors[7][0] == SecondaryAttribute.ColorPoor
+    for al, colors in zip(lists, batch.colors):
+        assert colors == (al.health.color, al.mana.color, al.stamina.color)
+
+
+def test_batch_rejects_secondary_levels():
+    batch = StatBatch(_make_lists(2), use_numpy=False)
+    with pytest.raises(ValueError):
+        batch.set_levels("hp", [1, 2])
+
+
+def test_numpy_matches_python():
+    pytest.importorskip("numpy")
+    expected = _tick(False)
+    actual = _tick(True)
+    assert [al.snapshot() for al in actual[0]] == \
+        [al.snapshot() for al in expected[0]]
+    assert actual[1].modifiers == expected[1].modifiers
+    assert actual[1].colors == expected[1].colors
+    assert actual[2:] == expected[2:]
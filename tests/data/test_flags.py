@@ -0,0 +1,64 @@
+import pytest
+from rpg.data.flags import *
+
+
+def _make_flags(count):
+    registry = FlagRegistry()
+    for i in range(count):
+        registry.declare("test.flag_{}".format(i))
+    return FlagSet(registry)
+
+
+def test_flag_registry_dense_indexes():
+    registry = FlagRegistry()
+    assert registry.declare("a.one") == 0
+    assert registry.declare("a.two") == 1
+    assert registry.declare("a.one") == 0
+    assert registry.index("a.two") == 1
+    assert registry.names() == ["a.one", "a.two"]
+    with pytest.raises(KeyError):
+        registry.index("a.three")
+
+
+def test_flag_set_and_clear():
+    flags = _make_flags(20)
+    assert not flags["test.flag_12"]
+    flags["test.flag_12"] = True
+    flags.set(3)
+    assert flags["test.flag_12"]
+    assert flags.test(3)
+    assert flags.count() == 2
+
+    flags["test.flag_12"] = False
+    assert not flags["test.flag_12"]
+    assert flags.count() == 1
+
+
+def test_flag_masks():
+    flags = _make_flags(10000)
+    mask = flags.registry.mask(["test.flag_1", "test.flag_9", 9999])
+    assert not flags.all(mask)
+    assert not flags.any(mask)
+
+    flags.set(9999)
+    assert flags.any(mask)
+    assert not flags.all(mask)
+
+    flags.set("test.flag_1")
+    flags.set("test.flag_9")
+    assert flags.all(mask)
+
+
+def test_flag_bytes_round_trip():
+    flags = _make_flags(100)
+    flags.set(0)
+    flags.set(9)
+    flags.set(50, True)
+    flags.set(50, False)
+    data = flags.to_bytes()
+    assert data == b"\x01\x02"
+
+    other = _make_flags(100)
+    other.from_bytes(data)
+    assert other.test(0) and other.test(9)
+    assert other.count() == 2
@@ -0,0 +1,183 @@
+import os.path
+import pickle
+from rpg import event, headless
+from rpg.io import save
+from rpg.changes import Change
+from rpg.data.item import ItemType
+from rpg.data.inventory import Inventory, ItemInstance, ItemStack
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "packages"
+)
+
+
+def _bound_inventory():
+    game = headless.create_game(_packages)
+    inv = game.state.player.inventory
+    inv.bind(game)
+    return inv
+
+
+def test_inventory_index_keeps_display_order():
+    inv = _bound_inventory()
+    inv.add('misc.ore.coal', 5)
+    inv.add('weapon.short_sword_bronze', 2)
+    inv.add('misc.ore.tin', 2)
+    inv.add('misc.ore.coal', 1)
+    assert len(inv.stacks('weapon.short_sword_bronze')) == 1
+    assert len(inv.units()) == 4
+    assert inv.count('misc.ore.coal') == 6
+
+    assert inv.remove('weapon.short_sword_bronze') == 1
+    assert inv.remove('misc.ore.tin', 5) == 2
+    assert inv.remove('misc.ore.iron') == 0
+    assert str(inv) == "6 misc.ore.coal\n1 weapon.short_sword_bronze"
+
+    inv.add('misc.ore.tin')
+    inv.slots[0].dec(6)
+    inv.update()
+    assert str(inv) == "1 weapon.short_sword_bronze\n1 misc.ore.tin"
+    assert inv.stacks('misc.ore.coal') == []
+
+
+def test_inventory_restore_and_legacy_pickle():
+    inv = Inventory()
+    inv.add('misc.ore.coal', 3)
+    inv.add('misc.ore.tin', 1)
+    copy = Inventory()
+    copy.restore(inv.snapshot())
+    assert str(copy) == str(inv)
+    assert copy.remove('misc.ore.coal', 2) == 2
+
+    assert str(pickle.loads(pickle.dumps(inv))) == str(inv)
+    state = inv.__getstate__()
+    del state['_slots'], state['_index'], state['_next_slot']
+    state['slots'] = [ItemStack(ItemInstance('misc.ore.tin'), 4)]
+    legacy = Inventory.__new__(Inventory)
+    legacy.__setstate__(state)
+    assert legacy.count('misc.ore.tin') == 4
+    assert str(legacy) == "4 misc.ore.tin"
+
+
+def test_inventory_totals_follow_every_change():
+    inv = _bound_inventory()
+    inv.add('misc.ore.coal', 4)
+    inv.add('weapon.short_sword_bronze', 2)
+    assert (inv.weight(), inv.value()) == (14.0, 40)
+    assert inv.weight(ItemType.Weapon) == 2.0
+    assert inv.value(ItemType.Misc) == 20
+
+    inv.stacks('misc.ore.coal')[0].dec(3)
+    assert inv.weight(ItemType.Misc) == 3.0
+    assert inv.value() == 25
+    inv.remove('weapon.short_sword_bronze')
+    assert (inv.weight(), inv.value()) == (4.0, 15)
+
+    inv.remove('misc.ore.coal')
+    inv.remove('weapon.short_sword_bronze')
+    assert (inv.weight(), inv.value(), inv.value(ItemType.Misc)) == (0.0, 0, 0)
+
+
+def test_unstackable_items_are_grouped_until_separated():
+    inv = _bound_inventory()
+    inv._max_slots = 5
+    assert inv.add('weapon.short_sword_bronze', 3) == 3
+    assert inv.add('misc.ore.coal', 10) == 10
+    assert inv.add('weapon.short_sword_bronze', 3) == 1
+    assert inv.add('misc.ore.tin') == 0
+    swords, = inv.stacks('weapon.short_sword_bronze')
+    assert swords.count() == 4
+    assert str(inv) == "\n".join(["1 weapon.short_sword_bronze"] * 4 +
+                                  ["10 misc.ore.coal"])
+
+    unit = inv.separate('weapon.short_sword_bronze')
+    assert unit.item().unique() and unit.item().item() is not None
+    assert (swords.count(), inv.count('weapon.short_sword_bronze')) == (3, 4)
+    inv.remove('weapon.short_sword_bronze', 3)
+    assert inv.stacks('weapon.short_sword_bronze') == [unit]
+    assert inv.add('weapon.short_sword_bronze', 2) == 2
+    assert len(inv.stacks('weapon.short_sword_bronze')) == 2
+    assert inv.weight() == 33.0
+
+
+def test_inventory_totals_are_counted_again_on_bind():
+    game = headless.create_game(_packages)
+    inv = game.state.player.inventory
+    inv.bind(game)
+    inv.add('misc.ore.coal', 4)
+    inv.add('weapon.short_sword_bronze', 2)
+
+    copy = pickle.loads(pickle.dumps(inv))
+    assert (copy.weight(), copy.value()) == (0.0, 0)
+    copy.remove('misc.ore.coal', 3)
+    copy.add('misc.ore.tin', 2)
+    copy.bind(game)
+    assert (copy.weight(), copy.value()) == (11.0, 29)
+    assert copy.weight(ItemType.Weapon) == 2.0
+
+
+def test_legacy_unit_stacks_are_grouped_on_bind():
+    game = headless.create_game(_packages)
+    legacy = Inventory()
+    for _ in range(5):
+        legacy._append(ItemStack(ItemInstance('weapon.short_sword_bronze'), 1))
+    legacy.bind(game)
+    assert [stack.count() for stack in legacy.slots] == [5]
+    legacy.add('weapon.short_sword_bronze')
+    assert [stack.count() for stack in legacy.slots] == [6]
+
+    game.state.start(1)
+    data = game.state.pack()
+    data['player']['inventory'] = [('weapon.short_sword_bronze', 1)] * 3
+    game.state.unpack(data)
+    inv = game.state.player.inventory
+    assert [stack.count() for stack in inv.slots] == [3]
+    assert len(inv.units()) == 3
+
+
+def test_grouped_and_separated_units_survive_a_save():
+    game = headless.create_game(_packages)
+    game.state.start(1)
+    inv = game.state.player.inventory
+    inv.add('weapon.short_sword_bronze', 3)
+    inv.add('misc.ore.coal', 2)
+    inv.separate('weapon.short_sword_bronze')
+    saved = save.dumps(game.state)
+
+    loaded = headless.create_game(template=game)
+    save.loads(loaded.state, saved)
+    inv = loaded.state.player.inventory
+    assert [
+        (stack.count(), stack.item().unique())
+        for stack in inv.stacks('weapon.short_sword_bronze')
+    ] == [(2, False), (1, True)]
+    assert str(inv) == str(game.state.player.inventory)
+
+    legacy = game.state.pack()
+    legacy['player']['inventory'] = [('misc.ore.coal', 2)]
+    loaded.state.unpack(legacy)
+    assert str(inv) == "2 misc.ore.coal"
+
+
+def test_trashing_a_unit_row_is_an_undoable_event():
+    game = headless.create_game(_packages)
+    game.state.start(1)
+    inv = game.state.player.inventory
+    inv.add('weapon.short_sword_bronze', 2)
+    unit = inv.separate('weapon.short_sword_bronze')
+    published = list()
+    game.state.changes.subscribe(
+        Change.Inventory, lambda kind, key: published.append(key)
+    )
+
+    slot, stack, count = inv.units()[-1]
+    assert (stack, count) == (unit, 1)
+    game.apply_event(event.InventoryEvent(
+        'weapon.short_sword_bronze', -1, slot
+    ))
+    assert inv.stacks('weapon.short_sword_bronze')[0].item().unique() is False
+    assert inv.count('weapon.short_sword_bronze') == 1
+    assert published == ['weapon.short_sword_bronze']
+
+    game.apply_event(event.UndoEvent())
+    assert inv.count('weapon.short_sword_bronze') == 2
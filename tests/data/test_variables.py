@@ -0,0 +1,84 @@
+import pytest
+from rpg.data.variables import *
+
+
+def test_namespace_types():
+    ns = Namespace("test")
+    ns['count'] = 3
+    ns['flag'] = True
+    ns['name'] = "Bob"
+    assert ns['count'] == 3
+    assert ns['flag'] is True
+    assert ns['name'] == "Bob"
+    assert ns.type('count') == VariableType.Int
+    assert ns.type('flag') == VariableType.Bool
+    assert ns.type('name') == VariableType.String
+
+    with pytest.raises(VariableTypeError):
+        ns['count'] = "three"
+    with pytest.raises(VariableTypeError):
+        ns['list'] = [1, 2]
+
+
+def test_store_notifies_only_on_change():
+    store = VariableStore()
+    changes = list()
+    store.add_listener(lambda n, k, v: changes.append((n, k, v)))
+
+    ns = store.namespace("base")
+    ns.declare('gold', 0)
+    ns['gold'] = 10
+    ns['gold'] = 10
+    assert changes == [("base", "gold", 10)]
+
+
+def test_store_dirty_tracking():
+    store = VariableStore()
+    store.namespace("a")['x'] = 1
+    store.namespace("b")['y'] = False
+    assert store.dirty() == {'a': {'x'}, 'b': {'y'}}
+
+    store.clear_dirty()
+    assert store.dirty() == {}
+
+    store.namespace("b")['y'] = True
+    assert store.dirty() == {'b': {'y'}}
+    assert store.pack() == {'a': {'x': 1}, 'b': {'y': True}}
+
+
+def test_pack_reads_only_dirty_variables_after_a_save():
+    ns = Namespace("test")
+    ns['x'] = 1
+    ns['y'] = "old"
+    assert ns.pack() == {'x': 1, 'y': "old"}
+    ns.clear_dirty()
+
+    ns._ints[0] = 5
+    ns['y'] = "new"
+    ns.declare('z', False)
+    # x was not marked dirty, so its packed value is not read again
+    assert ns.pack() == {'x': 1, 'y': "new", 'z': False}
+    ns.clear_dirty()
+
+    ns.clear()
+    assert ns.pack() == {}
+    ns['w'] = 2
+    assert ns.pack() == {'w': 2}
+
+
+def test_store_snapshot_restore():
+    store = VariableStore()
+    store.namespace("a")['x'] = 1
+    store.namespace("b")['y'] = "old"
+    first = store.snapshot()
+
+    store.namespace("b")['y'] = "new"
+    store.namespace("b")['z'] = 2
+    second = store.snapshot()
+    # The unchanged namespace is shared between the snapshots
+    assert first[0][1] is second[0][1]
+
+    store.clear_dirty()
+    store.restore(first)
+    assert store.pack() == {'a': {'x': 1}, 'b': {'y': "old"}}
+    assert store.dirty() == {'b': {'y', 'z'}}
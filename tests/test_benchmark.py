@@ -0,0 +1,33 @@
+import os.path
+from rpg import benchmark, event
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def test_random_script_is_deterministic_and_ends_fights():
+    bench = benchmark.Benchmark(_packages)
+    first = benchmark.random_script(bench.resources(), 200, seed=3)
+    second = benchmark.random_script(bench.resources(), 200, seed=3)
+    assert len(first) == 200
+    assert [type(e) for e in first] == [type(e) for e in second]
+    for i, game_event in enumerate(first[:-1]):
+        if isinstance(game_event, event.FightStartEvent):
+            assert isinstance(first[i + 1], event.FightEndEvent)
+
+
+def test_run_measures_every_event():
+    bench = benchmark.Benchmark(_packages)
+    script = benchmark.random_script(bench.resources(), 100, seed=1)
+    result = bench.run(script, seed=1)
+    assert result.event_count == 100
+    assert result.events_per_second > 0
+    assert result.percentile(0.5) <= result.percentile(0.99)
+    assert result.memory_peak > 0
+    assert "100 events" in result.report()
+
+
+def test_slotted_objects_use_less_memory():
+    for name, slotted, plain in benchmark.object_memory(2000):
+        assert slotted < plain, name
@@ -0,0 +1,64 @@
+import os.path
+import pickle
+from rpg import event, headless
+from rpg.changes import Change, ChangeBus
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def _record(bus, *kinds):
+    log = list()
+    for kind in kinds:
+        bus.subscribe(kind, lambda k, key: log.append((k, key)))
+    return log
+
+
+def test_held_changes_are_merged():
+    bus = ChangeBus()
+    log = _record(bus, Change.Stat, Change.Time)
+    with bus.hold():
+        bus.publish(Change.Stat, "hp")
+        bus.publish(Change.Stat, "hp")
+        bus.publish(Change.Time)
+        bus.publish(Change.Stat, "str")
+        assert log == []
+    assert log == [(Change.Stat, "hp"), (Change.Time, None),
+                   (Change.Stat, "str")]
+
+    del log[:]
+    with bus.hold():
+        bus.publish(Change.Stat, "hp")
+        bus.publish(Change.Stat, None)
+    assert log == [(Change.Stat, None)]
+
+
+def test_game_publishes_only_what_changed():
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    log = _record(game.state.changes, *Change)
+
+    def _hurt(g):
+        g.state.player.stats.health.value -= 5
+        g.state.player.stats.health.value -= 5
+
+    game.apply_event(event.CallbackEvent(_hurt))
+    assert log == [(Change.Stat, "hp")]
+
+    del log[:]
+    game.state.player.stats.constitution.level += 1
+    assert sorted(key for _, key in log) == ["con", "hp", "st"]
+
+    del log[:]
+    game.state.player.inventory.add('misc.ore.coal', 2)
+    game.state.player.inventory.remove('misc.ore.coal', 5)
+    assert log == [(Change.Inventory, 'misc.ore.coal')] * 2
+
+    del log[:]
+    game.state.time.advance(0)
+    game.state.time.advance(5)
+    assert log == [(Change.Time, None)]
+
+    # Listeners are not part of the pickled player
+    assert pickle.loads(pickle.dumps(game.state.player)) is not None
@@ -0,0 +1,93 @@
+from rpg import changes, clock, event, tasks, trace
+
+
+class _RecordTime(event.GameEvent):
+    def __init__(self, log, name):
+        self._log = log
+        self._name = name
+
+    def apply(self, game):
+        self._log.append((self._name, game.state.time.now()))
+
+
+class _Game(object):
+    def __init__(self):
+        self.state = self
+        self.time = clock.Clock(self)
+        self.tracer = trace.Tracer()
+        self.changes = changes.ChangeBus()
+        self.tasks = tasks.TaskRunner(self)
+
+
+def test_clock_applies_due_events_in_order():
+    game = _Game()
+    log = list()
+    game.time.schedule_at(30, _RecordTime(log, "b"))
+    game.time.schedule_in(10, _RecordTime(log, "a"))
+    game.time.schedule_at(500, _RecordTime(log, "c"))
+
+    assert game.time.advance(60) == 2
+    assert log == [("a", 10), ("b", 30)]
+    assert game.time.now() == 60
+    assert game.time.pending() == 1
+
+
+def test_clock_repeat_and_cancel():
+    game = _Game()
+    log = list()
+    handle = game.time.schedule_in(0, _RecordTime(log, "tick"), repeat=60)
+    other = game.time.schedule_in(90, _RecordTime(log, "never"))
+    game.time.cancel(other)
+
+    assert game.time.advance(clock.MinutesPerDay) == 25
+    assert log[-1] == ("tick", clock.MinutesPerDay)
+    game.time.cancel(handle)
+    assert game.time.advance(clock.MinutesPerDay) == 0
+
+
+def test_clock_strings_and_snapshot():
+    game = _Game()
+    game.time.advance(clock.MinutesPerDay + 75)
+    assert game.time.time_string() == "01:15"
+    assert game.time.date_string() == "Day 2"
+
+    log = list()
+    game.time.schedule_in(5, _RecordTime(log, "a"))
+    snapshot = game.time.snapshot()
+    assert game.time.snapshot() is snapshot
+    game.time.advance(10)
+    game.time.restore(snapshot)
+    assert game.time.now() == clock.MinutesPerDay + 75
+    assert game.time.advance(5) == 1
+
+
+def test_clock_snapshot_survives_idle_advances():
+    game = _Game()
+    game.time.schedule_in(60, _RecordTime(list(), "a"))
+    snapshot = game.time.snapshot()
+    assert game.time.advance(0) == 0
+    assert game.time.advance_to(0) == 0
+    assert game.time.snapshot() is snapshot
+    game.time.advance(1)
+    assert game.time.snapshot() is not snapshot
+
+
+def test_clock_removes_cancelled_events():
+    game = _Game()
+    log = list()
+    handles = [
+        game.time.schedule_in(100 + i, _RecordTime(log, i)) for i in range(10)
+    ]
+    for handle in handles[:5]:
+        game.time.cancel(handle)
+    assert game.time.pending() == 5
+    assert len(game.time._heap) == 10
+    game.time.cancel(handles[5])
+    assert len(game.time._heap) == 4
+    game.time.cancel(handles[5])
+    assert game.time.pending() == 4
+
+    assert game.time.advance(200) == 4
+    assert [name for name, _ in log] == [6, 7, 8, 9]
+    game.time.cancel(handles[9])
+    assert game.time.pending() == 0
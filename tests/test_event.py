@@ -0,0 +1,50 @@
+import os.path
+import pytest
+from rpg import event, headless
+from rpg.data.inventory import Inventory, ItemInstance
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def test_compound_events_are_flattened():
+    redisplay = event.OptionListReturnEvent()
+    fight = event.FightStartEvent("mob.goblin")
+    inner = event.CompoundEvent(
+        event.CompoundEvent(), redisplay, event.OptionListReturnEvent()
+    )
+    chain = event.CompoundEvent(inner, event.OptionListReturnEvent(), fight)
+    assert chain.steps() == (redisplay, fight)
+    assert event.CompoundEvent(event.CompoundEvent()).steps() == ()
+
+
+def test_compound_event_rejects_classes():
+    with pytest.raises(Exception):
+        event.CompoundEvent(event.OptionListReturnEvent)
+
+
+def _coal_stacks(*counts):
+    return tuple(
+        (ItemInstance('misc.ore.coal', unique=i > 0), count)
+        for i, count in enumerate(counts)
+    )
+
+
+def test_inventory_event_removes_part_of_a_later_stack():
+    game = headless.create_game(_packages)
+    game.state.start(0)
+    inv = game.state.player.inventory
+    inv.restore(_coal_stacks(2, 1, 3))
+    inv.bind(game)
+    game.apply_event(event.InventoryEvent('misc.ore.tin', 2))
+    game.apply_event(event.InventoryEvent('misc.ore.coal', -4))
+    assert str(inv) == "2 misc.ore.coal\n2 misc.ore.tin"
+    game.apply_event(event.UndoEvent())
+    assert str(inv) == "2 misc.ore.coal\n1 misc.ore.coal\n" \
+                       "3 misc.ore.coal\n2 misc.ore.tin"
+
+    unbound = Inventory()
+    unbound.restore(_coal_stacks(1, 2, 5))
+    assert unbound.remove('misc.ore.coal', 4) == 4
+    assert [stack.count() for stack in unbound.slots] == [4]
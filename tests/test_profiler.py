@@ -0,0 +1,47 @@
+import json
+import os.path
+import time
+from rpg import event, headless
+from rpg.ui import console
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def _busy_content(game):
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiler_samples_events(tmpdir):
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    game.profiler.start(events=2)
+    game.apply_event(event.CallbackEvent(_busy_content))
+    assert game.profiler.running
+    game.apply_event(event.CallbackEvent(_busy_content))
+    assert not game.profiler.running
+
+    assert game.profiler.sample_count() > 0
+    assert "_busy_content" in game.profiler.report()
+
+    collapsed = str(tmpdir.join("profile.txt"))
+    game.profiler.write_collapsed(collapsed)
+    with open(collapsed) as fp:
+        assert "_busy_content" in fp.read()
+
+    speedscope = str(tmpdir.join("profile.json"))
+    game.profiler.write_speedscope(speedscope)
+    with open(speedscope) as fp:
+        data = json.load(fp)
+    assert data['profiles'][0]['type'] == "sampled"
+    assert len(data['shared']['frames']) > 0
+
+
+def test_console_timeit():
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    state = console.ConsoleState(game)
+    assert state.timeit("game.state.time.now()", number=10) >= 0.0
@@ -0,0 +1,41 @@
+import os.path
+from rpg import event, headless, replay
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def _record_session(path):
+    game = headless.create_game(_packages)
+    game.recorder = replay.Recorder()
+    game.state.player.inventory.add('misc.ore.coal', 5)
+    game.state.start()
+    game.apply_event(event.LocationEvent("prologue.town_square"))
+    game.apply_event(event.LocationEvent("prologue.market"))
+    game.apply_event(event.FightStartEvent("mob.goblin"))
+    game.recorder.recording.save(path)
+    return game
+
+
+def test_replay_reproduces_session(tmpdir):
+    path = str(tmpdir.join("session.dat"))
+    game = _record_session(path)
+    view = game.state.game_view()
+
+    recording = replay.Recording.load(path)
+    assert recording.seed == game.seed
+    assert len(recording.events) == 3
+
+    result = replay.Replayer(recording, _packages).run()
+    assert result.event_count == 3
+    replayed = result.game.state
+    assert replayed.location.resource_id() == "prologue.market"
+    assert replayed.game_view().text == view.text
+    assert str(replayed.player.inventory) == str(game.state.player.inventory)
+
+
+def test_recorder_ignores_events_before_start():
+    recorder = replay.Recorder()
+    recorder.record(event.OptionListReturnEvent())
+    assert recorder.recording is None
@@ -0,0 +1,59 @@
+import os.path
+import pytest
+from rpg import event, headless, sessions
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def test_sessions_hibernate_lru(tmpdir):
+    manager = sessions.SessionManager(str(tmpdir), _packages, max_resident=2)
+    for name in ("a", "b", "c"):
+        game = manager.create(name, seed=1)
+        game.state.player.inventory.add('misc.ore.coal', 3)
+        game.state.variables.namespace("base")['name'] = name
+
+    manager.apply_event("a", event.LocationEvent("prologue.town_square"))
+    assert manager.resident_count() == 2
+    assert manager.hibernated_count() == 1
+    assert not manager.is_resident("a") or not manager.is_resident("b")
+
+    game = manager.get("b")
+    assert game.state.variables.namespace("base")['name'] == "b"
+    assert str(game.state.player.inventory) == "3 misc.ore.coal"
+    assert game.state.location.resource_id() == "prologue.players_house"
+
+    game = manager.get("a")
+    assert game.state.location.resource_id() == "prologue.town_square"
+    assert game.state.game_view().title == "Town Square"
+
+    manager.close("c")
+    assert not manager.exists("c")
+
+
+def test_sessions_hibernate_idle(tmpdir):
+    manager = sessions.SessionManager(str(tmpdir), _packages)
+    manager.create("a")
+    assert manager.hibernate_idle(0.0) == ["a"]
+    assert manager.exists("a")
+    assert not manager.is_resident("a")
+    manager.get("a")
+    assert manager.is_resident("a")
+
+
+def test_sessions_do_not_share_state(tmpdir):
+    manager = sessions.SessionManager(str(tmpdir), _packages)
+    first = manager.create("a", seed=1)
+    second = manager.create("b", seed=1)
+    first.apply_event(event.FightStartEvent("mob.goblin"))
+    first.state.monster.stats.health.value -= 30
+    second.apply_event(event.FightStartEvent("mob.goblin"))
+    assert second.state.monster is not first.state.monster
+    assert second.state.monster.stats.health.value == 80
+
+    with pytest.raises(ValueError):
+        second.state.flags.registry.declare("base.seen")
+    template = headless.create_game(_packages)
+    game = headless.create_game(template=template)
+    assert game.state.flags.registry.frozen()
@@ -0,0 +1,186 @@
+import os.path
+import pytest
+from rpg import event, headless, state
+from rpg.data import resource
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def _started_game():
+    game = headless.create_game(_packages)
+    game.state.player.inventory.add('misc.ore.coal', 5)
+    game.state.start(1234)
+    return game
+
+
+def test_undo_restores_previous_state():
+    game = _started_game()
+    game.apply_event(event.LocationEvent("prologue.town_square"))
+    game.state.variables.namespace("base")['visited'] = True
+    game.state.player.inventory.add('misc.ore.tin', 2)
+    game.apply_event(event.LocationEvent("prologue.market"))
+
+    game.apply_event(event.UndoEvent())
+    assert game.state.location.resource_id() == "prologue.town_square"
+    assert game.state.variables.pack() == {'base': {'visited': True}}
+    assert str(game.state.player.inventory) == "5 misc.ore.coal\n2 misc.ore.tin"
+
+    game.apply_event(event.UndoEvent())
+    assert game.state.location.resource_id() == "prologue.players_house"
+    assert game.state.variables.pack() == {}
+    assert str(game.state.player.inventory) == "5 misc.ore.coal"
+    assert len(game.history) == 0
+    assert not game.undo()
+
+
+def test_snapshots_share_unchanged_parts():
+    game = _started_game()
+    for _ in range(10):
+        game.apply_event(event.OptionListReturnEvent())
+    first = game.history.peek(10)
+    last = game.history.peek(1)
+    assert first is not last
+    assert last.inventory is first.inventory
+    assert last.stats is first.stats
+    assert last.variables is first.variables
+    assert last.random is first.random
+
+
+def test_snapshots_share_untouched_stacks():
+    game = _started_game()
+    game.state.player.inventory.add('misc.ore.tin', 2)
+    first = game.state.snapshot()
+    game.state.player.inventory.add('misc.ore.tin', 1)
+    game.state.player.stats.strength.level += 1
+    second = game.state.snapshot(first)
+    assert second.inventory is not first.inventory
+    assert second.inventory[0] is first.inventory[0]
+    assert second.inventory[1] == (first.inventory[1][0], 3)
+    assert second.stats is not first.stats
+    assert second.variables is first.variables
+    assert game.state.snapshot(second).stats is second.stats
+
+
+def test_event_chain_displays_once():
+    game = _started_game()
+    view = game.state.game_view()
+    count = view.display_count
+    game.apply_event(event.CompoundEvent(
+        event.LocationEvent("prologue.town_square"),
+        event.LocationEvent("prologue.market"),
+        event.OptionListReturnEvent(),
+    ))
+    assert view.display_count == count + 1
+    assert view.title == "Market"
+
+
+def test_posted_events_are_coalesced():
+    game = _started_game()
+    view = game.state.game_view()
+    count = view.display_count
+    with game.state.deferred_display():
+        game.post_event(event.LocationEvent("prologue.town_square"))
+        game.post_event(event.LocationEvent("prologue.market"))
+        assert view.display_count == count
+    assert view.display_count == count + 1
+    assert view.title == "Market"
+
+
+def test_events_queued_after_a_failed_event_are_dropped():
+    game = _started_game()
+
+    def _fail(g):
+        g.post_event(event.LocationEvent("prologue.market"))
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        game.post_event(event.CallbackEvent(_fail))
+    game.post_event(event.LocationEvent("prologue.town_square"))
+    assert game.state.location.resource_id() == "prologue.town_square"
+    assert game.state.game_view().title == "Town Square"
+    game.apply_event(event.UndoEvent())
+    assert game.state.location.resource_id() == "prologue.players_house"
+
+
+
+class _IdleRoot(object):
+    """Stands in for the tkinter root, holding the idle callbacks."""
+
+    def __init__(self):
+        self.idle = list()
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+
+def test_option_clicks_from_replaced_options_are_dropped():
+    game = _started_game()
+    game._root = _IdleRoot()
+    generation = game.state.options_generation
+    try:
+        game.post_event(
+            event.LocationEvent("prologue.town_square"), generation
+        )
+        game.post_event(event.LocationEvent("prologue.market"), generation)
+        assert len(game._root.idle) == 1
+        game._root.idle.pop()()
+    finally:
+        game._root = None
+    assert game.state.location.resource_id() == "prologue.town_square"
+    assert game.state.game_view().title == "Town Square"
+
+def test_rejected_event_is_rolled_back():
+    game = _started_game()
+    view = game.state.game_view()
+    text = view.text
+    history = len(game.history)
+
+    def _reject(g):
+        g.state.set_location("prologue.market")
+        g.state.player.inventory.add('misc.ore.tin', 2)
+        g.state.set_fight("mob.goblin")
+        g.state.stop_fight()
+        raise state.Rollback("not allowed")
+
+    game.apply_event(event.CallbackEvent(_reject))
+    assert game.state.location.resource_id() == "prologue.players_house"
+    assert str(game.state.player.inventory) == "5 misc.ore.coal"
+    assert view.title != "Market"
+    assert view.text == text
+    assert len(game.history) == history
+
+
+def test_modifiers_expire_with_game_time():
+    from rpg.data.attributes import Modifier
+    game = _started_game()
+    stats = game.state.player.stats
+    buff = Modifier("con", amount=5, source="potion", expires=60)
+    game.apply_event(event.CallbackEvent(lambda g: stats.add_modifier(buff)))
+    assert stats.modified_level("con") == 15
+
+    game.apply_event(event.LocationEvent("prologue.town_square", 30))
+    assert stats.modifiers("con") == (buff,)
+    game.apply_event(event.LocationEvent("prologue.market", 30))
+    assert stats.modifiers("con") == ()
+    assert stats.modified_level("con") == 10
+
+    game.undo()
+    assert stats.modifiers("con") == (buff,)
+
+
+def test_spawned_monster_shares_its_stats():
+    game = _started_game()
+    game.state.set_fight("mob.goblin")
+    goblin = game.state.resources.get(
+        resource.ResourceType.Actor, "mob.goblin"
+    )
+    monster = game.state.monster
+    assert monster is not goblin
+    assert monster.stats._shared
+    assert monster.stats._data is goblin.stats._data
+
+    monster.stats.health.value -= 30
+    assert monster.stats._data is not goblin.stats._data
+    assert goblin.stats.health.value == 80
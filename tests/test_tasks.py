@@ -0,0 +1,110 @@
+import asyncio
+import os.path
+from rpg import event, headless, state, tasks
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+class _CraftEvent(event.GameEvent):
+    def __init__(self, count):
+        self.count = count
+
+    async def apply(self, game):
+        for i in range(self.count):
+            game.state.player.inventory.add('misc.ore.coal')
+            tasks.report_progress((i + 1) / self.count, "Crafting")
+            await tasks.checkpoint()
+
+
+class _WaitEvent(event.GameEvent):
+    async def apply(self, game):
+        await asyncio.sleep(3600)
+
+
+class _RejectedEvent(event.GameEvent):
+    async def apply(self, game):
+        game.state.player.inventory.add('misc.ore.coal')
+        await tasks.checkpoint()
+        game.state.player.inventory.add('misc.ore.tin')
+        raise state.Rollback("not allowed")
+
+
+class _Root(object):
+    def __init__(self):
+        self.callbacks = list()
+        self.delays = list()
+
+    def after(self, ms, func):
+        self.delays.append(ms)
+        self.callbacks.append(func)
+
+    def run(self, limit=1000):
+        steps = 0
+        while len(self.callbacks) > 0 and steps < limit:
+            self.callbacks.pop(0)()
+            steps += 1
+        return steps
+
+
+def test_async_event_runs_to_completion_headless():
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    progress = list()
+    game.tasks.add_listener(lambda h: progress.append(h.progress))
+
+    game.apply_event(_CraftEvent(4))
+    assert str(game.state.player.inventory) == "4 misc.ore.coal"
+    assert progress == [0.25, 0.5, 0.75, 1.0, 1.0]
+    assert game.tasks.running() == []
+
+
+def test_async_event_is_pumped_and_cancelled():
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    root = _Root()
+    game._root = root
+
+    game.apply_event(_CraftEvent(3))
+    assert len(game.tasks.running()) == 1
+    root.run()
+    assert str(game.state.player.inventory) == "3 misc.ore.coal"
+    assert set(root.delays) == {tasks.PumpInterval}
+
+    game.apply_event(_WaitEvent())
+    handle = game.tasks.running()[0]
+    root.run(limit=3)
+    handle.cancel()
+    root.run()
+    assert handle.state == tasks.TaskState.Cancelled
+    assert game.tasks.running() == []
+    game.tasks.close()
+
+
+def test_sleeping_tasks_are_not_pumped_busily():
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    root = _Root()
+    game._root = root
+
+    game.apply_event(_WaitEvent())
+    root.run(limit=5)
+    assert root.delays[0] == tasks.PumpInterval
+    assert set(root.delays[1:]) == {tasks.IdleInterval}
+    game.tasks.cancel_all()
+    root.run()
+    assert game.tasks.running() == []
+    game.tasks.close()
+
+
+def test_task_steps_are_rolled_back_and_undone():
+    game = headless.create_game(_packages)
+    game.state.start(seed=1)
+    game.apply_event(_RejectedEvent())
+    assert str(game.state.player.inventory) == "1 misc.ore.coal"
+
+    game.apply_event(_CraftEvent(2))
+    assert str(game.state.player.inventory) == "3 misc.ore.coal"
+    game.apply_event(event.UndoEvent())
+    assert str(game.state.player.inventory) == "1 misc.ore.coal"
@@ -0,0 +1,45 @@
+import json
+import os.path
+from rpg import event, headless, trace
+
+_packages = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "packages"
+)
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = trace.Tracer()
+    with tracer.span("event", "Test"):
+        pass
+    assert tracer.histograms == dict()
+    assert len(tracer.traces) == 0
+
+
+def test_spans_nest_and_fill_histograms():
+    tracer = trace.Tracer()
+    tracer.enable()
+    for _ in range(3):
+        with tracer.span("event", "Outer"):
+            with tracer.span("display", "loc"):
+                pass
+    assert tracer.histograms["event:Outer"].count == 3
+    assert tracer.histograms["display:loc"].count == 3
+    assert len(tracer.traces) == 3
+    assert [c.key for c in tracer.traces[0].children] == ["display:loc"]
+
+    packed = json.loads(json.dumps(tracer.pack()))
+    assert packed['histograms']['event:Outer']['count'] == 3
+    assert "event:Outer" in tracer.report()
+
+
+def test_game_events_are_traced():
+    game = headless.create_game(_packages)
+    game.tracer.enable()
+    game.state.start(seed=1)
+    location_id = game.state.location.resource_id()
+    game.apply_event(event.LocationEvent(location_id))
+
+    histograms = game.tracer.histograms
+    assert histograms["event:LocationEvent"].count == 1
+    assert histograms["location:{}".format(location_id)].count >= 1
+    assert histograms["text:{}".format(location_id)].count >= 1
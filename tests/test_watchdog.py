@@ -0,0 +1,58 @@
+import time
+import tkinter
+from rpg.ui import watchdog
+
+
+class _Log(object):
+    def __init__(self):
+        self.warnings = list()
+
+    def warning(self, msg, *args):
+        self.warnings.append(msg.format(*args))
+
+
+def _slow_callback():
+    time.sleep(0.03)
+
+
+def _fast_callback():
+    pass
+
+
+def test_slow_callbacks_are_reported():
+    log = _Log()
+    dog = watchdog.Watchdog(log, threshold=0.01)
+    dog.install()
+    try:
+        for _ in range(9):
+            tkinter.CallWrapper(_fast_callback, None, None)()
+        tkinter.CallWrapper(_slow_callback, None, None)()
+    finally:
+        dog.uninstall()
+
+    assert dog.slow_count == 1
+    assert len(log.warnings) == 1
+    assert "_slow_callback" in log.warnings[0]
+    assert "stack while running" in log.warnings[0]
+    assert dog.percentile(0.5) < 0.01
+    assert dog.percentile(0.99) >= 0.03
+    assert dog.report().startswith("10 callbacks")
+
+
+def test_uninstall_restores_call_wrapper():
+    original = tkinter.CallWrapper
+    dog = watchdog.Watchdog(_Log())
+    dog.install()
+    assert tkinter.CallWrapper is not original
+    dog.uninstall()
+    assert tkinter.CallWrapper is original
+
+
+def test_describe_unwraps_after_callbacks():
+    def after(func):
+        def callit():
+            func()
+        return callit
+    callit = after(_fast_callback)
+    assert callit.__qualname__.endswith("after.<locals>.callit")
+    assert watchdog.describe(callit).endswith("._fast_callback")